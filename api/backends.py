@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model, hashers
+from django.contrib.auth.backends import ModelBackend
+from .hashing import check_password, make_password
+
+UserModel = get_user_model()
+
+
+class PooledPasswordBackend(ModelBackend):
+    """
+    ModelBackend that verifies and upgrades password hashes in the password
+    process pool, keeping the CPU-heavy hashing off the request threads.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so that unknown usernames take as long as known ones.
+            make_password(password)
+            return None
+
+        if not check_password(password, user.password):
+            return None
+        if not self.user_can_authenticate(user):
+            return None
+
+        # Same rule as AbstractBaseUser.check_password: rehash when the hash
+        # is from another hasher or that hasher wants a new work factor.
+        hasher = hashers.identify_hasher(user.password)
+        preferred = hashers.get_hasher()
+        if hasher.algorithm != preferred.algorithm or hasher.must_update(user.password):
+            user.password = make_password(password)
+            user.save(update_fields=["password"])
+        return user
@@ -0,0 +1,153 @@
+import random
+import time
+from contextlib import contextmanager
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.test import APIClient
+from .models import Game, KnockoutGame, Player, PlayerStats, Team, TournamentGroup
+from .player_stats import _contributions
+from .score_events import score_state
+from .utils import generate_games_for_groups
+
+
+@contextmanager
+def benchmark_database():
+    """Run the body against a throwaway test database, never the real one."""
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, *args, **kwargs):
+    """Return (result, milliseconds, query count) for a single call."""
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+    return result, elapsed, len(queries)
+
+
+def admin_client():
+    user = User.objects.create_user(
+        username="benchmark-admin", password="benchmark", is_staff=True
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def seed_teams(count):
+    teams = [
+        Team(
+            name=f"Team {i:04d}",
+            member_one=f"Player {i:04d}A",
+            member_two=f"Player {i:04d}B",
+        )
+        for i in range(count)
+    ]
+    for team in teams:
+        team.update_search_keys()
+    teams = Team.objects.bulk_create(teams)
+
+    # Players outlive reset_tournament(), so a reseed finds them again.
+    names = [name for team in teams for name in (team.member_one, team.member_two)]
+    Player.objects.bulk_create(
+        (Player(name=name) for name in names), ignore_conflicts=True
+    )
+    by_name = Player.objects.in_bulk(names, field_name="name")
+    players = [by_name[name] for name in names]
+    PlayerStats.objects.bulk_create(
+        (PlayerStats(player=player) for player in players), ignore_conflicts=True
+    )
+    Team.players.through.objects.bulk_create(
+        Team.players.through(team=team, player=player)
+        for team, player in zip((team for team in teams for _ in range(2)), players)
+    )
+    return teams
+
+
+def seed_tournament(team_count, group_size=4, tables=20, played=1.0, seed=1):
+    """Create teams, groups and scheduled games and play a share of them."""
+    rng = random.Random(seed)
+    teams = seed_teams(team_count)
+
+    groups = TournamentGroup.objects.bulk_create(
+        TournamentGroup(name=f"Group {index + 1}")
+        for index in range(team_count // group_size)
+    )
+    TournamentGroup.teams.through.objects.bulk_create(
+        TournamentGroup.teams.through(
+            tournamentgroup=group, team=teams[index * group_size + offset]
+        )
+        for index, group in enumerate(groups)
+        for offset in range(group_size)
+    )
+    groups = list(TournamentGroup.objects.order_by("id").prefetch_related("teams"))
+    generate_games_for_groups(groups, tables)
+
+    games = list(Game.objects.all())
+    for game in games[: int(len(games) * played)]:
+        game.score_team1, game.score_team2 = random_result(rng)
+        game.played = True
+        game.update_completed_at()
+    Game.objects.bulk_update(
+        games, ["score_team1", "score_team2", "played", "completed_at"]
+    )
+    credit_players(games)
+
+    return teams, groups
+
+
+def credit_players(games):
+    """Add bulk-played games to the player stats, as the score log would."""
+    knockout = {}
+    totals = {}
+    for game in games:
+        for team_id, contribution in zip(
+            (game.team1_id, game.team2_id), _contributions(score_state(game))
+        ):
+            team = totals.setdefault(team_id, [0, 0, 0, 0])
+            for index, value in enumerate(contribution):
+                team[index] += value
+            if isinstance(game, KnockoutGame):
+                knockout[team_id] = knockout.get(team_id, 0) + contribution[0]
+
+    stats = list(
+        PlayerStats.objects.filter(player__teams__in=totals).annotate(
+            team_id=F("player__teams")
+        )
+    )
+    for entry in stats:
+        games_played, wins, scored, conceded = totals[entry.team_id]
+        entry.games += games_played
+        entry.wins += wins
+        entry.cups_scored += scored
+        entry.cups_conceded += conceded
+        entry.knockout_appearances += knockout.get(entry.team_id, 0)
+    PlayerStats.objects.bulk_update(
+        stats,
+        ["games", "wins", "cups_scored", "cups_conceded", "knockout_appearances"],
+    )
+
+
+def random_result(rng):
+    loser = rng.randint(0, 9)
+    return (10, loser) if rng.random() < 0.5 else (loser, 10)
+
+
+def write_report(stdout, rows):
+    width = max(len(label) for label, _, _ in rows)
+    stdout.write(f"{'step'.ljust(width)}  {'ms':>10}  {'queries':>7}")
+    for label, elapsed, queries in rows:
+        stdout.write(f"{label.ljust(width)}  {elapsed:>10.2f}  {queries:>7}")
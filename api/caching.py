@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from .models import StateVersion
+
+
+def get_state_version():
+    version = StateVersion.objects.filter(pk=1).values_list("version", flat=True)
+    return version.first() or 1
+
+
+def _increment_state_version():
+    if not StateVersion.objects.filter(pk=1).update(version=F("version") + 1):
+        try:
+            with transaction.atomic():
+                StateVersion.objects.create(pk=1, version=2)
+        except IntegrityError:
+            # Created concurrently.
+            StateVersion.objects.filter(pk=1).update(version=F("version") + 1)
+
+
+def bump_state_version():
+    """
+    Invalidate everything cached for the current state once the surrounding
+    transaction commits, or right away outside of one. Bumping any earlier
+    would let a concurrent reader cache the uncommitted, old state under the
+    new version for good. A transaction bumps the version only once.
+    """
+    connection = transaction.get_connection()
+    pending = getattr(connection, "pending_state_version_bump", None)
+    if any(entry[1] is pending for entry in connection.run_on_commit):
+        return
+
+    def bump():
+        connection.pending_state_version_bump = None
+        _increment_state_version()
+
+    connection.pending_state_version_bump = bump
+    transaction.on_commit(bump)
+
+
+def cached_for_state(key, compute, version=None):
+    """
+    Return the cached value of compute() until the next score write. The
+    values stay in each process's own cache; only the version is shared.
+    """
+    if version is None:
+        version = get_state_version()
+    versioned_key = f"{key}:v{version}"
+    value = cache.get(versioned_key)
+    if value is None:
+        value = compute()
+        cache.set(versioned_key, value, None)
+    return value
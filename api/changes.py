@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import connection, transaction
+from .models import ChangeLogEntry
+
+# Arbitrary key for the PostgreSQL advisory lock that orders log writers.
+CHANGE_LOG_LOCK = 7_420_373
+
+_pending = ContextVar("pending_changes", default=None)
+
+
+def _write(entries):
+    resets = [
+        index
+        for index, entry in enumerate(entries)
+        if entry.entity == ChangeLogEntry.RESET
+    ]
+    if resets:
+        # Everything before a reset is superseded: clients behind it refetch.
+        entries = entries[resets[-1] :]
+
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # Sequence values are handed out before commit, so without the
+            # lock a client could see change N+1 while N is still invisible
+            # and skip N for good.
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CHANGE_LOG_LOCK])
+        if resets:
+            ChangeLogEntry.objects.all().delete()
+        ChangeLogEntry.objects.bulk_create(entries)
+
+
+def record_changes(entity, ids, deleted=False):
+    entries = [
+        ChangeLogEntry(entity=entity, entity_id=entity_id, deleted=deleted)
+        for entity_id in ids
+    ]
+    if not entries:
+        return
+
+    pending = _pending.get()
+    if pending is not None:
+        pending.extend(entries)
+    else:
+        _write(entries)
+
+
+def record_reset():
+    """Tell every client to drop its local copy and refetch everything."""
+    pending = _pending.get()
+    if pending is not None:
+        pending[:] = [ChangeLogEntry(entity=ChangeLogEntry.RESET)]
+    else:
+        _write([ChangeLogEntry(entity=ChangeLogEntry.RESET)])
+
+
+@contextmanager
+def batched_changes():
+    """
+    Collect the changes recorded inside the block, including those from
+    signals, and write them with one INSERT when it exits.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+
+    pending = []
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    _write(pending)
+
+
+def changes_since(since):
+    """
+    Return (sequence, reset, changed, deleted) for everything logged after
+    `since`. `changed` and `deleted` map each entity to a set of ids; `reset`
+    means the client's copy is too old or unknown and must be refetched.
+    """
+    entries = list(
+        ChangeLogEntry.objects.filter(id__gte=since).values_list(
+            "id", "entity", "entity_id", "deleted"
+        )
+    )
+    if since:
+        if not entries or entries[0][0] != since:
+            # The entry the client saw last is gone: the log was cleared or
+            # pruned after it, or the client is ahead of the log, e.g. after
+            # a database restore. What it missed cannot be told.
+            latest = ChangeLogEntry.objects.order_by("-id").first()
+            return (latest.id if latest else 0), True, {}, {}
+        entries = entries[1:]
+    if not entries:
+        return since, False, {}, {}
+
+    sequence = entries[-1][0]
+    if any(entity == ChangeLogEntry.RESET for _, entity, _, _ in entries):
+        return sequence, True, {}, {}
+
+    latest = {}
+    for _, entity, entity_id, deleted in entries:
+        latest[entity, entity_id] = deleted
+
+    changed, removed = {}, {}
+    for (entity, entity_id), deleted in latest.items():
+        (removed if deleted else changed).setdefault(entity, set()).add(entity_id)
+    return sequence, False, changed, removed
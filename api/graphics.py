@@ -0,0 +1,189 @@
+from django.utils.html import escape
+from .models import KnockoutGame
+
+FONT = "font-family='Helvetica, Arial, sans-serif'"
+MARGIN = 20
+TITLE_HEIGHT = 28
+
+ROW_HEIGHT = 24
+TABLE_WIDTH = 380
+TABLE_COLUMNS = 2
+STANDINGS_COLUMNS = (
+    # (header, x offset, anchor)
+    ("#", 14, "middle"),
+    ("Team", 34, "start"),
+    ("P", 250, "end"),
+    ("+/-", 300, "end"),
+    ("Pts", 350, "end"),
+)
+
+MATCH_WIDTH = 200
+MATCH_HEIGHT = 44
+MATCH_GAP = 12
+ROUND_GAP = 40
+
+
+def _document(width, height, body):
+    return (
+        "<svg xmlns='http://www.w3.org/2000/svg' "
+        f"width='{width}' height='{height}' viewBox='0 0 {width} {height}'>"
+        f"<rect width='100%' height='100%' fill='#ffffff'/>"
+        f"<g {FONT} font-size='13' fill='#222222'>{''.join(body)}</g></svg>"
+    )
+
+
+def _text(x, y, value, anchor="start", weight="normal", fill=None):
+    fill = f" fill='{fill}'" if fill else ""
+    return (
+        f"<text x='{x}' y='{y}' text-anchor='{anchor}' "
+        f"font-weight='{weight}'{fill}>{escape(value)}</text>"
+    )
+
+
+def render_standings_svg(tables):
+    """
+    Draw the group tables from compute_group_tables() as a grid of
+    TABLE_COLUMNS tables per row.
+    """
+    if not tables:
+        return _document(
+            TABLE_WIDTH + 2 * MARGIN,
+            TITLE_HEIGHT + 2 * MARGIN,
+            [_text(MARGIN, MARGIN + 18, "No groups yet.")],
+        )
+
+    rows_per_table = max(len(standings) for _, standings in tables)
+    table_height = TITLE_HEIGHT + ROW_HEIGHT * (rows_per_table + 1)
+    columns = min(TABLE_COLUMNS, len(tables))
+    grid_rows = -(-len(tables) // columns)
+    width = columns * TABLE_WIDTH + (columns + 1) * MARGIN
+    height = grid_rows * table_height + (grid_rows + 1) * MARGIN
+
+    body = []
+    for index, (group, standings) in enumerate(tables):
+        left = MARGIN + (index % columns) * (TABLE_WIDTH + MARGIN)
+        top = MARGIN + (index // columns) * (table_height + MARGIN)
+
+        body.append(
+            f"<rect x='{left}' y='{top}' width='{TABLE_WIDTH}' height='{TITLE_HEIGHT}' "
+            "fill='#1f3a5f'/>"
+        )
+        body.append(
+            _text(left + 10, top + 19, group.name, weight="bold", fill="#ffffff")
+        )
+
+        y = top + TITLE_HEIGHT
+        for header, offset, anchor in STANDINGS_COLUMNS:
+            body.append(_text(left + offset, y + 17, header, anchor, "bold"))
+
+        for place, stats in enumerate(standings, start=1):
+            y += ROW_HEIGHT
+            if place % 2:
+                body.append(
+                    f"<rect x='{left}' y='{y}' width='{TABLE_WIDTH}' "
+                    f"height='{ROW_HEIGHT}' fill='#f0f3f7'/>"
+                )
+            difference = stats["cups_scored"] - stats["cups_conceded"]
+            values = (
+                str(place),
+                stats["team"].name,
+                str(stats["played"]),
+                f"+{difference}" if difference > 0 else str(difference),
+                str(stats["points"]),
+            )
+            for value, (_, offset, anchor) in zip(values, STANDINGS_COLUMNS):
+                body.append(_text(left + offset, y + 17, value, anchor))
+
+    return _document(width, height, body)
+
+
+def _match(left, top, game):
+    winner = game.winner if game is not None else None
+    lines = []
+    if game is None:
+        lines = [("TBD", "", False), ("TBD", "", False)]
+    else:
+        for team, score in (
+            (game.team1, game.score_team1),
+            (game.team2, game.score_team2),
+        ):
+            name = team.name if team is not None else "bye"
+            shown = str(score) if game.played and score is not None else ""
+            lines.append((name, shown, winner is not None and team == winner))
+
+    body = [
+        f"<rect x='{left}' y='{top}' width='{MATCH_WIDTH}' height='{MATCH_HEIGHT}' "
+        "rx='4' fill='#f0f3f7' stroke='#1f3a5f'/>",
+        f"<line x1='{left}' y1='{top + MATCH_HEIGHT / 2}' "
+        f"x2='{left + MATCH_WIDTH}' y2='{top + MATCH_HEIGHT / 2}' stroke='#c8d0da'/>",
+    ]
+    for row, (name, score, won) in enumerate(lines):
+        y = top + 16 + row * MATCH_HEIGHT / 2
+        weight = "bold" if won else "normal"
+        body.append(_text(left + 8, y, name, weight=weight))
+        body.append(_text(left + MATCH_WIDTH - 8, y, score, "end", weight))
+    return body
+
+
+def render_bracket_svg(knockout_games):
+    """
+    Draw the knockout bracket from the first round that has games up to the
+    final. Rounds that have not been generated yet are drawn as empty slots.
+    """
+    codes = [code for code, _ in KnockoutGame.ROUND_CHOICES]
+    games_by_round = {}
+    for game in knockout_games:
+        games_by_round.setdefault(game.round, {})[game.position] = game
+
+    present = [code for code in codes if code in games_by_round]
+    if not present:
+        return _document(
+            MATCH_WIDTH + 2 * MARGIN,
+            TITLE_HEIGHT + 2 * MARGIN,
+            [_text(MARGIN, MARGIN + 18, "No knockout stage yet.")],
+        )
+
+    rounds = codes[codes.index(present[0]) :]
+    first_round_matches = 2 ** (len(rounds) - 1)
+    slot = MATCH_HEIGHT + MATCH_GAP
+    width = len(rounds) * (MATCH_WIDTH + ROUND_GAP) - ROUND_GAP + 2 * MARGIN
+    height = TITLE_HEIGHT + first_round_matches * slot - MATCH_GAP + 2 * MARGIN
+    labels = dict(KnockoutGame.ROUND_CHOICES)
+
+    body = []
+    for depth, code in enumerate(rounds):
+        left = MARGIN + depth * (MATCH_WIDTH + ROUND_GAP)
+        body.append(
+            _text(left + MATCH_WIDTH / 2, MARGIN + 14, labels[code], "middle", "bold")
+        )
+
+        span = slot * 2**depth
+        for position in range(first_round_matches // 2**depth):
+            center = MARGIN + TITLE_HEIGHT + position * span + span / 2 - MATCH_GAP / 2
+            top = center - MATCH_HEIGHT / 2
+            body.extend(_match(left, top, games_by_round.get(code, {}).get(position)))
+
+            if depth + 1 < len(rounds):
+                # Elbow from this match to its slot in the next round.
+                x = left + MATCH_WIDTH
+                next_center = (
+                    MARGIN
+                    + TITLE_HEIGHT
+                    + (position // 2) * span * 2
+                    + span
+                    - MATCH_GAP / 2
+                )
+                body.append(
+                    f"<polyline points='{x},{center} {x + ROUND_GAP / 2},{center} "
+                    f"{x + ROUND_GAP / 2},{next_center} {x + ROUND_GAP},{next_center}' "
+                    "fill='none' stroke='#1f3a5f'/>"
+                )
+
+    return _document(width, height, body)
+
+
+def svg_to_png(svg):
+    """Rasterize with cairosvg, which is an optional dependency."""
+    import cairosvg
+
+    return cairosvg.svg2png(bytestring=svg.encode())
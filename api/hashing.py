@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from rest_framework.exceptions import Throttled
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_size = 0
+_slots = None
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with the work factor taken from PASSWORD_HASH_ITERATIONS. It
+    shares the algorithm name with Django's hasher, so existing hashes stay
+    valid and are upgraded on the next login whenever the setting changes.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+
+# This module must stay importable before django.setup(): spawned pool
+# processes import it to find their initializer.
+def _init_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+
+    django.setup()
+
+
+def _warm_worker():
+    return os.getpid()
+
+
+def get_pool():
+    """
+    The process pool of this worker process, created on first use so that
+    it is never inherited across gunicorn's fork.
+    """
+    global _pool, _pool_size, _slots
+    with _pool_lock:
+        workers = settings.PASSWORD_HASH_WORKERS
+        if _pool is not None and _pool_size != workers:
+            _pool.shutdown()
+            _pool = None
+        if _pool is None:
+            _pool_size = workers
+            _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASH_QUEUE)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(os.environ["DJANGO_SETTINGS_MODULE"],),
+            )
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the pool processes; the next hash starts a new pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def warm_pool():
+    """Start every pool process now instead of on the first login."""
+    if settings.PASSWORD_HASH_WORKERS:
+        pool = get_pool()
+        futures = [
+            pool.submit(_warm_worker) for _ in range(settings.PASSWORD_HASH_WORKERS)
+        ]
+        for future in futures:
+            future.result()
+
+
+@contextmanager
+def _slot():
+    # Bound the backlog: when every process is busy and the queue is full,
+    # tell the client to retry instead of parking this request thread.
+    if not _slots.acquire(timeout=settings.PASSWORD_HASH_WAIT):
+        raise Throttled(wait=1, detail="Password hashing is busy, please retry.")
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+def _run(func, *args):
+    if not settings.PASSWORD_HASH_WORKERS:
+        return func(*args)
+
+    pool = get_pool()
+    with _slot():
+        return pool.submit(func, *args).result()
+
+
+def make_passwords(passwords):
+    """
+    Hash many passwords at once, spread over every pool process. The whole
+    batch takes a single queue slot.
+    """
+    if not settings.PASSWORD_HASH_WORKERS:
+        return [hashers.make_password(password) for password in passwords]
+
+    pool = get_pool()
+    chunksize = max(1, len(passwords) // (settings.PASSWORD_HASH_WORKERS * 4))
+    with _slot():
+        return list(pool.map(hashers.make_password, passwords, chunksize=chunksize))
+
+
+def check_password(password, encoded):
+    return _run(hashers.check_password, password, encoded)
+
+
+def make_password(password):
+    return _run(hashers.make_password, password)
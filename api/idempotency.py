@@ -0,0 +1,135 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from .models import IdempotencyRecord
+
+HEADER = "Idempotency-Key"
+POLL_INTERVAL = 0.1
+# Response headers a retry needs, such as the job a 202 points to.
+REPLAYED_HEADERS = ("Location",)
+
+
+def _fingerprint(request):
+    # The query string is part of the request: ?async=true gets a different
+    # kind of response than the same body without it.
+    query = sorted(request.query_params.lists())
+    payload = json.dumps([query, request.data], sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.path}\n{payload}".encode()).hexdigest()
+
+
+def _claim(request, key, fingerprint):
+    """
+    Return (record, created). Only the request that creates the record runs
+    the view; everyone else gets the existing record.
+    """
+    now = timezone.now()
+    expired = Q(created_at__lt=now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL))
+    # An in-flight record this old belongs to a worker that died mid-request.
+    abandoned = Q(
+        user=request.user,
+        key=key,
+        status_code__isnull=True,
+        created_at__lt=now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+    )
+    IdempotencyRecord.objects.filter(expired | abandoned).delete()
+
+    try:
+        with transaction.atomic():
+            record = IdempotencyRecord.objects.create(
+                user=request.user,
+                key=key,
+                path=request.path,
+                fingerprint=fingerprint,
+            )
+        return record, True
+    except IntegrityError:
+        record = IdempotencyRecord.objects.filter(user=request.user, key=key).first()
+        return record, False
+
+
+def _replay(record):
+    response = Response(
+        record.body, status=record.status_code, headers=record.headers or None
+    )
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view_method):
+    """
+    Honour an Idempotency-Key header on an APIView method.
+
+    The first response for a (user, key) pair is stored for
+    IDEMPOTENCY_KEY_TTL seconds and replayed for retries. A retry that
+    arrives while the first request is still running waits for its result
+    instead of running the view a second time. Raised exceptions and server
+    errors are not stored, so the client can retry them with the same key.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            raise ValidationError({"error": f"{HEADER} is too long."})
+
+        fingerprint = _fingerprint(request)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+        while True:
+            record, created = _claim(request, key, fingerprint)
+            if created:
+                break
+            if record is None:
+                # The first request failed and released the key; try again.
+                continue
+            if record.fingerprint != fingerprint:
+                return Response(
+                    {
+                        "success": False,
+                        "error": f"{HEADER} was already used for a different request.",
+                    },
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status_code is not None:
+                return _replay(record)
+            if time.monotonic() >= deadline:
+                return Response(
+                    {
+                        "success": False,
+                        "error": f"A request with this {HEADER} is still in progress.",
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            record.status_code = response.status_code
+            record.body = response.data
+            record.headers = {
+                header: response[header]
+                for header in REPLAYED_HEADERS
+                if response.has_header(header)
+            }
+            record.save(update_fields=["status_code", "body", "headers"])
+        return response
+
+    return wrapper
@@ -0,0 +1,173 @@
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Game, Job, KnockoutGame, Team
+from .ratings import recompute_ratings
+from .swiss import create_swiss_stage
+from .serializers import (
+    GameSerializer,
+    KnockoutGameSerializer,
+    TeamSerializer,
+    TournamentGroupSerializer,
+)
+from .utils import (
+    compute_group_tables,
+    create_groups,
+    generate_knockout_stage,
+    reset_tournament,
+)
+
+# Arbitrary key for the PostgreSQL advisory lock held by exclusive jobs.
+EXCLUSIVE_JOB_LOCK = 7_420_374
+
+JOBS = {}
+EXCLUSIVE_JOBS = set()
+
+_exclusive = threading.Lock()
+
+
+def job(kind, exclusive=True):
+    """
+    Register a function as a job. Exclusive jobs rewrite tournament data
+    and never run at the same time as each other, in any worker.
+    """
+
+    def register(func):
+        JOBS[kind] = func
+        if exclusive:
+            EXCLUSIVE_JOBS.add(kind)
+        return func
+
+    return register
+
+
+def enqueue(kind, payload=None, user=None):
+    if kind not in JOBS:
+        raise ValueError(f"Unknown job: {kind}")
+    return Job.objects.create(kind=kind, payload=payload or {}, user=user)
+
+
+def fail_stale_jobs():
+    """
+    Fail jobs whose worker died. Their work ran in a transaction, so it was
+    rolled back with the connection.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+    return Job.objects.filter(status=Job.RUNNING, started_at__lt=cutoff).update(
+        status=Job.FAILED,
+        error="The worker stopped before the job finished.",
+        finished_at=timezone.now(),
+    )
+
+
+def claim_job():
+    """
+    Mark the oldest queued job as running and return it. The conditional
+    UPDATE lets any number of threads and processes poll the same queue
+    without a broker or row locks; only one of them wins each job.
+    """
+    queued = Job.objects.filter(status=Job.QUEUED).values_list("id", flat=True)
+    for job_id in queued[:10]:
+        claimed = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    func = JOBS.get(job.kind)
+    try:
+        if func is None:
+            raise ValueError(f"Unknown job: {job.kind}")
+        # SQLite has a single writer, so its jobs queue up behind each other.
+        if job.kind in EXCLUSIVE_JOBS or connection.vendor == "sqlite":
+            with _exclusive, transaction.atomic():
+                if connection.vendor == "postgresql":
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT pg_advisory_xact_lock(%s)", [EXCLUSIVE_JOB_LOCK]
+                        )
+                job.result = func(**job.payload)
+        else:
+            with transaction.atomic():
+                job.result = func(**job.payload)
+        job.status = Job.SUCCEEDED
+    except Exception as e:
+        job.status = Job.FAILED
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "result", "error", "finished_at"])
+    return job
+
+
+def run_next_job():
+    job = claim_job()
+    if job is not None:
+        run_job(job)
+    return job
+
+
+@job("create_groups")
+def create_groups_job(groups, tables):
+    return TournamentGroupSerializer(create_groups(groups, tables), many=True).data
+
+
+@job("create_swiss_stage")
+def create_swiss_stage_job(rounds, tables):
+    create_swiss_stage(rounds, tables)
+    return {"message": f"Swiss stage of {rounds} rounds created."}
+
+
+@job("generate_knockout_stage")
+def generate_knockout_stage_job(seeding="standings"):
+    generate_knockout_stage(seeding)
+    return {"message": "Knockout stage generated successfully."}
+
+
+@job("reset_tournament")
+def reset_tournament_job():
+    reset_tournament()
+    return {"message": "Tournament reset successful."}
+
+
+@job("recompute_ratings")
+def recompute_ratings_job():
+    return recompute_ratings()
+
+
+@job("export_tournament", exclusive=False)
+def export_tournament():
+    """The whole tournament as JSON, for archiving."""
+    return {
+        "exported_at": timezone.now().isoformat(),
+        "teams": TeamSerializer(Team.objects.order_by("id"), many=True).data,
+        "standings": [
+            {
+                "group": group.name,
+                "standings": [
+                    {
+                        "team": stats["team"].name,
+                        "points": stats["points"],
+                        "cups_scored": stats["cups_scored"],
+                        "cups_conceded": stats["cups_conceded"],
+                        "played": stats["played"],
+                    }
+                    for stats in standings
+                ],
+            }
+            for group, standings in compute_group_tables()
+        ],
+        "games": GameSerializer(
+            Game.objects.order_by("id").select_related("group", "team1", "team2"),
+            many=True,
+        ).data,
+        "knockout_games": KnockoutGameSerializer(
+            KnockoutGame.objects.order_by("id").select_related("team1", "team2"),
+            many=True,
+        ).data,
+    }
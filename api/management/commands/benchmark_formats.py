@@ -0,0 +1,63 @@
+import io
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from api.benchmarks import admin_client, benchmark_database, seed_tournament
+from api.formats import CBORParser, CBORRenderer, MessagePackParser, MessagePackRenderer
+
+FORMATS = [
+    ("json", JSONRenderer(), JSONParser()),
+    ("msgpack", MessagePackRenderer(), MessagePackParser()),
+    ("cbor", CBORRenderer(), CBORParser()),
+]
+
+ENDPOINTS = [
+    ("groups/standings/", "/api/v1/groups/standings/"),
+    ("games/", "/api/v1/games/"),
+]
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = "Compare payload size and encode/decode time of the wire formats."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teams", type=int, default=256)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_tournament(options["teams"], played=0.5)
+            client = admin_client()
+            rows = []
+            for label, url in ENDPOINTS:
+                for name, renderer, parser in FORMATS:
+                    response = client.get(url, HTTP_ACCEPT=renderer.media_type)
+                    if response["Content-Type"].split(";")[0] != renderer.media_type:
+                        raise RuntimeError(f"{url} did not negotiate {name}")
+
+                    data = response.data
+                    body = response.content
+                    encode = best_of(options["repeat"], lambda: renderer.render(data))
+                    decode = best_of(
+                        options["repeat"], lambda: parser.parse(io.BytesIO(body))
+                    )
+                    rows.append((f"{label} ({name})", len(body), encode, decode))
+
+        width = max(len(row[0]) for row in rows)
+        self.stdout.write(
+            f"{'endpoint'.ljust(width)}  {'bytes':>9}  {'encode ms':>9}  {'decode ms':>9}"
+        )
+        for label, size, encode, decode in rows:
+            self.stdout.write(
+                f"{label.ljust(width)}  {size:>9}  {encode:>9.2f}  {decode:>9.2f}"
+            )
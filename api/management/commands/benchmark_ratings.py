@@ -0,0 +1,85 @@
+import random
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.benchmarks import benchmark_database, random_result
+from api.models import Player, PlayerStats, RatedResult
+from api.ratings import _rate, recompute_ratings, replay_ratings
+
+
+class Command(BaseCommand):
+    help = "Time a full rating recompute over a long result history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--games", type=int, default=100_000)
+        parser.add_argument("--players", type=int, default=2000)
+        parser.add_argument(
+            "--incremental",
+            type=int,
+            default=500,
+            help="Results rated one by one, to compare with the replay.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(1)
+        game_count = options["games"]
+
+        with benchmark_database():
+            players = Player.objects.bulk_create(
+                Player(name=f"Player {i:05d}") for i in range(options["players"])
+            )
+            PlayerStats.objects.bulk_create(
+                PlayerStats(player=player) for player in players
+            )
+            ids = [player.id for player in players]
+            results = []
+            for _ in range(game_count):
+                a, b, c, d = rng.sample(ids, 4)
+                results.append(([a, b], [c, d], *random_result(rng)))
+            RatedResult.objects.bulk_create(
+                (
+                    RatedResult(
+                        players1=players1,
+                        players2=players2,
+                        score1=score1,
+                        score2=score2,
+                    )
+                    for players1, players2, score1, score2 in results
+                ),
+                batch_size=2000,
+            )
+
+            start = time.perf_counter()
+            replay_ratings(results, settings.RATING_K)
+            replay = time.perf_counter() - start
+
+            start = time.perf_counter()
+            counts = recompute_ratings()
+            recompute = time.perf_counter() - start
+
+            # The incremental path must end where a replay of the same
+            # results ends.
+            sample = results[: options["incremental"]]
+            PlayerStats.objects.update(rating=1500)
+            start = time.perf_counter()
+            for result in sample:
+                _rate(*result)
+            incremental = time.perf_counter() - start
+            expected = replay_ratings(sample, settings.RATING_K)
+            actual = dict(
+                PlayerStats.objects.filter(player_id__in=expected).values_list(
+                    "player_id", "rating"
+                )
+            )
+            drift = max(abs(actual[p] - expected[p]) for p in expected)
+
+        self.stdout.write(f"{game_count} results, {options['players']} players")
+        self.stdout.write(f"replay in memory          {replay * 1000:>9.1f} ms")
+        self.stdout.write(
+            f"recompute_ratings()       {recompute * 1000:>9.1f} ms "
+            f"({counts['updated']} players updated)"
+        )
+        self.stdout.write(
+            f"incremental, per result   {incremental / len(sample) * 1000:>9.2f} ms"
+        )
+        self.stdout.write(f"incremental vs replay     {drift:>12.2e}")
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from api.benchmarks import benchmark_database, measure, seed_tournament, write_report
+from api.models import Game, KnockoutGame, ScoreEvent, Team, TournamentGroup
+from api.utils import delete_team, generate_knockout_stage, reset_tournament
+
+
+def collector_reset():
+    """The previous ResetTournamentView body, kept for comparison."""
+    KnockoutGame.objects.all().delete()
+    Game.objects.all().delete()
+    TournamentGroup.objects.all().delete()
+    Team.objects.all().delete()
+
+
+def collector_delete_team(team_id):
+    Team.objects.get(id=team_id).delete()
+
+
+class Command(BaseCommand):
+    help = "Compare the set-based reset and team delete with Django's collector."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teams", type=int, default=256)
+
+    def handle(self, *args, **options):
+        team_count = options["teams"]
+        rows = []
+
+        with benchmark_database():
+            for label, reset in (
+                ("reset: deletion collector", collector_reset),
+                ("reset: set-based", reset_tournament),
+            ):
+                self.seed(team_count)
+                _, elapsed, queries = measure(reset)
+                rows.append((f"{label} ({team_count} teams)", elapsed, queries))
+
+            for label, delete in (
+                ("delete team: deletion collector", collector_delete_team),
+                ("delete team: set-based", delete_team),
+            ):
+                self.seed(team_count)
+                team_id = KnockoutGame.objects.values_list("team1", flat=True)[0]
+                _, elapsed, queries = measure(delete, team_id)
+                rows.append((label, elapsed, queries))
+
+        write_report(self.stdout, rows)
+
+    @staticmethod
+    def seed(team_count):
+        reset_tournament()
+        seed_tournament(team_count)
+        generate_knockout_stage()
+        ScoreEvent.objects.bulk_create(
+            ScoreEvent(
+                game_id=game_id,
+                score_team1=score_team1,
+                score_team2=score_team2,
+                played=True,
+            )
+            for game_id, score_team1, score_team2 in Game.objects.values_list(
+                "id", "score_team1", "score_team2"
+            )
+        )
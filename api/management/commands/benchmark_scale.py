@@ -0,0 +1,154 @@
+import random
+from django.core.management.base import BaseCommand
+from api.benchmarks import (
+    admin_client,
+    benchmark_database,
+    measure,
+    random_result,
+    write_report,
+)
+from api.models import ChangeLogEntry, Game, KnockoutGame, Team
+
+
+class Command(BaseCommand):
+    help = "Time every tournament step through the API at a large team count."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teams", type=int, default=256)
+        parser.add_argument("--group-size", type=int, default=4)
+        parser.add_argument("--tables", type=int, default=20)
+        parser.add_argument("--runs", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            rows = self.run(
+                options["teams"],
+                options["group_size"],
+                options["tables"],
+                options["runs"],
+            )
+        write_report(self.stdout, rows)
+
+    def run(self, team_count, group_size, tables, runs):
+        rng = random.Random(1)
+        client = admin_client()
+        rows = []
+
+        def step(label, func, *args, **kwargs):
+            response, elapsed, queries = measure(func, *args, **kwargs)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{label} failed: {response.data}")
+            rows.append((label, elapsed, queries))
+            return response
+
+        step(
+            "PATCH tournament/settings/",
+            client.patch,
+            "/api/v1/tournament/settings/",
+            {"max_teams": team_count, "group_size": group_size},
+            format="json",
+        )
+
+        for i in range(team_count):
+            data = {
+                "name": f"Team {i:04d}",
+                "member_one": f"Player {i:04d}A",
+                "member_two": f"Player {i:04d}B",
+            }
+            if i < team_count - 1:
+                client.post("/api/v1/teams/", data, format="json")
+            else:
+                step(
+                    f"POST teams/ (team {team_count})",
+                    client.post,
+                    "/api/v1/teams/",
+                    data,
+                    format="json",
+                )
+
+        team_ids = list(Team.objects.order_by("id").values_list("id", flat=True))
+        groups = [
+            team_ids[i : i + group_size] for i in range(0, team_count, group_size)
+        ]
+        step(
+            "POST groups/bulk/",
+            client.post,
+            "/api/v1/groups/bulk/",
+            {"groups": groups, "tables": tables},
+            format="json",
+        )
+
+        games = list(Game.objects.order_by("id").values_list("id", flat=True))
+        half = len(games) // 2
+        for game_id in games[:half]:
+            self.play(client, f"/api/v1/games/{game_id}/", rng)
+
+        step(
+            "GET groups/standings/ (half played)",
+            client.get,
+            "/api/v1/groups/standings/",
+        )
+        step(
+            f"GET groups/qualification/ ({runs} runs)",
+            client.get,
+            f"/api/v1/groups/qualification/?runs={runs}",
+        )
+
+        for game_id in games[half:-1]:
+            self.play(client, f"/api/v1/games/{game_id}/", rng)
+        sequence = ChangeLogEntry.objects.order_by("-id").values_list("id", flat=True)[
+            0
+        ]
+        step("PATCH games/<id>/", self.play, client, f"/api/v1/games/{games[-1]}/", rng)
+
+        step(
+            "GET sync/ (one game changed)",
+            client.get,
+            f"/api/v1/sync/?since={sequence}",
+        )
+        step(
+            "GET sync/ (no changes)",
+            client.get,
+            f"/api/v1/sync/?since={sequence + 1}",
+        )
+
+        step("GET games/", client.get, "/api/v1/games/")
+        step("GET groups/", client.get, "/api/v1/groups/")
+        step("GET groups/standings/", client.get, "/api/v1/groups/standings/")
+        step("POST ko-stage/generate/", client.post, "/api/v1/ko-stage/generate/")
+
+        while True:
+            current = (
+                KnockoutGame.objects.order_by("-id")
+                .values_list("round", flat=True)
+                .first()
+            )
+            for game in KnockoutGame.objects.filter(round=current, played=False):
+                self.play(client, f"/api/v1/ko-stage/{game.id}/", rng)
+            if current == "F":
+                break
+            next_round = self.next_round(current)
+            step(
+                f"POST ko-stage/next-round/ ({current} -> {next_round})",
+                client.post,
+                "/api/v1/ko-stage/next-round/",
+                {"current_round": current, "next_round": next_round},
+                format="json",
+            )
+
+        step("GET ko-stage/", client.get, "/api/v1/ko-stage/")
+        return rows
+
+    @staticmethod
+    def play(client, url, rng):
+        score_team1, score_team2 = random_result(rng)
+        return client.patch(
+            url,
+            {"score_team1": score_team1, "score_team2": score_team2, "played": True},
+            format="json",
+        )
+
+    @staticmethod
+    def next_round(current):
+        codes = [code for code, _ in KnockoutGame.ROUND_CHOICES]
+        return codes[codes.index(current) + 1]
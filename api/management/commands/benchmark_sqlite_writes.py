@@ -0,0 +1,124 @@
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from api.benchmarks import benchmark_database, random_result, seed_tournament
+from api.models import Game
+from api.score_events import record_score_event, score_state
+from api.writes import serialized_write
+
+# Django's SQLite defaults: rollback journal, deferred transactions and a
+# five second busy timeout.
+DEFAULT_OPTIONS = {"init_command": "PRAGMA journal_mode=DELETE"}
+
+
+def write_score(game_id, result, user):
+    """
+    One referee submitting a result, as save_score() does: the previous
+    score comes from the row locked inside the write.
+    """
+    game = Game.objects.select_for_update().get(pk=game_id)
+    previous = score_state(game)
+    game.score_team1, game.score_team2 = result
+    game.played = True
+    game.save(update_fields=["score_team1", "score_team2", "played"])
+    record_score_event(game, previous, user)
+
+
+def atomic_write(*args):
+    """The previous write path, kept for comparison."""
+    with transaction.atomic():
+        write_score(*args)
+
+
+def offline_write(*args):
+    serialized_write(write_score, *args)
+
+
+class Command(BaseCommand):
+    help = "Run concurrent score writers against an SQLite file database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=16)
+        parser.add_argument("--writes", type=int, default=25, help="Per writer.")
+        parser.add_argument("--teams", type=int, default=64)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("This benchmark needs the SQLite database.")
+
+        writers, writes = options["writers"], options["writes"]
+        offline_options = connection.settings_dict["OPTIONS"]
+        rows = []
+
+        with tempfile.TemporaryDirectory() as directory:
+            # A file, not the in-memory test database: locking and the
+            # journal mode only matter on disk.
+            connection.settings_dict["TEST"]["NAME"] = str(
+                Path(directory) / "benchmark.sqlite3"
+            )
+            with benchmark_database():
+                seed_tournament(options["teams"], played=0)
+                user = User.objects.create_user(username="referee")
+                game_ids = list(Game.objects.values_list("id", flat=True))
+
+                for label, database_options, write in (
+                    ("Django defaults", DEFAULT_OPTIONS, atomic_write),
+                    ("WAL, IMMEDIATE, busy timeout", offline_options, atomic_write),
+                    ("offline mode", offline_options, offline_write),
+                ):
+                    connection.settings_dict["OPTIONS"] = database_options
+                    connections.close_all()
+                    rows.append(
+                        (label, *self.burst(write, game_ids, user, writers, writes))
+                    )
+
+            connection.settings_dict["OPTIONS"] = offline_options
+
+        self.stdout.write(f"{writers} writers, {writes} score updates each")
+        width = max(len(row[0]) for row in rows)
+        self.stdout.write(
+            f"{'mode'.ljust(width)}  {'errors':>6}  "
+            f"{'writes/s':>8}  {'p50 ms':>8}  {'p95 ms':>8}"
+        )
+        for label, errors, throughput, p50, p95 in rows:
+            self.stdout.write(
+                f"{label.ljust(width)}  {errors:>6}  "
+                f"{throughput:>8.1f}  {p50:>8.1f}  {p95:>8.1f}"
+            )
+
+    @staticmethod
+    def burst(write, game_ids, user, writers, writes):
+        def writer(seed):
+            rng = random.Random(seed)
+            latencies, errors = [], 0
+            try:
+                for _ in range(writes):
+                    start = time.perf_counter()
+                    try:
+                        write(rng.choice(game_ids), random_result(rng), user)
+                    except Exception:
+                        errors += 1
+                    latencies.append((time.perf_counter() - start) * 1000)
+            finally:
+                connections.close_all()
+            return latencies, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            results = list(pool.map(writer, range(writers)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(value for values, _ in results for value in values)
+        errors = sum(count for _, count in results)
+        return (
+            errors,
+            (len(latencies) - errors) / elapsed,
+            statistics.median(latencies),
+            latencies[int(len(latencies) * 0.95) - 1],
+        )
@@ -0,0 +1,76 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from api.benchmarks import (
+    benchmark_database,
+    measure,
+    random_result,
+    seed_teams,
+    write_report,
+)
+from api.models import Game
+from api.swiss import (
+    create_swiss_stage,
+    default_rounds,
+    max_rounds,
+    pair_next_round,
+    pair_round,
+)
+
+
+class Command(BaseCommand):
+    help = "Time the pairing of every round of a Swiss stage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teams", type=int, default=256)
+        parser.add_argument("--tables", type=int, default=20)
+
+    def handle(self, *args, **options):
+        team_count, tables = options["teams"], options["tables"]
+        rounds = default_rounds(team_count)
+        rng = random.Random(1)
+        rows = []
+
+        with benchmark_database():
+            seed_teams(team_count)
+            _, elapsed, queries = measure(create_swiss_stage, rounds, tables)
+            rows.append((f"round 1 ({team_count} teams)", elapsed, queries))
+
+            for round_number in range(2, rounds + 1):
+                games = list(Game.objects.filter(played=False))
+                for game in games:
+                    game.score_team1, game.score_team2 = random_result(rng)
+                    game.played = True
+                Game.objects.bulk_update(
+                    games, ["score_team1", "score_team2", "played"]
+                )
+                _, elapsed, queries = measure(pair_next_round, tables)
+                rows.append((f"round {round_number}", elapsed, queries))
+
+        # Late rounds leave few opponents to choose from, which is where a
+        # pairing search gets slow. Pair in memory up to the last round
+        # that is always possible and report the slowest one.
+        points = dict.fromkeys(range(team_count), 0)
+        opponents = {team: set() for team in points}
+        had_bye = set()
+        slowest = 0
+        for _ in range(max_rounds(team_count)):
+            ranking = sorted(points, key=lambda team: (-points[team], team))
+            start = time.perf_counter()
+            pairs, bye = pair_round(ranking, opponents, had_bye)
+            slowest = max(slowest, (time.perf_counter() - start) * 1000)
+
+            for team1, team2 in pairs:
+                if team2 in opponents[team1]:
+                    raise RuntimeError(f"Rematch between {team1} and {team2}.")
+                opponents[team1].add(team2)
+                opponents[team2].add(team1)
+                points[rng.choice((team1, team2))] += 3
+            if bye is not None:
+                had_bye.add(bye)
+                points[bye] += 3
+        rows.append(
+            (f"slowest of {max_rounds(team_count)} rounds, in memory", slowest, 0)
+        )
+
+        write_report(self.stdout, rows)
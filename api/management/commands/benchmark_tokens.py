@@ -0,0 +1,88 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from api.benchmarks import benchmark_database
+from api.hashing import warm_pool
+
+PASSWORD = "check-in-2024"
+
+
+class Command(BaseCommand):
+    help = "Measure token issuance throughput of one worker during a login burst."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=200)
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Request threads of the simulated worker (gunicorn --threads).",
+        )
+        parser.add_argument(
+            "--pool", type=int, default=settings.PASSWORD_HASH_WORKERS or 2
+        )
+
+    def handle(self, *args, **options):
+        logins, threads = options["logins"], options["threads"]
+        rows = []
+
+        with benchmark_database():
+            encoded = make_password(PASSWORD)
+            User.objects.bulk_create(
+                User(username=f"player{i:04d}", password=encoded) for i in range(logins)
+            )
+
+            for label, workers in (
+                ("inline hashing", 0),
+                (f"process pool ({options['pool']})", options["pool"]),
+            ):
+                with override_settings(PASSWORD_HASH_WORKERS=workers):
+                    warm_pool()
+                    rows.append((label, *self.burst(logins, threads)))
+
+        self.stdout.write(
+            f"{logins} logins, {threads} request threads, "
+            f"{settings.PASSWORD_HASH_ITERATIONS} PBKDF2 iterations"
+        )
+        width = max(len(row[0]) for row in rows)
+        self.stdout.write(
+            f"{'mode'.ljust(width)}  {'tokens/s':>9}  {'p50 ms':>8}  {'p95 ms':>8}"
+        )
+        for label, throughput, p50, p95 in rows:
+            self.stdout.write(
+                f"{label.ljust(width)}  {throughput:>9.1f}  {p50:>8.1f}  {p95:>8.1f}"
+            )
+
+    @staticmethod
+    def burst(logins, threads):
+        def login(i):
+            start = time.perf_counter()
+            try:
+                response = APIClient().post(
+                    "/api/v1/token/",
+                    {"username": f"player{i:04d}", "password": PASSWORD},
+                    format="json",
+                )
+            finally:
+                connections.close_all()
+            if response.status_code != 200:
+                raise RuntimeError(f"Login failed: {response.data}")
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = sorted(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - start
+
+        return (
+            logins / elapsed,
+            statistics.median(latencies),
+            latencies[int(len(latencies) * 0.95) - 1],
+        )
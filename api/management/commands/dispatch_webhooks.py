@@ -0,0 +1,71 @@
+import signal
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api.webhooks import claim_batches, prune_deliveries, record_result, send_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver queued webhook events in signed batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.WEBHOOK_CONCURRENCY
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=settings.WEBHOOK_POLL_INTERVAL
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when nothing is due.",
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        pruned = prune_deliveries()
+        if pruned:
+            self.stdout.write(f"Pruned {pruned} old deliveries.")
+
+        # Only the HTTP requests run on the pool; all database access stays
+        # on this thread. At most `concurrency` receivers are contacted at
+        # once, each with one batch at a time. As soon as any of them
+        # answers, its result is recorded and its slot goes to the next
+        # receiver with due events, so a slow one only holds up itself.
+        concurrency = options["concurrency"]
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                close_old_connections()
+                if not stop.is_set() and len(in_flight) < concurrency:
+                    busy = [subscription.id for subscription, _ in in_flight.values()]
+                    for subscription, deliveries in claim_batches(
+                        busy=busy, subscriptions=concurrency - len(in_flight)
+                    ):
+                        future = pool.submit(send_batch, subscription, deliveries)
+                        in_flight[future] = (subscription, deliveries)
+
+                if not in_flight:
+                    if stop.is_set() or options["once"]:
+                        break
+                    stop.wait(options["poll_interval"])
+                    continue
+
+                done, _ = wait(
+                    in_flight,
+                    timeout=options["poll_interval"],
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    subscription, deliveries = in_flight.pop(future)
+                    error = future.result()
+                    record_result(deliveries, error)
+                    outcome = error or "delivered"
+                    self.stdout.write(
+                        f"{len(deliveries)} event(s) to {subscription}: {outcome}"
+                    )
@@ -0,0 +1,103 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_TIME = re.compile(r"import time:\s+(\d+)\s+\|\s+\d+\s+\|\s+(\S+)")
+
+# Runs in a fresh interpreter so that nothing is imported or connected yet.
+CHILD = """
+import json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+
+timings = []
+
+def phase(label, func):
+    start = time.perf_counter()
+    result = func()
+    timings.append((label, (time.perf_counter() - start) * 1000))
+    return result
+
+def get(path):
+    environ = {"PATH_INFO": path, "HTTP_HOST": "localhost"}
+    setup_testing_defaults(environ)
+    return b"".join(application(environ, lambda status, headers: None))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+import django
+
+phase("django.setup()", django.setup)
+
+if sys.argv[1] == "warm":
+    from backend.warmup import warm_up
+    phase("warm_up()", warm_up)
+
+from django.core.wsgi import get_wsgi_application
+application = phase("get_wsgi_application()", get_wsgi_application)
+
+for path in sys.argv[2:]:
+    phase(f"first GET {path}", lambda: get(path))
+    phase(f"second GET {path}", lambda: get(path))
+
+print(json.dumps(timings))
+"""
+
+
+class Command(BaseCommand):
+    help = "Report import time per package and the cost of the first requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Request path to time (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or ["/", "/api/v1/groups/standings/"]
+
+        for mode in ("cold", "warm"):
+            imports, timings = self.profile(mode, paths)
+            self.stdout.write(f"\n{mode} start")
+            for label, elapsed in timings:
+                self.stdout.write(f"  {label:<45} {elapsed:>9.1f} ms")
+
+            if mode == "cold":
+                total = sum(imports.values()) / 1000
+                self.stdout.write(f"\nimport time by package (total {total:.1f} ms)")
+                ranked = sorted(imports.items(), key=lambda item: -item[1])
+                for package, micros in ranked[: options["top"]]:
+                    self.stdout.write(f"  {package:<45} {micros / 1000:>9.1f} ms")
+
+    @staticmethod
+    def profile(mode, paths):
+        env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD, mode, *paths],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            errors = [
+                line
+                for line in result.stderr.splitlines()
+                if "import time:" not in line
+            ]
+            raise CommandError("\n".join(errors[-20:]))
+
+        imports = defaultdict(int)
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME.match(line)
+            if match:
+                imports[match.group(2).lstrip(".").split(".")[0]] += int(match.group(1))
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        return imports, timings
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from api.score_events import (
+    REPLAY_BATCH_SIZE,
+    rebuild_score_projections,
+    take_score_snapshot,
+)
+
+
+class Command(BaseCommand):
+    help = "Replay the score event log onto games and knockout games."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=REPLAY_BATCH_SIZE)
+        parser.add_argument(
+            "--snapshot",
+            action="store_true",
+            help="Store a snapshot of the replayed state afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        changed = rebuild_score_projections(options["batch_size"])
+        self.stdout.write(f"{changed} games differed from the score log.")
+
+        if options["snapshot"]:
+            snapshot = take_score_snapshot()
+            if snapshot is not None:
+                self.stdout.write(
+                    f"Snapshot stored after event {snapshot.last_event_id}."
+                )
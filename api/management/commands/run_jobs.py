@@ -0,0 +1,55 @@
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from api.jobs import fail_stale_jobs, run_next_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs on a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=settings.JOB_WORKER_THREADS)
+        parser.add_argument(
+            "--poll-interval", type=float, default=settings.JOB_POLL_INTERVAL
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit as soon as the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        failed = fail_stale_jobs()
+        if failed:
+            self.stderr.write(f"Marked {failed} stale job(s) as failed.")
+
+        self.stdout.write(f"Running jobs on {options['threads']} thread(s).")
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            workers = [
+                pool.submit(self.work, stop, options["poll_interval"], options["once"])
+                for _ in range(options["threads"])
+            ]
+            for worker in workers:
+                worker.result()
+
+    def work(self, stop, poll_interval, once):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                job = run_next_job()
+                if job is not None:
+                    self.stdout.write(f"{job} in {job.finished_at - job.started_at}")
+                elif once:
+                    return
+                else:
+                    stop.wait(poll_interval)
+        finally:
+            # Every thread has its own connection.
+            connection.close()
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_alter_knockoutgame_round"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="slot",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="game",
+            name="table",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["slot", "table"], name="api_game_slot_3a3119_idx"
+            ),
+        ),
+    ]
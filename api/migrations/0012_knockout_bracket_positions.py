@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_game_table_slot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="knockoutgame",
+            name="position",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="knockoutgame",
+            name="round",
+            field=models.CharField(
+                choices=[
+                    ("R128", "Round of 128"),
+                    ("R64", "Round of 64"),
+                    ("R32", "Round of 32"),
+                    ("R16", "Round of 16"),
+                    ("QF", "Quarter Final"),
+                    ("SF", "Semi Final"),
+                    ("F", "Grand Final"),
+                ],
+                max_length=4,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="knockoutgame",
+            name="team2",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="ko_games_as_team2",
+                to="api.team",
+            ),
+        ),
+    ]
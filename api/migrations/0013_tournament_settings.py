@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_knockout_bracket_positions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TournamentSettings",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("max_teams", models.PositiveIntegerField(default=32)),
+                ("group_size", models.PositiveIntegerField(default=4)),
+                ("knockout_rounds", models.PositiveIntegerField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name_plural": "tournament settings",
+            },
+        ),
+        migrations.AlterField(
+            model_name="knockoutgame",
+            name="round",
+            field=models.CharField(
+                choices=[
+                    ("R256", "Round of 256"),
+                    ("R128", "Round of 128"),
+                    ("R64", "Round of 64"),
+                    ("R32", "Round of 32"),
+                    ("R16", "Round of 16"),
+                    ("QF", "Quarter Final"),
+                    ("SF", "Semi Final"),
+                    ("F", "Grand Final"),
+                ],
+                max_length=4,
+            ),
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_tournament_settings"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScoreEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score_team1", models.PositiveIntegerField(blank=True, null=True)),
+                ("score_team2", models.PositiveIntegerField(blank=True, null=True)),
+                ("played", models.BooleanField(default=False)),
+                (
+                    "previous_score_team1",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                (
+                    "previous_score_team2",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                ("previous_played", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "game",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="score_events",
+                        to="api.game",
+                    ),
+                ),
+                (
+                    "knockout_game",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="score_events",
+                        to="api.knockoutgame",
+                    ),
+                ),
+                (
+                    "reverts",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="reverted_by",
+                        to="api.scoreevent",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ScoreSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("state", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "last_event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="api.scoreevent",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="scoreevent",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    models.Q(("game__isnull", False), ("knockout_game__isnull", True)),
+                    models.Q(("game__isnull", True), ("knockout_game__isnull", False)),
+                    _connector="OR",
+                ),
+                name="score_event_single_target",
+            ),
+        ),
+    ]
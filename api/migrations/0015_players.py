@@ -0,0 +1,125 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_players(apps, schema_editor):
+    Game = apps.get_model("api", "Game")
+    KnockoutGame = apps.get_model("api", "KnockoutGame")
+    Player = apps.get_model("api", "Player")
+    PlayerStats = apps.get_model("api", "PlayerStats")
+    Team = apps.get_model("api", "Team")
+
+    totals = {}
+    for team in Team.objects.all():
+        players = []
+        for name in (team.member_one, team.member_two):
+            player, _ = Player.objects.get_or_create(name=name)
+            players.append(player)
+        team.players.set(players)
+        totals[team.id] = ([0, 0, 0, 0, 0], players)
+
+    for model, knockout in ((Game, False), (KnockoutGame, True)):
+        for game in model.objects.filter(played=True, team2__isnull=False):
+            sides = (
+                (game.team1_id, game.score_team1, game.score_team2),
+                (game.team2_id, game.score_team2, game.score_team1),
+            )
+            for team_id, scored, conceded in sides:
+                if scored is None or conceded is None:
+                    continue
+                stats = totals[team_id][0]
+                stats[0] += 1
+                stats[1] += int(scored > conceded)
+                stats[2] += scored
+                stats[3] += conceded
+                stats[4] += int(knockout)
+
+    stats_by_player = {}
+    for stats, players in totals.values():
+        for player in players:
+            current = stats_by_player.setdefault(player.id, [0, 0, 0, 0, 0])
+            for i, value in enumerate(stats):
+                current[i] += value
+
+    PlayerStats.objects.bulk_create(
+        PlayerStats(
+            player_id=player_id,
+            games=games,
+            wins=wins,
+            cups_scored=cups_scored,
+            cups_conceded=cups_conceded,
+            knockout_appearances=knockout_appearances,
+        )
+        for player_id, (
+            games,
+            wins,
+            cups_scored,
+            cups_conceded,
+            knockout_appearances,
+        ) in stats_by_player.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_score_events"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Player",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=20, unique=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="players",
+            field=models.ManyToManyField(
+                blank=True, related_name="teams", to="api.player"
+            ),
+        ),
+        migrations.CreateModel(
+            name="PlayerStats",
+            fields=[
+                (
+                    "player",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="api.player",
+                    ),
+                ),
+                ("games", models.PositiveIntegerField(default=0)),
+                ("wins", models.PositiveIntegerField(default=0)),
+                ("cups_scored", models.PositiveIntegerField(default=0)),
+                ("cups_conceded", models.PositiveIntegerField(default=0)),
+                ("knockout_appearances", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "player stats",
+                "indexes": [
+                    models.Index(
+                        fields=["-wins", "-cups_scored", "player"],
+                        name="player_leaderboard_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_players, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_idempotency_records"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLogEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entity",
+                    models.CharField(
+                        choices=[
+                            ("game", "Game"),
+                            ("knockout_game", "Knockout game"),
+                            ("group", "Group"),
+                            ("reset", "Reset"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("entity_id", models.PositiveBigIntegerField(default=0)),
+                ("deleted", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name_plural": "change log entries",
+                "ordering": ["id"],
+            },
+        ),
+    ]
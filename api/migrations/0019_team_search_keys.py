@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:02
+
+import unicodedata
+
+from django.db import migrations, models
+
+SEARCH_KEYS = ("name_key", "member_one_key", "member_two_key")
+
+
+def search_key(value):
+    # A copy of api.models.search_key as it was when this migration was
+    # written, so that later changes to the model code do not alter it.
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return stripped.casefold().strip()
+
+
+def backfill_search_keys(apps, schema_editor):
+    Team = apps.get_model("api", "Team")
+
+    teams = list(Team.objects.all())
+    for team in teams:
+        team.name_key = search_key(team.name)
+        team.member_one_key = search_key(team.member_one)
+        team.member_two_key = search_key(team.member_two)
+    Team.objects.bulk_update(teams, SEARCH_KEYS, batch_size=1000)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Substring search only has an index on PostgreSQL. Other databases
+    # fall back to scanning the short key columns.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for field in SEARCH_KEYS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS api_team_{field}_trgm "
+            f"ON api_team USING gin ({field} gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in SEARCH_KEYS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS api_team_{field}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0018_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="team",
+            name="name_key",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=60
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="member_one_key",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=60
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="team",
+            name="member_two_key",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=60
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
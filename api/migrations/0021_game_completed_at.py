@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_completed_at(apps, schema_editor):
+    # A game was finished when it was first marked as played; corrections
+    # later on keep that time. The best record of it is the first score
+    # event that marked the game as played. Games scored without events keep
+    # NULL and sort first, by id.
+    Game = apps.get_model("api", "Game")
+    ScoreEvent = apps.get_model("api", "ScoreEvent")
+
+    finished = (
+        ScoreEvent.objects.filter(game=OuterRef("pk"), played=True)
+        .order_by("id")
+        .values("created_at")[:1]
+    )
+    Game.objects.filter(played=True).update(completed_at=Subquery(finished))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0020_webhooks"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="completed_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["completed_at", "id"], name="game_completion_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
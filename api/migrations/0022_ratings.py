@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0021_game_completed_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="playerstats",
+            name="rating",
+            field=models.FloatField(default=1500),
+        ),
+        migrations.CreateModel(
+            name="RatedResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("players1", models.JSONField()),
+                ("players2", models.JSONField()),
+                ("score1", models.PositiveIntegerField()),
+                ("score2", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "game",
+                    models.OneToOneField(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="rated_result",
+                        to="api.game",
+                    ),
+                ),
+                (
+                    "knockout_game",
+                    models.OneToOneField(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="rated_result",
+                        to="api.knockoutgame",
+                    ),
+                ),
+            ],
+        ),
+    ]
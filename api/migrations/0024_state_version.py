@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:53
+
+from django.db import migrations, models
+
+
+def create_state_version(apps, schema_editor):
+    StateVersion = apps.get_model("api", "StateVersion")
+    StateVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0023_swiss_stage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StateVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(create_state_version, migrations.RunPython.noop),
+    ]
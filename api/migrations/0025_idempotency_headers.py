@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0024_state_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencyrecord",
+            name="headers",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,4 +1,14 @@
+import unicodedata
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+
+def search_key(value):
+    """Lowercase `value` and strip accents so that "Émile" matches "emi"."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return stripped.casefold().strip()
 
 
 class Game(models.Model):
@@ -14,20 +24,98 @@ class Game(models.Model):
     score_team1 = models.PositiveIntegerField(null=True, blank=True)
     score_team2 = models.PositiveIntegerField(null=True, blank=True)
     played = models.BooleanField(default=False)
+    table = models.PositiveIntegerField(null=True, blank=True)
+    slot = models.PositiveIntegerField(null=True, blank=True)
+    # When the game was first marked as played; orders the results for the
+    # standings timeline. Score corrections keep the original time.
+    completed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Round of a Swiss stage game; empty for round-robin group games.
+    swiss_round = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
         unique_together = ("group", "team1", "team2")
+        indexes = [
+            models.Index(fields=["slot", "table"]),
+            models.Index(fields=["completed_at", "id"], name="game_completion_idx"),
+        ]
+
+    def update_completed_at(self):
+        if not self.played:
+            self.completed_at = None
+        elif self.completed_at is None:
+            self.completed_at = timezone.now()
+
+    def save(self, *args, **kwargs):
+        self.update_completed_at()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "completed_at"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.team1} vs {self.team2} (Group {self.group.id})"
 
 
+class Player(models.Model):
+    name = models.CharField(max_length=20, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PlayerStats(models.Model):
+    player = models.OneToOneField(
+        Player, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    games = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    cups_scored = models.PositiveIntegerField(default=0)
+    cups_conceded = models.PositiveIntegerField(default=0)
+    knockout_appearances = models.PositiveIntegerField(default=0)
+    rating = models.FloatField(default=1500)
+
+    class Meta:
+        verbose_name_plural = "player stats"
+        indexes = [
+            models.Index(
+                fields=["-wins", "-cups_scored", "player"],
+                name="player_leaderboard_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"Stats for {self.player}"
+
+
 class Team(models.Model):
     name = models.CharField(max_length=20, unique=True)
     member_one = models.CharField(max_length=20, unique=True)
     member_two = models.CharField(max_length=20, unique=True)
+    players = models.ManyToManyField(Player, related_name="teams", blank=True)
+    # Normalized copies of the names above, indexed for search.
+    name_key = models.CharField(max_length=60, db_index=True, editable=False)
+    member_one_key = models.CharField(max_length=60, db_index=True, editable=False)
+    member_two_key = models.CharField(max_length=60, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def update_search_keys(self):
+        self.name_key = search_key(self.name)
+        self.member_one_key = search_key(self.member_one)
+        self.member_two_key = search_key(self.member_two)
+
+    def save(self, *args, **kwargs):
+        self.update_search_keys()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {
+                *update_fields,
+                "name_key",
+                "member_one_key",
+                "member_two_key",
+            }
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -35,6 +123,9 @@ class Team(models.Model):
 class TournamentGroup(models.Model):
     name = models.CharField(max_length=10, blank=True)
     teams = models.ManyToManyField(Team)
+    # Number of rounds when the group is a Swiss stage; empty for a
+    # round-robin group.
+    swiss_rounds = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
@@ -47,8 +138,28 @@ class TournamentGroup(models.Model):
         return self.name
 
 
+class SwissBye(models.Model):
+    """A round a team of a Swiss stage sat out, scored as a win."""
+
+    group = models.ForeignKey(
+        TournamentGroup, on_delete=models.CASCADE, related_name="byes"
+    )
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="byes")
+    round = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("group", "team")
+
+    def __str__(self):
+        return f"{self.team} (bye in round {self.round})"
+
+
 class KnockoutGame(models.Model):
     ROUND_CHOICES = [
+        ("R256", "Round of 256"),
+        ("R128", "Round of 128"),
+        ("R64", "Round of 64"),
+        ("R32", "Round of 32"),
         ("R16", "Round of 16"),
         ("QF", "Quarter Final"),
         ("SF", "Semi Final"),
@@ -59,12 +170,286 @@ class KnockoutGame(models.Model):
         Team, on_delete=models.CASCADE, related_name="ko_games_as_team1"
     )
     team2 = models.ForeignKey(
-        Team, on_delete=models.CASCADE, related_name="ko_games_as_team2"
+        Team,
+        on_delete=models.CASCADE,
+        related_name="ko_games_as_team2",
+        null=True,
+        blank=True,
     )
     score_team1 = models.PositiveIntegerField(null=True, blank=True)
     score_team2 = models.PositiveIntegerField(null=True, blank=True)
     played = models.BooleanField(default=False)
-    round = models.CharField(max_length=3, choices=ROUND_CHOICES)
+    round = models.CharField(max_length=4, choices=ROUND_CHOICES)
+    position = models.PositiveIntegerField(default=0)
+
+    @property
+    def winner(self):
+        if self.team2_id is None:
+            return self.team1
+        if not self.played or self.score_team1 == self.score_team2:
+            return None
+        return self.team1 if self.score_team1 > self.score_team2 else self.team2
 
     def __str__(self):
+        if self.team2_id is None:
+            return f"{self.get_round_display()}: {self.team1} (bye)"
         return f"{self.get_round_display()}: {self.team1} vs {self.team2}"
+
+
+class TournamentSettings(models.Model):
+    max_teams = models.PositiveIntegerField(default=32)
+    group_size = models.PositiveIntegerField(default=4)
+    knockout_rounds = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "tournament settings"
+
+    @classmethod
+    def load(cls):
+        tournament, _ = cls.objects.get_or_create(pk=1)
+        return tournament
+
+    def __str__(self):
+        return "Tournament settings"
+
+
+class StateVersion(models.Model):
+    """
+    A counter that every write to the tournament bumps. Cached responses are
+    keyed by it, and it lives in the database so that every worker process
+    and the job runner agree on it.
+    """
+
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"State version {self.version}"
+
+
+class ScoreEvent(models.Model):
+    game = models.ForeignKey(
+        Game,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="score_events",
+    )
+    knockout_game = models.ForeignKey(
+        KnockoutGame,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="score_events",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    score_team1 = models.PositiveIntegerField(null=True, blank=True)
+    score_team2 = models.PositiveIntegerField(null=True, blank=True)
+    played = models.BooleanField(default=False)
+    previous_score_team1 = models.PositiveIntegerField(null=True, blank=True)
+    previous_score_team2 = models.PositiveIntegerField(null=True, blank=True)
+    previous_played = models.BooleanField(default=False)
+    reverts = models.OneToOneField(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="reverted_by",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(game__isnull=False, knockout_game__isnull=True)
+                | models.Q(game__isnull=True, knockout_game__isnull=False),
+                name="score_event_single_target",
+            )
+        ]
+
+    @property
+    def target(self):
+        return self.game if self.game_id is not None else self.knockout_game
+
+    def __str__(self):
+        return f"Score event {self.id}: {self.target}"
+
+
+class ScoreSnapshot(models.Model):
+    last_event = models.ForeignKey(
+        ScoreEvent, on_delete=models.CASCADE, related_name="snapshots"
+    )
+    state = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Snapshot after score event {self.last_event_id}"
+
+
+class RatedResult(models.Model):
+    """
+    A result that counted towards the players' ratings. Unlike games, these
+    survive a tournament reset, so that ratings can be recomputed from the
+    full history. The id gives the order in which results were rated.
+    """
+
+    # No database constraint: tournament resets delete games with plain
+    # DELETE/TRUNCATE statements and detach these references first.
+    game = models.OneToOneField(
+        Game,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        related_name="rated_result",
+    )
+    knockout_game = models.OneToOneField(
+        KnockoutGame,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        related_name="rated_result",
+    )
+    # Player ids of each side.
+    players1 = models.JSONField()
+    players2 = models.JSONField()
+    score1 = models.PositiveIntegerField()
+    score2 = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Rated result {self.id}: {self.score1}-{self.score2}"
+
+
+class IdempotencyRecord(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="idempotency_records",
+    )
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    # These stay empty while the first request is still running.
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    body = models.JSONField(null=True, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="unique_idempotency_key_per_user"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.path})"
+
+
+class ChangeLogEntry(models.Model):
+    GAME = "game"
+    KNOCKOUT_GAME = "knockout_game"
+    GROUP = "group"
+    RESET = "reset"
+    ENTITY_CHOICES = [
+        (GAME, "Game"),
+        (KNOCKOUT_GAME, "Knockout game"),
+        (GROUP, "Group"),
+        (RESET, "Reset"),
+    ]
+
+    entity = models.CharField(max_length=16, choices=ENTITY_CHOICES)
+    entity_id = models.PositiveBigIntegerField(default=0)
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name_plural = "change log entries"
+
+    def __str__(self):
+        action = "deleted" if self.deleted else "changed"
+        return f"{self.id}: {self.entity} {self.entity_id} {action}"
+
+
+class Job(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["status", "id"])]
+
+    def __str__(self):
+        return f"Job {self.id}: {self.kind} ({self.status})"
+
+
+class WebhookSubscription(models.Model):
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64)
+    # Event names to deliver; empty means every event.
+    events = models.JSONField(default=list, blank=True)
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def wants(self, event):
+        return not self.events or event in self.events
+
+    def __str__(self):
+        return self.url
+
+
+class WebhookDelivery(models.Model):
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (DELIVERED, "Delivered"),
+        (FAILED, "Failed"),
+    ]
+
+    subscription = models.ForeignKey(
+        WebhookSubscription, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    event = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    lease = models.UUIDField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name_plural = "webhook deliveries"
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.event} to {self.subscription} ({self.status})"
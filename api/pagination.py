@@ -0,0 +1,139 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on the full `ordering` tuple, which must be unique.
+
+    DRF's CursorPagination positions its cursor on the first ordering field
+    only and skips ties with an OFFSET, so pages over many equal values get
+    slower and shift as rows change. Here the cursor holds the values of
+    every ordering field of the last row, and the next page starts right
+    after that row, one index range scan per page however deep it is.
+    """
+
+    ordering = ()
+    page_size = 25
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse, position = cursor if cursor is not None else (False, None)
+
+        ordering = [self._flip(field) if reverse else field for field in self.ordering]
+        if position is not None:
+            position = self.clean_position(queryset.model, position)
+            queryset = queryset.filter(self._after(position, ordering))
+        results = list(queryset.order_by(*ordering)[: page_size + 1])
+
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Stepped past the end: start over from the first page.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def encode_cursor(self, reverse, row):
+        position = [getattr(row, field.lstrip("-")) for field in self.ordering]
+        token = base64.urlsafe_b64encode(json.dumps([reverse, position]).encode())
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, token.decode()
+        )
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if token is None:
+            return None
+        try:
+            reverse, position = json.loads(base64.urlsafe_b64decode(token.encode()))
+        except (binascii.Error, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(reverse, bool) or not (
+            isinstance(position, list) and len(position) == len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def clean_position(self, model, position):
+        """
+        The cursor's values as the types of the ordering fields; anything
+        else is an invalid cursor, not a server error.
+        """
+        cleaned = []
+        for field_name, value in zip(self.ordering, position):
+            field = model._meta.get_field(field_name.lstrip("-"))
+            try:
+                value = field.to_python(value)
+                field.run_validators(value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            cleaned.append(value)
+        return cleaned
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def _after(position, ordering):
+        """Rows after `position` in `ordering`, compared field by field."""
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            equal = {
+                other.lstrip("-"): value
+                for other, value in zip(ordering[:index], position)
+            }
+            conditions.append(Q(**equal, **{f"{name}__{lookup}": position[index]}))
+        return reduce(or_, conditions)
@@ -0,0 +1,51 @@
+from django.db.models import F
+from .models import KnockoutGame, Player, PlayerStats
+
+
+def get_or_create_players(names):
+    players = []
+    for name in names:
+        player, created = Player.objects.get_or_create(name=name)
+        if created:
+            PlayerStats.objects.create(player=player)
+        players.append(player)
+    return players
+
+
+def _contributions(scores):
+    """(games, wins, cups scored, cups conceded) for each side of a score."""
+    score_team1, score_team2, played = scores
+    if not played or score_team1 is None or score_team2 is None:
+        return (0, 0, 0, 0), (0, 0, 0, 0)
+    return (
+        (1, int(score_team1 > score_team2), score_team1, score_team2),
+        (1, int(score_team2 > score_team1), score_team2, score_team1),
+    )
+
+
+def apply_score_change(game, previous, current):
+    """
+    Move the stats of both teams' players from the `previous` to the
+    `current` (score_team1, score_team2, played) state of a game, with one
+    UPDATE per team instead of recounting every game.
+    """
+    knockout = isinstance(game, KnockoutGame)
+    before = _contributions(previous)
+    after = _contributions(current)
+
+    for team_id, old, new in (
+        (game.team1_id, before[0], after[0]),
+        (game.team2_id, before[1], after[1]),
+    ):
+        delta = [n - o for n, o in zip(new, old)]
+        if team_id is None or not any(delta):
+            continue
+
+        games, wins, scored, conceded = delta
+        PlayerStats.objects.filter(player__teams=team_id).update(
+            games=F("games") + games,
+            wins=F("wins") + wins,
+            cups_scored=F("cups_scored") + scored,
+            cups_conceded=F("cups_conceded") + conceded,
+            knockout_appearances=F("knockout_appearances") + (games if knockout else 0),
+        )
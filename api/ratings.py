@@ -0,0 +1,178 @@
+from django.conf import settings
+from django.db import transaction
+from .caching import bump_state_version
+from .models import Job, KnockoutGame, PlayerStats, RatedResult, Team
+
+INITIAL_RATING = 1500.0
+
+
+def expected_score(rating, opponent_rating):
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def actual_score(score, opponent_score):
+    return 1.0 if score > opponent_score else 0.5 if score == opponent_score else 0.0
+
+
+def _team_players(team_ids):
+    players = {team_id: [] for team_id in team_ids}
+    for team_id, player_id in Team.players.through.objects.filter(
+        team_id__in=team_ids
+    ).values_list("team_id", "player_id"):
+        players[team_id].append(player_id)
+    return players
+
+
+def _rate(players1, players2, score1, score2):
+    """
+    Apply one result: each side is rated as the mean of its players, and
+    every player of a side gains or loses the side's rating change.
+    """
+    stats = {
+        entry.player_id: entry
+        for entry in PlayerStats.objects.select_for_update().filter(
+            player_id__in=players1 + players2
+        )
+    }
+    rating1 = sum(stats[p].rating for p in players1) / len(players1)
+    rating2 = sum(stats[p].rating for p in players2) / len(players2)
+    delta = settings.RATING_K * (
+        actual_score(score1, score2) - expected_score(rating1, rating2)
+    )
+
+    for players, change in ((players1, delta), (players2, -delta)):
+        for player_id in players:
+            stats[player_id].rating += change
+    PlayerStats.objects.bulk_update(stats.values(), ["rating"])
+    bump_state_version()
+
+
+def apply_rating_change(game, previous, current):
+    """
+    Update the ratings for a score change of a Game or KnockoutGame. A
+    newly played game is rated on top of the current ratings. A result
+    that was already rated and is now corrected or withdrawn changes the
+    history, so the log entry is rewritten and a full recompute queued.
+    """
+    if game.team1_id is None or game.team2_id is None:
+        return
+
+    score1, score2, played = current
+    lookup = (
+        {"knockout_game": game} if isinstance(game, KnockoutGame) else {"game": game}
+    )
+    rated = RatedResult.objects.filter(**lookup).first()
+
+    if rated is None:
+        if not played:
+            return
+        players = _team_players([game.team1_id, game.team2_id])
+        players1, players2 = players[game.team1_id], players[game.team2_id]
+        if not players1 or not players2:
+            return
+        RatedResult.objects.create(
+            players1=players1,
+            players2=players2,
+            score1=score1,
+            score2=score2,
+            **lookup,
+        )
+        _rate(players1, players2, score1, score2)
+        return
+
+    if (score1, score2, played) == (rated.score1, rated.score2, True):
+        return
+    if played:
+        rated.score1, rated.score2 = score1, score2
+        rated.save(update_fields=["score1", "score2"])
+    else:
+        rated.delete()
+    queue_recompute()
+
+
+def queue_recompute():
+    # Imported here: jobs imports utils, which imports this module.
+    from .jobs import enqueue
+
+    if not Job.objects.filter(kind="recompute_ratings", status=Job.QUEUED).exists():
+        enqueue("recompute_ratings")
+
+
+def replay_ratings(results, k, initial=INITIAL_RATING):
+    """
+    Replay (players1, players2, score1, score2) results in order and return
+    {player id: rating}. This is the same arithmetic as _rate() over plain
+    floats, without any database access per result.
+    """
+    ratings = {}
+    for players1, players2, score1, score2 in results:
+        rating1 = sum(ratings.get(p, initial) for p in players1) / len(players1)
+        rating2 = sum(ratings.get(p, initial) for p in players2) / len(players2)
+        expected = 1 / (1 + 10 ** ((rating2 - rating1) / 400))
+        actual = 1.0 if score1 > score2 else 0.5 if score1 == score2 else 0.0
+        delta = k * (actual - expected)
+        for player_id in players1:
+            ratings[player_id] = ratings.get(player_id, initial) + delta
+        for player_id in players2:
+            ratings[player_id] = ratings.get(player_id, initial) - delta
+    return ratings
+
+
+def recompute_ratings():
+    """Rebuild every player's rating from the full result history."""
+    results = (
+        RatedResult.objects.order_by("id")
+        .values_list("players1", "players2", "score1", "score2")
+        .iterator(chunk_size=5000)
+    )
+    ratings = replay_ratings(results, settings.RATING_K)
+
+    with transaction.atomic():
+        stats = list(PlayerStats.objects.select_for_update())
+        changed = []
+        for entry in stats:
+            rating = ratings.get(entry.player_id, INITIAL_RATING)
+            if entry.rating != rating:
+                entry.rating = rating
+                changed.append(entry)
+        PlayerStats.objects.bulk_update(changed, ["rating"], batch_size=500)
+    bump_state_version()
+    return {"players": len(ratings), "updated": len(changed)}
+
+
+def team_strengths(teams=None):
+    """Map team id to the mean rating of its players."""
+    ratings = {}
+    through = Team.players.through.objects.all()
+    if teams is not None:
+        through = through.filter(team_id__in=[team.id for team in teams])
+    for team_id, rating in through.values_list("team_id", "player__stats__rating"):
+        ratings.setdefault(team_id, []).append(
+            INITIAL_RATING if rating is None else rating
+        )
+    return {team_id: sum(values) / len(values) for team_id, values in ratings.items()}
+
+
+def draw_groups_by_rating(group_size):
+    """
+    Split all teams into groups of `group_size` by strength: the strongest
+    teams form the first pot, and the pots are dealt out in a snake so that
+    every group gets a similar total strength.
+    """
+    teams = list(Team.objects.order_by("id"))
+    if len(teams) % group_size:
+        raise ValueError(
+            f"{len(teams)} teams cannot be split into groups of {group_size}."
+        )
+
+    strength = team_strengths()
+    teams.sort(key=lambda team: -strength.get(team.id, INITIAL_RATING))
+    group_count = len(teams) // group_size
+    groups = [[] for _ in range(group_count)]
+    for pot in range(group_size):
+        members = teams[pot * group_count : (pot + 1) * group_count]
+        if pot % 2:
+            members.reverse()
+        for group, team in zip(groups, members):
+            group.append(team.id)
+    return groups
@@ -0,0 +1,223 @@
+from django.conf import settings
+from django.db import transaction
+from .caching import bump_state_version
+from .changes import record_changes
+from .models import ChangeLogEntry, Game, KnockoutGame, ScoreEvent, ScoreSnapshot
+from .player_stats import apply_score_change
+from .ratings import apply_rating_change
+from .webhooks import emit_event
+from .writes import serialized_write
+
+SCORE_FIELDS = ("score_team1", "score_team2", "played")
+REPLAY_BATCH_SIZE = 1000
+
+
+def score_state(game):
+    return tuple(getattr(game, field) for field in SCORE_FIELDS)
+
+
+def record_score_event(game, previous, user=None, reverts=None):
+    """
+    Append the change from `previous` to the current score of a Game or
+    KnockoutGame and update the players' stats. Nothing is written when
+    the score did not change.
+    """
+    current = score_state(game)
+    if current == tuple(previous) and reverts is None:
+        return None
+
+    apply_score_change(game, previous, current)
+    apply_rating_change(game, previous, current)
+
+    event = ScoreEvent.objects.create(
+        game=game if isinstance(game, Game) else None,
+        knockout_game=game if isinstance(game, KnockoutGame) else None,
+        user=user if user is not None and user.is_authenticated else None,
+        score_team1=current[0],
+        score_team2=current[1],
+        played=current[2],
+        previous_score_team1=previous[0],
+        previous_score_team2=previous[1],
+        previous_played=previous[2],
+        reverts=reverts,
+    )
+
+    last_snapshot = (
+        ScoreSnapshot.objects.order_by("-last_event_id")
+        .values_list("last_event_id", flat=True)
+        .first()
+    )
+    if event.id - (last_snapshot or 0) >= settings.SCORE_SNAPSHOT_INTERVAL:
+        take_score_snapshot()
+
+    if isinstance(game, KnockoutGame):
+        emit_event("knockout_game.updated", lambda: game_payload(game, event))
+    else:
+        emit_event("game.updated", lambda: game_payload(game, event))
+
+    return event
+
+
+def save_score(serializer, user=None):
+    """
+    Save a validated Game or KnockoutGame serializer and record the score
+    change, as one serialized write.
+
+    The previous score is read from the row locked inside the write, not
+    from the instance the request loaded, so that two referees saving the
+    same game one after the other each apply their own change to the stats.
+    """
+    instance = serializer.instance
+    model = type(instance)
+    # Reload with the relations the request had loaded, for the response.
+    related = [
+        field.name
+        for field in model._meta.concrete_fields
+        if field.is_relation and field.is_cached(instance)
+    ]
+
+    def write():
+        serializer.instance = (
+            model.objects.select_related(*related)
+            .select_for_update(of=("self",))
+            .get(pk=instance.pk)
+        )
+        previous = score_state(serializer.instance)
+        return record_score_event(serializer.save(), previous, user)
+
+    return serialized_write(write)
+
+
+def game_payload(game, event):
+    payload = {
+        "id": game.id,
+        "score_event": event.id,
+        "team1": {"id": game.team1_id, "name": game.team1.name},
+        "team2": None,
+        "score_team1": event.score_team1,
+        "score_team2": event.score_team2,
+        "played": event.played,
+    }
+    if game.team2_id is not None:
+        payload["team2"] = {"id": game.team2_id, "name": game.team2.name}
+    if isinstance(game, KnockoutGame):
+        payload["round"] = game.round
+        payload["position"] = game.position
+    else:
+        payload["group"] = game.group_id
+    return payload
+
+
+def replay_score_events(batch_size=REPLAY_BATCH_SIZE):
+    """
+    Rebuild the latest score of every game from the newest snapshot plus
+    the events appended after it, reading the log in id-ordered batches.
+
+    Returns ({"games": {id: [s1, s2, played]}, "knockout_games": {...}},
+    id of the last event applied).
+    """
+    snapshot = ScoreSnapshot.objects.order_by("-last_event_id").first()
+    if snapshot is None:
+        state = {"games": {}, "knockout_games": {}}
+        last_id = 0
+    else:
+        state = {kind: dict(scores) for kind, scores in snapshot.state.items()}
+        last_id = snapshot.last_event_id
+
+    while True:
+        batch = list(
+            ScoreEvent.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "game_id", "knockout_game_id", *SCORE_FIELDS)[
+                :batch_size
+            ]
+        )
+        if not batch:
+            break
+
+        for event_id, game_id, knockout_game_id, *scores in batch:
+            if game_id is not None:
+                state["games"][str(game_id)] = scores
+            else:
+                state["knockout_games"][str(knockout_game_id)] = scores
+        last_id = batch[-1][0]
+
+    return state, last_id
+
+
+def take_score_snapshot():
+    state, last_id = replay_score_events()
+    if not last_id:
+        return None
+    snapshot, _ = ScoreSnapshot.objects.get_or_create(
+        last_event_id=last_id, defaults={"state": state}
+    )
+    return snapshot
+
+
+def rebuild_score_projections(batch_size=REPLAY_BATCH_SIZE):
+    """
+    Overwrite Game and KnockoutGame scores with the state replayed from the
+    log. Returns the number of rows that had drifted from the log.
+    """
+    state, _ = replay_score_events(batch_size)
+    changed = 0
+
+    with transaction.atomic():
+        for model, kind, entity in (
+            (Game, "games", ChangeLogEntry.GAME),
+            (KnockoutGame, "knockout_games", ChangeLogEntry.KNOCKOUT_GAME),
+        ):
+            ids = [int(game_id) for game_id in state[kind]]
+            for start in range(0, len(ids), batch_size):
+                stale = []
+                for game in model.objects.filter(
+                    id__in=ids[start : start + batch_size]
+                ):
+                    scores = tuple(state[kind][str(game.id)])
+                    if score_state(game) != scores:
+                        game.score_team1, game.score_team2, game.played = scores
+                        if model is Game:
+                            game.update_completed_at()
+                        stale.append(game)
+                fields = (
+                    SCORE_FIELDS + ("completed_at",) if model is Game else SCORE_FIELDS
+                )
+                model.objects.bulk_update(stale, fields)
+                record_changes(entity, [game.id for game in stale])
+                changed += len(stale)
+
+    if changed:
+        bump_state_version()
+    return changed
+
+
+def undo_score_event(event_id, user=None):
+    """
+    Restore the score a game had before `event_id` by appending a
+    compensating event. Only the latest event of a game can be undone.
+    """
+    with transaction.atomic():
+        event = ScoreEvent.objects.select_for_update().get(pk=event_id)
+
+        if ScoreEvent.objects.filter(reverts=event).exists():
+            raise ValueError("This score event has already been undone.")
+
+        if event.game_id is not None:
+            target = Game.objects.select_for_update().get(pk=event.game_id)
+        else:
+            target = KnockoutGame.objects.select_for_update().get(
+                pk=event.knockout_game_id
+            )
+
+        latest = target.score_events.order_by("-id").values_list("id", flat=True)[0]
+        if latest != event.id:
+            raise ValueError("Only the latest score event of a game can be undone.")
+
+        previous = score_state(target)
+        target.score_team1 = event.previous_score_team1
+        target.score_team2 = event.previous_score_team2
+        target.played = event.previous_played
+        target.save(update_fields=SCORE_FIELDS)
+
+        return record_score_event(target, previous, user, reverts=event)
@@ -1,6 +1,19 @@
+import secrets
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from .models import Game, KnockoutGame, Team, TournamentGroup
+from .player_stats import get_or_create_players
+from .models import (
+    Game,
+    Job,
+    KnockoutGame,
+    PlayerStats,
+    ScoreEvent,
+    Team,
+    TournamentGroup,
+    TournamentSettings,
+    WebhookSubscription,
+)
+from .webhooks import WEBHOOK_EVENTS
 
 
 class GameSerializer(serializers.ModelSerializer):
@@ -18,7 +31,11 @@ class GameSerializer(serializers.ModelSerializer):
             "score_team1",
             "score_team2",
             "played",
+            "table",
+            "slot",
+            "swiss_round",
         ]
+        read_only_fields = ["table", "slot", "swiss_round"]
 
     def validate(self, data):
         score1 = data.get("score_team1")
@@ -50,6 +67,48 @@ class KnockoutGameSerializer(serializers.ModelSerializer):
             "played",
             "round",
             "round_display",
+            "position",
+        ]
+        read_only_fields = ["position"]
+
+
+class ScoreEventSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source="user.username", read_only=True)
+    reverted_by = serializers.PrimaryKeyRelatedField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = ScoreEvent
+        fields = [
+            "id",
+            "game",
+            "knockout_game",
+            "user",
+            "score_team1",
+            "score_team2",
+            "played",
+            "previous_score_team1",
+            "previous_score_team2",
+            "previous_played",
+            "reverts",
+            "reverted_by",
+            "created_at",
+        ]
+
+
+class JobSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source="user.username", read_only=True)
+
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "error",
+            "user",
+            "created_at",
+            "started_at",
+            "finished_at",
         ]
 
 
@@ -63,7 +122,7 @@ class TeamSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "member_one", "member_two", "created_at"]
 
     def validate(self, data):
-        if Team.objects.count() >= 32:
+        if Team.objects.count() >= TournamentSettings.load().max_teams:
             raise serializers.ValidationError(
                 {"error": "Maximum number of teams reached."}
             )
@@ -100,6 +159,32 @@ class TeamSerializer(serializers.ModelSerializer):
 
         return data
 
+    def create(self, validated_data):
+        team = super().create(validated_data)
+        team.players.set(get_or_create_players([team.member_one, team.member_two]))
+        return team
+
+
+class PlayerStatsSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source="player.name")
+    cup_difference = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PlayerStats
+        fields = [
+            "name",
+            "games",
+            "wins",
+            "cups_scored",
+            "cups_conceded",
+            "cup_difference",
+            "knockout_appearances",
+            "rating",
+        ]
+
+    def get_cup_difference(self, obj):
+        return obj.cups_scored - obj.cups_conceded
+
 
 class TeamStandingSerializer(serializers.Serializer):
     team = serializers.CharField()
@@ -120,8 +205,11 @@ class TournamentGroupSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = TournamentGroup
-        fields = ["id", "name", "teams", "created_at"]
-        extra_kwargs = {"name": {"read_only": True}}
+        fields = ["id", "name", "teams", "swiss_rounds", "created_at"]
+        extra_kwargs = {
+            "name": {"read_only": True},
+            "swiss_rounds": {"read_only": True},
+        }
 
     def create(self, validated_data):
         teams = validated_data.pop("teams")
@@ -130,6 +218,18 @@ class TournamentGroupSerializer(serializers.ModelSerializer):
         return group
 
 
+class TournamentSettingsSerializer(serializers.ModelSerializer):
+    max_teams = serializers.IntegerField(min_value=4, max_value=1024)
+    group_size = serializers.IntegerField(min_value=2, max_value=32)
+    knockout_rounds = serializers.IntegerField(
+        min_value=1, max_value=8, allow_null=True, required=False
+    )
+
+    class Meta:
+        model = TournamentSettings
+        fields = ["max_teams", "group_size", "knockout_rounds"]
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -138,3 +238,38 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         return User.objects.create_user(**validated_data)
+
+
+class AccountSerializer(serializers.Serializer):
+    """One row of a bulk provisioning request. Uniqueness is checked in bulk."""
+
+    username = serializers.CharField(
+        max_length=150,
+        validators=User._meta.get_field("username").validators,
+    )
+    password = serializers.CharField(trim_whitespace=False)
+
+
+class WebhookSubscriptionSerializer(serializers.ModelSerializer):
+    # Never read back: whoever can see it can forge signatures. The create
+    # response is the only place it is shown.
+    secret = serializers.CharField(
+        min_length=16,
+        max_length=64,
+        required=False,
+        trim_whitespace=False,
+        write_only=True,
+    )
+    events = serializers.ListField(
+        child=serializers.ChoiceField(choices=WEBHOOK_EVENTS),
+        required=False,
+        allow_empty=True,
+    )
+
+    class Meta:
+        model = WebhookSubscription
+        fields = ["id", "url", "secret", "events", "active", "created_at"]
+
+    def create(self, validated_data):
+        validated_data.setdefault("secret", secrets.token_hex(32))
+        return super().create(validated_data)
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .caching import bump_state_version
+from .changes import record_changes
+from .models import (
+    ChangeLogEntry,
+    Game,
+    KnockoutGame,
+    TournamentGroup,
+    TournamentSettings,
+)
+
+CHANGE_LOG_ENTITIES = {
+    Game: ChangeLogEntry.GAME,
+    KnockoutGame: ChangeLogEntry.KNOCKOUT_GAME,
+    TournamentGroup: ChangeLogEntry.GROUP,
+}
+
+
+@receiver(post_save, sender=TournamentSettings)
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+@receiver(post_save, sender=KnockoutGame)
+@receiver(post_delete, sender=KnockoutGame)
+def invalidate_state_caches(sender, **kwargs):
+    bump_state_version()
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_save, sender=KnockoutGame)
+@receiver(post_save, sender=TournamentGroup)
+def log_change(sender, instance, **kwargs):
+    record_changes(CHANGE_LOG_ENTITIES[sender], [instance.id])
+
+
+@receiver(post_delete, sender=Game)
+@receiver(post_delete, sender=KnockoutGame)
+@receiver(post_delete, sender=TournamentGroup)
+def log_deletion(sender, instance, **kwargs):
+    record_changes(CHANGE_LOG_ENTITIES[sender], [instance.id], deleted=True)
@@ -0,0 +1,223 @@
+from collections import defaultdict
+import numpy as np
+from .models import Game, SwissBye, TournamentGroup, TournamentSettings
+from .utils import BYE_POINTS, get_tiebreakers, knockout_spots
+
+DEFAULT_SIMULATION_RUNS = 10000
+MAX_SIMULATION_RUNS = 50000
+MAX_SCORE = 10
+
+
+def _score_samples():
+    """Observed (score_team1, score_team2) pairs used to draw unplayed results."""
+    samples = np.array(
+        Game.objects.filter(played=True).values_list("score_team1", "score_team2"),
+        dtype=np.int64,
+    )
+    if len(samples) == 0:
+        return None
+    # Mirror every result so neither side of a fixture is favoured.
+    return np.concatenate([samples, samples[:, ::-1]])
+
+
+def _draw_scores(rng, samples, runs, game_count):
+    if samples is None:
+        scores = rng.integers(0, MAX_SCORE + 1, size=(runs, game_count, 2))
+    else:
+        picks = rng.integers(0, len(samples), size=(runs, game_count))
+        scores = samples[picks]
+    return scores[..., 0], scores[..., 1]
+
+
+def _simulate_group(rng, samples, teams, games, byes, runs, tiebreakers):
+    """
+    Play out the group `runs` times and rank it by `tiebreakers`. `byes`
+    lists the ids of the teams given a Swiss bye, once per bye.
+
+    Returns ({criterion: (runs, teams) array}, order), where order[run]
+    lists the team indices from first to last.
+    """
+    index = {team.id: i for i, team in enumerate(teams)}
+    team_count = len(teams)
+
+    points = np.zeros(team_count, dtype=np.int64)
+    scored = np.zeros(team_count, dtype=np.int64)
+    conceded = np.zeros(team_count, dtype=np.int64)
+    # Games each pair of teams plays, for Buchholz.
+    meetings = np.zeros((team_count, team_count), dtype=np.int64)
+    for team_id in byes:
+        points[index[team_id]] += BYE_POINTS
+    home, away = [], []
+    # (team, opponent, points) of the played games, for head-to-head.
+    played_home, played_away, played_points1, played_points2 = [], [], [], []
+
+    for game in games:
+        i1, i2 = index[game.team1_id], index[game.team2_id]
+        meetings[i1, i2] += 1
+        meetings[i2, i1] += 1
+        if not game.played:
+            home.append(i1)
+            away.append(i2)
+            continue
+        s1, s2 = game.score_team1, game.score_team2
+        scored[i1] += s1
+        scored[i2] += s2
+        conceded[i1] += s2
+        conceded[i2] += s1
+        p1, p2 = (3, 0) if s1 > s2 else (0, 3) if s2 > s1 else (1, 1)
+        points[i1] += p1
+        points[i2] += p2
+        played_home.append(i1)
+        played_away.append(i2)
+        played_points1.append(p1)
+        played_points2.append(p2)
+
+    points = np.tile(points, (runs, 1))
+    scored = np.tile(scored, (runs, 1))
+    conceded = np.tile(conceded, (runs, 1))
+
+    # Points of both sides of every game, one row per run.
+    home += played_home
+    away += played_away
+    home_points = np.tile(np.array(played_points1, dtype=np.int64), (runs, 1))
+    away_points = np.tile(np.array(played_points2, dtype=np.int64), (runs, 1))
+    simulated = len(home) - len(played_home)
+    home_matrix = np.zeros((len(home), team_count), dtype=np.int64)
+    away_matrix = np.zeros((len(away), team_count), dtype=np.int64)
+    home_matrix[np.arange(len(home)), home] = 1
+    away_matrix[np.arange(len(away)), away] = 1
+
+    if simulated:
+        s1, s2 = _draw_scores(rng, samples, runs, simulated)
+        draw = (s1 == s2).astype(np.int64)
+        simulated_home = 3 * (s1 > s2) + draw
+        simulated_away = 3 * (s2 > s1) + draw
+        points += simulated_home @ home_matrix[:simulated]
+        points += simulated_away @ away_matrix[:simulated]
+        scored += s1 @ home_matrix[:simulated] + s2 @ away_matrix[:simulated]
+        conceded += s2 @ home_matrix[:simulated] + s1 @ away_matrix[:simulated]
+        home_points = np.concatenate([simulated_home, home_points], axis=1)
+        away_points = np.concatenate([simulated_away, away_points], axis=1)
+
+    values = {
+        "points": points,
+        "cup_difference": scored - conceded,
+        "cups_scored": scored,
+        "buchholz": points @ meetings,
+    }
+
+    # Head-to-head counts the points a team took from the teams level with
+    # it on every earlier criterion, as rank_group() does.
+    if "head_to_head" in tiebreakers and home:
+        level = np.ones((runs, len(home)), dtype=bool)
+        for criterion in tiebreakers[: tiebreakers.index("head_to_head")]:
+            level &= values[criterion][:, home] == values[criterion][:, away]
+        values["head_to_head"] = (home_points * level) @ home_matrix + (
+            away_points * level
+        ) @ away_matrix
+    else:
+        values["head_to_head"] = np.zeros_like(points)
+
+    # lexsort sorts by the last key first and keeps the name order of
+    # `teams` for complete ties.
+    keys = [-values[criterion] for criterion in reversed(tiebreakers)]
+    order = np.lexsort(keys or [np.zeros_like(points)])
+    return values, order
+
+
+def simulate_qualification(runs=DEFAULT_SIMULATION_RUNS, seed=None):
+    """
+    Play out every unplayed group game `runs` times and return, per group,
+    each team's probability of finishing 1st, 2nd or 3rd and of reaching
+    the knockout stage under the current tournament settings.
+
+    Every run is ranked by the same tiebreak pipeline as the standings,
+    head-to-head and Buchholz included. A Swiss stage is only played out to
+    its current round: later rounds and their byes are not simulated.
+    """
+    rng = np.random.default_rng(seed)
+    samples = _score_samples()
+
+    groups = list(
+        TournamentGroup.objects.all().order_by("id").prefetch_related("teams", "games")
+    )
+    byes = defaultdict(list)
+    if any(group.swiss_rounds is not None for group in groups):
+        for group_id, team_id in SwissBye.objects.values_list("group_id", "team_id"):
+            byes[group_id].append(team_id)
+
+    simulated = []
+    for group in groups:
+        teams = sorted(group.teams.all(), key=lambda team: team.name)
+        if not teams:
+            continue
+        values, order = _simulate_group(
+            rng,
+            samples,
+            teams,
+            group.games.all(),
+            byes[group.id],
+            runs,
+            get_tiebreakers(swiss=group.swiss_rounds is not None),
+        )
+        simulated.append((group, teams, values, order))
+
+    tournament = TournamentSettings.load()
+    places, extra = knockout_spots(
+        len(simulated), tournament.group_size, tournament.knockout_rounds
+    )
+
+    rows = np.arange(runs)
+    extra_qualified = np.zeros((runs, len(simulated)), dtype=bool)
+    if extra and all(len(teams) > places for _, teams, _, _ in simulated):
+        # Teams of different groups are compared as standings_sort_key()
+        # does, without head-to-head and Buchholz.
+        keys = [
+            -np.stack(
+                [
+                    values[criterion][rows, order[:, places]]
+                    for _, _, values, order in simulated
+                ],
+                axis=1,
+            )
+            for criterion in reversed(get_tiebreakers())
+            if criterion not in ("head_to_head", "buchholz")
+        ]
+        best = np.lexsort(keys or [np.zeros((runs, len(simulated)))])[:, :extra]
+        extra_qualified[rows[:, None], best] = True
+
+    result = []
+    for position, (group, teams, _, order) in enumerate(simulated):
+        team_count = len(teams)
+        finishes = [
+            (
+                np.bincount(order[:, place], minlength=team_count) / runs
+                if place < team_count
+                else np.zeros(team_count)
+            )
+            for place in range(3)
+        ]
+        knockout = np.bincount(order[:, :places].ravel(), minlength=team_count)
+        if team_count > places:
+            knockout = knockout + np.bincount(
+                order[extra_qualified[:, position], places], minlength=team_count
+            )
+        knockout = knockout / runs
+
+        result.append(
+            {
+                "group": group.name,
+                "teams": [
+                    {
+                        "team": team.name,
+                        "first": round(float(finishes[0][i]), 4),
+                        "second": round(float(finishes[1][i]), 4),
+                        "third": round(float(finishes[2][i]), 4),
+                        "knockout": round(float(knockout[i]), 4),
+                    }
+                    for i, team in enumerate(teams)
+                ],
+            }
+        )
+
+    return {"runs": runs, "groups": result}
@@ -0,0 +1,250 @@
+import math
+from collections import deque
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from .caching import bump_state_version
+from .changes import batched_changes, record_changes
+from .models import ChangeLogEntry, Game, SwissBye, Team, TournamentGroup
+from .utils import compute_group_tables, schedule_fixtures
+from .webhooks import emit_event
+
+
+def default_rounds(team_count):
+    """Enough rounds for one team to finish with a perfect record."""
+    return min(max(1, math.ceil(math.log2(team_count))), max_rounds(team_count))
+
+
+def max_rounds(team_count):
+    """
+    The most rounds that can always be paired without a rematch. Until then
+    every team has at least half of the field left to play, and by Dirac's
+    theorem such a field can always be split into new pairs.
+    """
+    return team_count // 2
+
+
+def pair_round(ranking, opponents, had_bye=()):
+    """
+    Pair the team ids in `ranking`, best first, for the next Swiss round.
+
+    `opponents` maps a team id to the ids it has already played. With an
+    odd number of teams, the lowest-ranked team without a bye sits out.
+
+    Returns (pairs, bye); bye is None for an even number of teams.
+    """
+    if len(ranking) % 2:
+        candidates = [team for team in reversed(ranking) if team not in had_bye]
+    else:
+        candidates = [None]
+
+    for bye in candidates:
+        pairs = _pair([team for team in ranking if team != bye], opponents)
+        if pairs is not None:
+            return pairs, bye
+    raise ValueError("Every pairing for the next round needs a rematch.")
+
+
+def _pair(teams, opponents):
+    """
+    Pair `teams`, best first, without rematches, or return None.
+
+    The best unpaired team meets the next best team it has not played yet
+    (Monrad pairing), so teams meet teams on a similar score. Teams left
+    over at the bottom are then paired along augmenting paths with
+    Edmonds' blossom algorithm, which reshuffles as few pairs as needed
+    and finds a pairing whenever one exists, in polynomial time.
+    """
+    count = len(teams)
+    match = [-1] * count
+    for i in range(count):
+        if match[i] != -1:
+            continue
+        played = opponents.get(teams[i], ())
+        for j in range(i + 1, count):
+            if match[j] == -1 and teams[j] not in played:
+                match[i], match[j] = j, i
+                break
+
+    if -1 in match:
+        neighbours = [
+            [
+                j
+                for j, other in enumerate(teams)
+                if j != i and other not in opponents.get(team, ())
+            ]
+            for i, team in enumerate(teams)
+        ]
+        for root in range(count):
+            if match[root] == -1 and not _augment(root, neighbours, match):
+                return None
+
+    return [(teams[i], teams[match[i]]) for i in range(count) if i < match[i]]
+
+
+def _augment(root, neighbours, match):
+    """
+    Search an alternating path from the unmatched `root` to another
+    unmatched vertex, contracting odd cycles (blossoms) on the way, and
+    flip it so that both ends are matched. Returns False if none exists.
+    """
+    count = len(match)
+    parent = [-1] * count
+    base = list(range(count))
+    used = [False] * count
+    used[root] = True
+    queue = deque([root])
+
+    def lowest_common_ancestor(a, b):
+        seen = [False] * count
+        while True:
+            a = base[a]
+            seen[a] = True
+            if match[a] == -1:
+                break
+            a = parent[match[a]]
+        while True:
+            b = base[b]
+            if seen[b]:
+                return b
+            b = parent[match[b]]
+
+    def mark_path(vertex, blossom_base, child, blossom):
+        while base[vertex] != blossom_base:
+            blossom[base[vertex]] = blossom[base[match[vertex]]] = True
+            parent[vertex] = child
+            child = match[vertex]
+            vertex = parent[match[vertex]]
+
+    while queue:
+        vertex = queue.popleft()
+        for other in neighbours[vertex]:
+            if base[vertex] == base[other] or match[vertex] == other:
+                continue
+            if other == root or (match[other] != -1 and parent[match[other]] != -1):
+                blossom_base = lowest_common_ancestor(vertex, other)
+                blossom = [False] * count
+                mark_path(vertex, blossom_base, other, blossom)
+                mark_path(other, blossom_base, vertex, blossom)
+                for i in range(count):
+                    if blossom[base[i]]:
+                        base[i] = blossom_base
+                        if not used[i]:
+                            used[i] = True
+                            queue.append(i)
+            elif parent[other] == -1:
+                parent[other] = vertex
+                if match[other] == -1:
+                    while other != -1:
+                        previous = match[parent[other]]
+                        match[other] = parent[other]
+                        match[parent[other]] = other
+                        other = previous
+                    return True
+                used[match[other]] = True
+                queue.append(match[other])
+    return False
+
+
+def swiss_group():
+    return TournamentGroup.objects.filter(swiss_rounds__isnull=False).first()
+
+
+def create_swiss_stage(rounds, tables):
+    """
+    Replace all groups with a Swiss stage of `rounds` rounds for every
+    registered team and pair the first round.
+    """
+    with transaction.atomic():
+        with batched_changes():
+            TournamentGroup.objects.all().delete()
+
+        group = TournamentGroup.objects.create(name="Swiss", swiss_rounds=rounds)
+        TournamentGroup.teams.through.objects.bulk_create(
+            TournamentGroup.teams.through(tournamentgroup=group, team_id=team_id)
+            for team_id in Team.objects.values_list("id", flat=True)
+        )
+        pair_next_round(tables)
+    return group
+
+
+def pair_next_round(tables):
+    """
+    Pair and schedule the next round of the Swiss stage once every game of
+    the current round has been played. Teams are ranked by the standings,
+    Swiss tiebreakers included. Returns (round, games, bye team or None).
+    """
+    if tables < 1:
+        raise ValueError("At least one table is required.")
+
+    with transaction.atomic():
+        group = (
+            TournamentGroup.objects.select_for_update()
+            .filter(swiss_rounds__isnull=False)
+            .first()
+        )
+        if group is None:
+            raise ValueError("There is no Swiss stage.")
+
+        progress = group.games.aggregate(
+            round=Max("swiss_round"),
+            slot=Max("slot"),
+            unplayed=Count("id", filter=Q(played=False)),
+        )
+        current = progress["round"] or 0
+        if progress["unplayed"]:
+            raise ValueError(f"Not all games of round {current} have been played.")
+        if current >= group.swiss_rounds:
+            raise ValueError(f"All {group.swiss_rounds} rounds have been paired.")
+
+        [(_, standings)] = compute_group_tables([group.id])
+        teams = {stats["team"].id: stats["team"] for stats in standings}
+        pairs, bye = pair_round(
+            [stats["team"].id for stats in standings],
+            {stats["team"].id: set(stats["opponents"]) for stats in standings},
+            {stats["team"].id for stats in standings if stats["byes"]},
+        )
+
+        round_number = current + 1
+        last_slot = progress["slot"] or 0
+        fixtures = [(0, teams[team1], teams[team2], group) for team1, team2 in pairs]
+        games = Game.objects.bulk_create(
+            Game(
+                group=group,
+                team1=team1,
+                team2=team2,
+                table=table,
+                slot=last_slot + slot,
+                swiss_round=round_number,
+            )
+            for (_, team1, team2, _), table, slot in schedule_fixtures(fixtures, tables)
+        )
+        if bye is not None:
+            SwissBye.objects.create(group=group, team_id=bye, round=round_number)
+
+        record_changes(ChangeLogEntry.GAME, [game.id for game in games])
+        record_changes(ChangeLogEntry.GROUP, [group.id])
+        bye = teams.get(bye)
+        emit_event(
+            "swiss_round.generated",
+            lambda: swiss_round_payload(round_number, games, bye),
+        )
+
+    bump_state_version()
+    return round_number, games, bye
+
+
+def swiss_round_payload(round_number, games, bye):
+    return {
+        "round": round_number,
+        "games": [
+            {
+                "id": game.id,
+                "table": game.table,
+                "slot": game.slot,
+                "team1": game.team1.name,
+                "team2": game.team2.name,
+            }
+            for game in games
+        ],
+        "bye": bye.name if bye is not None else None,
+    }
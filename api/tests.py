@@ -1 +1,1868 @@
-from django.test import TestCase
+import base64
+import importlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+from io import StringIO
+from types import SimpleNamespace
+from xml.etree import ElementTree
+from unittest import mock
+from django.apps import apps as django_apps
+from django.contrib.auth import hashers
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F, Q
+import cbor2
+import msgpack
+import numpy as np
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend.replicas import (
+    PIN_COOKIE,
+    PIN_HEADER,
+    ReplicaRouter,
+    ReplicaRoutingMiddleware,
+)
+from .benchmarks import credit_players, random_result, seed_teams, seed_tournament
+from .caching import bump_state_version, cached_for_state, get_state_version
+from .graphics import _text
+from .hashing import ConfigurablePBKDF2PasswordHasher, shutdown_pool
+from .jobs import enqueue, run_job
+from .models import (
+    ChangeLogEntry,
+    Game,
+    KnockoutGame,
+    Player,
+    PlayerStats,
+    RatedResult,
+    ScoreEvent,
+    ScoreSnapshot,
+    StateVersion,
+    Team,
+    TournamentGroup,
+    TournamentSettings,
+    WebhookDelivery,
+    WebhookSubscription,
+    search_key,
+)
+from .ratings import (
+    INITIAL_RATING,
+    apply_rating_change,
+    expected_score,
+    recompute_ratings,
+)
+from .score_events import (
+    rebuild_score_projections,
+    replay_score_events,
+    save_score,
+    take_score_snapshot,
+    undo_score_event,
+)
+from .serializers import GameSerializer, KnockoutGameSerializer
+from .simulation import _simulate_group, simulate_qualification
+from .swiss import _pair, create_swiss_stage, default_rounds, pair_round
+from .utils import (
+    bracket_seed_order,
+    build_bracket,
+    compute_group_tables,
+    compute_standings_timeline,
+    delete_team,
+    generate_knockout_stage,
+    get_tiebreakers,
+    reset_tournament,
+    round_robin_rounds,
+    schedule_fixtures,
+    tournament_models,
+)
+from .webhooks import record_result
+
+SIZES = (8, 16, 32, 64)
+
+# Routes that are not part of the API.
+UNBUDGETED_ROUTES = {
+    "admin/": "Django's admin site",
+    "api/v1/test_utils/__delete-cypress-test-user/": "only routed with DEBUG",
+}
+
+
+def registration(size, client):
+    """Teams registered, no groups yet."""
+    tournament = TournamentSettings.load()
+    tournament.max_teams = size + 1
+    tournament.save()
+    teams = seed_teams(size)
+    return {"team": teams[0].id, "team_ids": [team.id for team in teams]}
+
+
+def group_stage(size, client):
+    """Groups drawn and half of the group games played, one through the API."""
+    TournamentSettings.objects.update_or_create(pk=1, defaults={"max_teams": size})
+    teams, groups = seed_tournament(size, played=0.5)
+    game = groups[0].games.filter(played=False).order_by("id").first()
+    client.patch(
+        f"/api/v1/games/{game.id}/",
+        {"score_team1": 10, "score_team2": 4, "played": True},
+        format="json",
+    )
+    return {
+        "team": teams[-1].id,
+        "game": game.id,
+        "score_event": ScoreEvent.objects.latest("id").id,
+    }
+
+
+def knockout_stage(size, client):
+    """Every group game played and the first knockout round decided."""
+    TournamentSettings.objects.update_or_create(pk=1, defaults={"max_teams": size})
+    seed_tournament(size, played=1.0)
+    generate_knockout_stage()
+
+    rng = random.Random(size)
+    first_round = KnockoutGame.objects.values_list("round", flat=True).first()
+    games = list(KnockoutGame.objects.filter(round=first_round, played=False))
+    for game in games:
+        game.score_team1, game.score_team2 = random_result(rng)
+        game.played = True
+    KnockoutGame.objects.bulk_update(games, ["score_team1", "score_team2", "played"])
+    credit_players(games)
+
+    codes = [code for code, _ in KnockoutGame.ROUND_CHOICES]
+    return {
+        "knockout_game": KnockoutGame.objects.order_by("id").first().id,
+        "current_round": first_round,
+        "next_round": codes[codes.index(first_round) + 1],
+    }
+
+
+def swiss_stage(size, client):
+    """A Swiss stage of every team, one of them sitting out, after round one."""
+    seed_teams(size + 1)
+    create_swiss_stage(default_rounds(size + 1), 4)
+
+    rng = random.Random(size)
+    games = list(Game.objects.filter(swiss_round=1))
+    for game in games:
+        game.score_team1, game.score_team2 = random_result(rng)
+        game.played = True
+        game.update_completed_at()
+    Game.objects.bulk_update(
+        games, ["score_team1", "score_team2", "played", "completed_at"]
+    )
+    credit_players(games)
+    return {}
+
+
+# (method, route, stage, request data, expected status, query budget)
+#
+# The route is the URL pattern as it appears in the URLconf, with converters
+# reduced to their name, and is filled in from the stage's context. Data may
+# be a callable that receives the context and the tournament size, so that
+# bulk requests grow with the tournament, too.
+ENDPOINTS = [
+    ("get", "", None, None, 200, 0),
+    ("get", "api/v1/", None, None, 200, 0),
+    ("post", "api/v1/user/register/", None, None, 201, 2),
+    ("post", "api/v1/token/", None, None, 200, 1),
+    ("post", "api/v1/token/refresh/", None, None, 200, 1),
+    ("get", "api/v1/me/", None, None, 200, 0),
+    (
+        "post",
+        "api/v1/users/bulk/",
+        None,
+        lambda context, size: {
+            "users": [
+                {"username": f"player{i}", "password": "secret"} for i in range(size)
+            ]
+            + [{"username": "admin", "password": "secret"}]
+        },
+        201,
+        5,
+    ),
+    ("get", "api/v1/teams/", group_stage, None, 200, 1),
+    (
+        "post",
+        "api/v1/teams/",
+        registration,
+        {"name": "Late Team", "member_one": "Late A", "member_two": "Late B"},
+        201,
+        21,
+    ),
+    ("get", "api/v1/teams/search/?q=team", group_stage, None, 200, 1),
+    ("delete", "api/v1/teams/delete/<pk>/", group_stage, None, 200, 22),
+    ("get", "api/v1/groups/", group_stage, None, 200, 2),
+    (
+        "post",
+        "api/v1/groups/bulk/",
+        registration,
+        lambda context, size: {
+            "groups": [context["team_ids"][i : i + 4] for i in range(0, size, 4)],
+            "tables": 4,
+        },
+        201,
+        17,
+    ),
+    ("delete", "api/v1/groups/delete/", group_stage, None, 200, 15),
+    ("get", "api/v1/groups/standings/", group_stage, None, 200, 3),
+    ("get", "api/v1/groups/standings/timeline/", group_stage, None, 200, 4),
+    ("get", "api/v1/groups/qualification/?runs=10", group_stage, None, 200, 6),
+    ("get", "api/v1/graphics/standings/", group_stage, None, 200, 4),
+    ("get", "api/v1/graphics/bracket/", knockout_stage, None, 200, 2),
+    ("get", "api/v1/ko-stage/", knockout_stage, None, 200, 1),
+    ("delete", "api/v1/ko-stage/delete/", knockout_stage, None, 200, 8),
+    (
+        "patch",
+        "api/v1/ko-stage/<pk>/",
+        knockout_stage,
+        {"score_team1": 10, "score_team2": 2, "played": True},
+        200,
+        17,
+    ),
+    ("post", "api/v1/ko-stage/generate/", knockout_stage, None, 201, 19),
+    (
+        "post",
+        "api/v1/ko-stage/next-round/",
+        knockout_stage,
+        lambda context, size: {
+            "current_round": context["current_round"],
+            "next_round": context["next_round"],
+        },
+        201,
+        9,
+    ),
+    ("get", "api/v1/swiss/", swiss_stage, None, 200, 7),
+    ("post", "api/v1/swiss/generate/", registration, {"tables": 4}, 201, 29),
+    ("post", "api/v1/swiss/next-round/", swiss_stage, {"tables": 4}, 201, 18),
+    ("get", "api/v1/ratings/", group_stage, None, 200, 4),
+    ("post", "api/v1/ratings/recompute/", group_stage, None, 200, 5),
+    ("get", "api/v1/players/leaderboard/", group_stage, None, 200, 1),
+    ("get", "api/v1/score-events/", group_stage, None, 200, 1),
+    ("post", "api/v1/score-events/<pk>/undo/", group_stage, None, 201, 21),
+    ("post", "api/v1/reset-tournament/", knockout_stage, None, 200, 17),
+    ("get", "api/v1/tournament/settings/", group_stage, None, 200, 1),
+    ("patch", "api/v1/tournament/settings/", group_stage, {"group_size": 4}, 200, 3),
+    ("get", "api/v1/tournament/export/", knockout_stage, None, 200, 6),
+    ("post", "api/v1/tournament/export/", knockout_stage, None, 202, 1),
+    ("get", "api/v1/jobs/<pk>/", knockout_stage, None, 200, 1),
+    ("get", "api/v1/jobs/<pk>/result/", knockout_stage, None, 200, 1),
+    ("get", "api/v1/sync/?since=0", group_stage, None, 200, 5),
+    ("get", "api/v1/public/standings/", group_stage, None, 200, 4),
+    ("get", "api/v1/public/games/", group_stage, None, 200, 2),
+    ("get", "api/v1/public/bracket/", knockout_stage, None, 200, 2),
+    ("get", "api/v1/webhooks/", group_stage, None, 200, 1),
+    (
+        "post",
+        "api/v1/webhooks/",
+        group_stage,
+        {"url": "https://example.com/hook"},
+        201,
+        1,
+    ),
+    ("get", "api/v1/webhooks/<pk>/", group_stage, None, 200, 1),
+    ("patch", "api/v1/webhooks/<pk>/", group_stage, {"active": False}, 200, 2),
+    ("delete", "api/v1/webhooks/<pk>/", group_stage, None, 204, 3),
+    ("get", "api/v1/games/", group_stage, None, 200, 1),
+    ("get", "api/v1/games/<pk>/", group_stage, None, 200, 1),
+    (
+        "patch",
+        "api/v1/games/<pk>/",
+        group_stage,
+        {"score_team1": 3, "score_team2": 10, "played": True},
+        200,
+        16,
+    ),
+]
+
+
+def url_routes(patterns=None, prefix=""):
+    """Every route of the URLconf, with converters reduced to their name."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    routes = set()
+    for pattern in patterns:
+        route = str(pattern.pattern)
+        if "format>" in route:
+            # Format suffix variants of the router's routes.
+            continue
+        route = re.sub(r"\(\?P<(\w+)>[^)]*\)", r"<\1>", route.strip("^$"))
+        route = prefix + re.sub(r"<(?:\w+:)?(\w+)>", r"<\1>", route)
+        if isinstance(pattern, URLPattern):
+            routes.add(route)
+        elif route not in UNBUDGETED_ROUTES:
+            routes |= url_routes(pattern.url_patterns, route)
+    return routes
+
+
+def describe(queries):
+    """The captured SQL, with statements that ran more than once flagged."""
+    shapes = [re.sub(r"\b\d+\b|'[^']*'", "?", query["sql"]) for query in queries]
+    repeats = Counter(shapes)
+    lines = []
+    for index, (query, shape) in enumerate(zip(queries, shapes), start=1):
+        marker = f"[x{repeats[shape]}] " if repeats[shape] > 1 else ""
+        lines.append(f"{index}. {marker}{query['sql']}")
+    return "\n".join(lines)
+
+
+@override_settings(PASSWORD_HASH_WORKERS=0, PASSWORD_HASH_ITERATIONS=1)
+class QueryBudgetTests(TestCase):
+    """
+    Every endpoint runs against tournaments of SIZES teams. The number of
+    queries must not grow with the tournament and must stay within the
+    endpoint's budget; on failure the captured SQL is printed, with the
+    statements that repeat marked, which is what an N+1 loop looks like.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="secret", is_staff=True
+        )
+
+    def admin_client(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        return client
+
+    def context_for(self, route, stage, size):
+        context = stage(size, self.admin_client()) if stage is not None else {}
+
+        if route.startswith("api/v1/webhooks/"):
+            context["pk"] = WebhookSubscription.objects.create(
+                url="https://example.com/hook", secret="s" * 32
+            ).id
+        elif route.startswith("api/v1/jobs/"):
+            context["pk"] = run_job(enqueue("export_tournament", user=self.admin)).id
+        elif route.startswith("api/v1/score-events/"):
+            context["pk"] = context["score_event"]
+        elif route.startswith("api/v1/ko-stage/"):
+            context["pk"] = context.get("knockout_game")
+        elif route.startswith("api/v1/teams/"):
+            context["pk"] = context.get("team")
+        elif route.startswith("api/v1/games/"):
+            context["pk"] = context.get("game")
+        elif route == "api/v1/token/":
+            context["data"] = {"username": "admin", "password": "secret"}
+        elif route == "api/v1/token/refresh/":
+            context["data"] = {"refresh": str(RefreshToken.for_user(self.admin))}
+        elif route == "api/v1/user/register/":
+            context["data"] = {"username": f"player{size}", "password": "secret"}
+        return context
+
+    def measure(self, method, route, stage, data, expected_status, size):
+        """Query count of one request, with everything rolled back after."""
+        with transaction.atomic():
+            if route.startswith(("api/v1/token/", "api/v1/user/", "api/v1/public/")):
+                client = APIClient()
+            else:
+                client = self.admin_client()
+            with self.captureOnCommitCallbacks(execute=True):
+                context = self.context_for(route, stage, size)
+            if callable(data):
+                data = data(context, size)
+            data = context.get("data", data)
+            path = "/" + route.replace("<pk>", str(context.get("pk")))
+
+            # Start cold: nothing cached from an earlier size or request.
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = getattr(client, method)(path, data, format="json")
+
+            self.assertEqual(
+                response.status_code,
+                expected_status,
+                f"{method.upper()} {path} at {size} teams: {response.content[:500]}",
+            )
+            transaction.set_rollback(True)
+        return list(queries.captured_queries)
+
+    def test_public_revalidation_only_reads_the_state_version(self):
+        group_stage(8, self.admin_client())
+        client = APIClient()
+        for resource in ("standings", "games", "bracket"):
+            etag = client.get(f"/api/v1/public/{resource}/")["ETag"]
+            with self.assertNumQueries(1):
+                response = client.get(
+                    f"/api/v1/public/{resource}/", HTTP_IF_NONE_MATCH=etag
+                )
+            self.assertEqual(response.status_code, 304)
+
+    def test_every_route_has_a_budget(self):
+        budgeted = {route.split("?")[0] for _, route, *_ in ENDPOINTS}
+        missing = url_routes() - budgeted - set(UNBUDGETED_ROUTES)
+        self.assertFalse(missing, f"Routes without a query budget: {sorted(missing)}")
+
+    def test_queries_do_not_grow_with_the_tournament(self):
+        for method, route, stage, data, expected_status, budget in ENDPOINTS:
+            label = f"{method.upper()} /{route}"
+            with self.subTest(label):
+                baseline = None
+                for size in SIZES:
+                    queries = self.measure(
+                        method, route, stage, data, expected_status, size
+                    )
+                    if len(queries) > budget:
+                        self.fail(
+                            f"{label} ran {len(queries)} queries at {size} teams, "
+                            f"over its budget of {budget}:\n{describe(queries)}"
+                        )
+                    if baseline is None:
+                        baseline = len(queries)
+                    elif len(queries) != baseline:
+                        self.fail(
+                            f"{label} ran {baseline} queries at {SIZES[0]} teams "
+                            f"but {len(queries)} at {size}:\n{describe(queries)}"
+                        )
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def recompute(self, query="", key="retry"):
+        return self.client.post(
+            f"/api/v1/ratings/recompute/{query}", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_async_retry_keeps_the_job_location(self):
+        first = self.recompute("?async=true")
+        retry = self.recompute("?async=true")
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(retry.status_code, 202)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry["Location"], first["Location"])
+        self.assertEqual(retry.json(), first.json())
+
+    def test_key_reused_with_another_query_string_is_rejected(self):
+        self.assertEqual(self.recompute().status_code, 200)
+        self.assertEqual(self.recompute("?async=true").status_code, 422)
+
+
+class StateVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_version_is_bumped_once_on_commit(self):
+        version = get_state_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                bump_state_version()
+                bump_state_version()
+                # A reader in the meantime still sees the committed state.
+                self.assertEqual(get_state_version(), version)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(get_state_version(), version + 1)
+
+    def test_rolled_back_bump_does_not_block_the_next_one(self):
+        version = get_state_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    bump_state_version()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            bump_state_version()
+        self.assertEqual(get_state_version(), version + 1)
+
+    def test_cached_values_follow_the_shared_version(self):
+        self.assertEqual(cached_for_state("answer", lambda: 1), 1)
+        self.assertEqual(cached_for_state("answer", lambda: 2), 1)
+        # Another process bumps the version in the database.
+        StateVersion.objects.filter(pk=1).update(version=F("version") + 1)
+        self.assertEqual(cached_for_state("answer", lambda: 3), 3)
+
+    def test_jobs_invalidate_the_web_workers_cache(self):
+        cached_for_state("answer", lambda: 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            job = run_job(enqueue("reset_tournament"))
+        self.assertEqual(job.status, job.SUCCEEDED)
+        self.assertEqual(cached_for_state("answer", lambda: 2), 2)
+
+
+def fixtures_for(group_sizes):
+    """Round-robin fixtures for groups of the given sizes, with stand-in teams."""
+    fixtures, team_id = [], 0
+    for group, size in enumerate(group_sizes):
+        teams = [SimpleNamespace(id=team_id + i) for i in range(size)]
+        team_id += size
+        for round_index, pairs in enumerate(round_robin_rounds(teams)):
+            fixtures.extend((round_index, *pair, group) for pair in pairs)
+    return fixtures
+
+
+def fixture_key(fixture):
+    round_index, team1, team2, group = fixture
+    return round_index, team1.id, team2.id, group
+
+
+class SchedulingTests(SimpleTestCase):
+    def assertValidSchedule(self, fixtures, schedule, tables):
+        self.assertCountEqual(
+            [fixture_key(fixture) for fixture, _, _ in schedule],
+            map(fixture_key, fixtures),
+        )
+        slots = defaultdict(list)
+        for fixture, table, slot in schedule:
+            slots[slot].append((fixture, table))
+        for slot, entries in slots.items():
+            self.assertLessEqual(len(entries), tables)
+            self.assertCountEqual(
+                [table for _, table in entries], range(1, len(entries) + 1)
+            )
+            teams = [team.id for (_, *pair, _), _ in entries for team in pair]
+            self.assertEqual(len(teams), len(set(teams)), f"Double booking in {slot}")
+
+    def test_every_game_is_scheduled_once_without_double_bookings(self):
+        for group_sizes, tables in (([4] * 8, 4), ([5] * 7, 3), ([6, 5], 10)):
+            fixtures = fixtures_for(group_sizes)
+            schedule = schedule_fixtures(fixtures, tables)
+            self.assertValidSchedule(fixtures, schedule, tables)
+
+    def test_every_table_is_used_while_teams_are_free(self):
+        # Eight groups of four play 48 games, four at a time.
+        schedule = schedule_fixtures(fixtures_for([4] * 8), 4)
+        self.assertEqual(max(slot for _, _, slot in schedule), 12)
+
+    def test_earlier_rounds_go_first(self):
+        schedule = schedule_fixtures(fixtures_for([4] * 8), 4)
+        schedule.sort(key=lambda entry: entry[2])
+        rounds = [fixture[0] for fixture, _, _ in schedule]
+        self.assertEqual(rounds, sorted(rounds))
+
+    def test_large_group_is_scheduled(self):
+        fixtures = fixtures_for([256])
+        schedule = schedule_fixtures(fixtures, 20)
+        self.assertValidSchedule(fixtures, schedule, 20)
+
+
+def group_seeds(groups, places):
+    """Seeds named after their group and place, winners first: A1, B1, A2..."""
+    return [
+        (f"{chr(ord('A') + group)}{place}", group)
+        for place in range(1, places + 1)
+        for group in range(groups)
+    ]
+
+
+class BracketTests(SimpleTestCase):
+    def same_group_meetings(self, bracket, block):
+        """Same-group pairs among the teams of every `block` consecutive games."""
+        meetings = 0
+        for start in range(0, len(bracket), block):
+            groups = [
+                team[0]
+                for game in bracket[start : start + block]
+                for team in game
+                if team is not None
+            ]
+            meetings += len(groups) - len(set(groups))
+        return meetings
+
+    def test_seeds_are_spread_and_top_seeds_get_the_byes(self):
+        seeds = [(f"T{seed}", seed) for seed in range(1, 13)]
+        bracket = build_bracket(seeds)
+        self.assertEqual(len(bracket), 8)
+        self.assertEqual(bracket[0], ("T1", None))
+        self.assertEqual(bracket[4][0], "T2")
+        byes = sorted(team1 for team1, team2 in bracket if team2 is None)
+        self.assertEqual(byes, ["T1", "T2", "T3", "T4"])
+
+    def test_group_mates_avoid_each_other_in_the_first_two_rounds(self):
+        for groups, places in ((4, 2), (8, 2), (16, 4), (32, 4), (64, 2)):
+            with self.subTest(groups=groups, places=places):
+                bracket = build_bracket(group_seeds(groups, places))
+                self.assertEqual(len(bracket), groups * places // 2)
+                self.assertEqual(self.same_group_meetings(bracket, 1), 0)
+                self.assertEqual(self.same_group_meetings(bracket, 2), 0)
+
+    def test_group_winners_keep_their_places(self):
+        seeds = group_seeds(8, 2)
+        bracket = build_bracket(seeds)
+        plain = bracket_seed_order(16)
+        self.assertEqual(
+            [team1 for team1, _ in bracket],
+            [seeds[seed - 1][0] for seed in plain[::2]],
+        )
+
+    def test_unavoidable_meetings_stay_out_of_the_first_round(self):
+        bracket = build_bracket(group_seeds(2, 4))
+        self.assertEqual(self.same_group_meetings(bracket, 1), 0)
+
+    def test_single_group_keeps_the_seeded_draw(self):
+        seeds = [(f"T{seed}", 0) for seed in range(1, 9)]
+        self.assertEqual(
+            build_bracket(seeds),
+            [("T1", "T8"), ("T4", "T5"), ("T2", "T7"), ("T3", "T6")],
+        )
+
+
+class KnockoutRoundTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        teams = seed_teams(8)
+        self.games = KnockoutGame.objects.bulk_create(
+            KnockoutGame(team1=team1, team2=team2, round="QF", position=position)
+            for position, (team1, team2) in enumerate(zip(teams[::2], teams[1::2]))
+        )
+
+    def next_round(self):
+        return self.client.post(
+            "/api/v1/ko-stage/next-round/",
+            {"current_round": "QF", "next_round": "SF"},
+            format="json",
+        )
+
+    def play(self, games, winners_first=True):
+        for game in games:
+            game.score_team1, game.score_team2 = (10, 5) if winners_first else (5, 10)
+            game.played = True
+        KnockoutGame.objects.bulk_update(
+            games, ["score_team1", "score_team2", "played"]
+        )
+
+    def test_round_must_be_decided(self):
+        self.play(self.games[:2])
+        response = self.next_round()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(KnockoutGame.objects.filter(round="SF").exists())
+
+    def test_winners_meet_in_bracket_order(self):
+        self.play(self.games[:2])
+        self.play(self.games[2:], winners_first=False)
+        self.assertEqual(self.next_round().status_code, 201)
+        semi_finals = KnockoutGame.objects.filter(round="SF").order_by("position")
+        self.assertEqual(
+            [(game.team1_id, game.team2_id) for game in semi_finals],
+            [
+                (self.games[0].team1_id, self.games[1].team1_id),
+                (self.games[2].team2_id, self.games[3].team2_id),
+            ],
+        )
+
+
+@override_settings(DATABASE_REPLICAS=["replica1", "replica2", "replica3"])
+class ReplicaRoutingTests(SimpleTestCase):
+    def route(self, request, status_code=200):
+        """The databases the request's reads went to, and the response."""
+        router = ReplicaRouter()
+        reads = []
+
+        def view(request):
+            reads.extend(router.db_for_read(Game) for _ in range(20))
+            return HttpResponse(status=status_code)
+
+        return reads, ReplicaRoutingMiddleware(view)(request)
+
+    def test_a_request_reads_from_a_single_replica(self):
+        reads, _ = self.route(RequestFactory().get("/api/v1/games/"))
+        self.assertEqual(len(set(reads)), 1)
+        self.assertIn(reads[0], ["replica1", "replica2", "replica3"])
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        _, response = self.route(RequestFactory().post("/api/v1/games/"), 201)
+        pin = response[PIN_HEADER]
+
+        factory = RequestFactory()
+        factory.cookies[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        reads, _ = self.route(factory.get("/api/v1/games/"))
+        self.assertEqual(set(reads), {"default"})
+
+        # Clients without cookies echo the header, e.g. after logging in.
+        request = RequestFactory().get(
+            "/api/v1/games/", HTTP_AUTHORIZATION="Bearer token", HTTP_REPLICA_PIN=pin
+        )
+        reads, _ = self.route(request)
+        self.assertEqual(set(reads), {"default"})
+
+    def test_forged_and_expired_pins_are_ignored(self):
+        _, response = self.route(RequestFactory().post("/api/v1/games/"), 201)
+        expired = response[PIN_HEADER]
+        for pin, pin_seconds in (("forged", 10), (expired, -1)):
+            request = RequestFactory().get("/api/v1/games/", HTTP_REPLICA_PIN=pin)
+            with self.settings(REPLICA_PIN_SECONDS=pin_seconds):
+                reads, _ = self.route(request)
+            self.assertNotIn("default", reads)
+
+
+class WebhookSubscriptionTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def test_secret_is_only_shown_on_create(self):
+        response = self.client.post(
+            "/api/v1/webhooks/", {"url": "https://example.com/hook"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        subscription = WebhookSubscription.objects.get()
+        self.assertEqual(response.data["secret"], subscription.secret)
+        self.assertEqual(len(subscription.secret), 64)
+
+        url = f"/api/v1/webhooks/{subscription.id}/"
+        for response in (
+            self.client.get("/api/v1/webhooks/"),
+            self.client.get(url),
+            self.client.patch(url, {"secret": "s" * 32}, format="json"),
+        ):
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("secret", str(response.data))
+            self.assertNotIn(subscription.secret, str(response.data))
+        subscription.refresh_from_db()
+        self.assertEqual(subscription.secret, "s" * 32)
+
+
+@override_settings(WEBHOOK_BATCH_SIZE=2, WEBHOOK_CONCURRENCY=2)
+class WebhookDispatchTests(TestCase):
+    def setUp(self):
+        self.slow, self.fast = (
+            WebhookSubscription.objects.create(url=url, secret="secret")
+            for url in ("https://slow.example/", "https://fast.example/")
+        )
+        WebhookDelivery.objects.bulk_create(
+            WebhookDelivery(
+                subscription=subscription,
+                event="game.updated",
+                payload={},
+                next_attempt_at=timezone.now(),
+            )
+            for subscription in (self.slow, self.fast, self.fast, self.fast)
+        )
+
+    def test_slow_receiver_does_not_hold_up_the_others(self):
+        fast_delivered = threading.Event()
+        waited = []
+
+        def send(subscription, deliveries):
+            if subscription == self.slow:
+                waited.append(fast_delivered.wait(5))
+
+        def record(deliveries, error):
+            record_result(deliveries, error)
+            if not self.fast.deliveries.exclude(status=WebhookDelivery.DELIVERED):
+                fast_delivered.set()
+
+        command = "api.management.commands.dispatch_webhooks"
+        with mock.patch(f"{command}.send_batch", send), mock.patch(
+            f"{command}.record_result", record
+        ):
+            call_command(
+                "dispatch_webhooks", "--once", "--poll-interval=0.01", stdout=StringIO()
+            )
+
+        # Both batches of the fast receiver went out while the slow one hung.
+        self.assertEqual(waited, [True])
+        self.assertFalse(
+            WebhookDelivery.objects.exclude(status=WebhookDelivery.DELIVERED)
+        )
+
+
+class PlayerStatsTests(TestCase):
+    def setUp(self):
+        seed_tournament(8, played=0)
+        self.game = Game.objects.select_related("group", "team1", "team2").first()
+
+    def stats(self, team):
+        return list(
+            PlayerStats.objects.filter(player__teams=team)
+            .order_by("player")
+            .values_list("games", "wins", "cups_scored", "cups_conceded")
+        )
+
+    def test_stale_instances_do_not_apply_a_result_twice(self):
+        # Two referees opened the game before either of them saved it.
+        first = Game.objects.get(pk=self.game.pk)
+        second = Game.objects.get(pk=self.game.pk)
+        for instance in (first, second):
+            serializer = GameSerializer(
+                instance,
+                data={"score_team1": 10, "score_team2": 5, "played": True},
+                partial=True,
+            )
+            serializer.is_valid(raise_exception=True)
+            save_score(serializer)
+
+        self.assertEqual(self.stats(self.game.team1), [(1, 1, 10, 5)] * 2)
+        self.assertEqual(self.stats(self.game.team2), [(1, 0, 5, 10)] * 2)
+        self.assertEqual(ScoreEvent.objects.filter(game=self.game).count(), 1)
+
+    def test_stale_instance_records_the_saved_score_as_previous(self):
+        first = Game.objects.get(pk=self.game.pk)
+        second = Game.objects.get(pk=self.game.pk)
+        for instance, scores in ((first, (10, 5)), (second, (7, 10))):
+            serializer = GameSerializer(
+                instance,
+                data={
+                    "score_team1": scores[0],
+                    "score_team2": scores[1],
+                    "played": True,
+                },
+                partial=True,
+            )
+            serializer.is_valid(raise_exception=True)
+            save_score(serializer)
+
+        event = ScoreEvent.objects.filter(game=self.game).latest("id")
+        self.assertEqual(
+            (event.previous_score_team1, event.previous_score_team2), (10, 5)
+        )
+        self.assertEqual(self.stats(self.game.team1), [(1, 0, 7, 10)] * 2)
+
+    def test_corrections_move_the_stats(self):
+        for scores in ((10, 5), (4, 10)):
+            serializer = GameSerializer(
+                Game.objects.get(pk=self.game.pk),
+                data={
+                    "score_team1": scores[0],
+                    "score_team2": scores[1],
+                    "played": True,
+                },
+                partial=True,
+            )
+            serializer.is_valid(raise_exception=True)
+            save_score(serializer)
+
+        self.assertEqual(self.stats(self.game.team1), [(1, 0, 4, 10)] * 2)
+        self.assertEqual(self.stats(self.game.team2), [(1, 1, 10, 4)] * 2)
+        event = ScoreEvent.objects.filter(game=self.game).latest("id")
+        self.assertEqual(
+            (event.previous_score_team1, event.previous_score_team2), (10, 5)
+        )
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="referee")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        seed_teams(30)
+        # Most players are still tied at zero wins.
+        PlayerStats.objects.filter(player_id__in=[5, 17, 42]).update(
+            wins=2, cups_scored=20
+        )
+        PlayerStats.objects.filter(player_id=9).update(wins=2, cups_scored=25)
+        self.expected = list(
+            PlayerStats.objects.order_by(
+                "-wins", "-cups_scored", "player_id"
+            ).values_list("player__name", flat=True)
+        )
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([entry["name"] for entry in response.data["results"]])
+            url = response.data[link]
+        return pages
+
+    def test_pages_cover_every_player_once_in_order(self):
+        pages = self.walk("/api/v1/players/leaderboard/?page_size=7", "next")
+        self.assertEqual([len(page) for page in pages], [7] * 8 + [4])
+        self.assertEqual([player for page in pages for player in page], self.expected)
+
+    def test_previous_links_walk_back(self):
+        forward = self.walk("/api/v1/players/leaderboard/?page_size=7", "next")
+        response = self.client.get("/api/v1/players/leaderboard/?page_size=7")
+        for _ in range(len(forward) - 1):
+            response = self.client.get(response.data["next"])
+        backward = self.walk(response.data["previous"], "previous")
+        self.assertEqual(backward, forward[-2::-1])
+
+    def test_invalid_cursor(self):
+        for payload in (
+            [False, [{"a": 1}, 1, 1]],
+            [False, ["x", 1, 1]],
+            [False, [None, None, None]],
+            [False, [[1], 1, 1]],
+            [False, [2**70, 1, 1]],
+            [False, [1, 1]],
+            ["yes", [1, 1, 1]],
+        ):
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            response = self.client.get(f"/api/v1/players/leaderboard/?cursor={cursor}")
+            self.assertEqual(response.status_code, 404, payload)
+        response = self.client.get("/api/v1/players/leaderboard/?cursor=nonsense")
+        self.assertEqual(response.status_code, 404)
+
+
+class TiebreakTests(TestCase):
+    def setUp(self):
+        self.teams = seed_teams(4)
+        self.group = TournamentGroup.objects.create(name="Group A")
+        self.group.teams.set(self.teams)
+
+    def play(self, *results):
+        Game.objects.bulk_create(
+            Game(
+                group=self.group,
+                team1=self.teams[team1],
+                team2=self.teams[team2],
+                score_team1=score1,
+                score_team2=score2,
+                played=score1 is not None,
+            )
+            for team1, team2, score1, score2 in results
+        )
+
+    def ranking(self):
+        [(_, standings)] = compute_group_tables()
+        return [self.teams.index(stats["team"]) for stats in standings]
+
+    def test_direct_result_breaks_a_two_team_tie(self):
+        # Teams 0 and 1 both take six points; team 1 has the far better cup
+        # difference, but team 0 won their game.
+        self.play(
+            (0, 1, 10, 9),
+            (0, 2, 10, 8),
+            (0, 3, 0, 10),
+            (1, 2, 10, 0),
+            (1, 3, 10, 0),
+            (2, 3, 10, 0),
+        )
+        self.assertEqual(self.ranking(), [0, 1, 2, 3])
+        with self.settings(
+            TOURNAMENT_TIEBREAKERS=["points", "cup_difference", "cups_scored"]
+        ):
+            self.assertEqual(self.ranking(), [1, 0, 2, 3])
+
+    def test_head_to_head_among_three_tied_teams(self):
+        # Teams 0, 1 and 2 beat each other in a circle and all beat team 3.
+        # Their games against each other leave them level, so cup difference
+        # over all games decides.
+        self.play(
+            (0, 1, 10, 9),
+            (1, 2, 10, 0),
+            (2, 0, 10, 8),
+            (0, 3, 10, 0),
+            (1, 3, 10, 0),
+            (2, 3, 10, 0),
+        )
+        self.assertEqual(self.ranking(), [1, 0, 2, 3])
+
+    def test_simulation_ranks_like_the_standings(self):
+        self.play(
+            (0, 1, 10, 9),
+            (0, 2, 10, 8),
+            (0, 3, 0, 10),
+            (1, 2, 10, 0),
+            (1, 3, 10, 0),
+            (2, 3, 10, 0),
+        )
+        [group] = simulate_qualification(runs=10, seed=1)["groups"]
+        first = {entry["team"]: entry["first"] for entry in group["teams"]}
+        self.assertEqual(first[self.teams[0].name], 1.0)
+
+    def test_simulation_matches_the_standings_on_finished_groups(self):
+        rng = random.Random(3)
+        for _ in range(30):
+            Game.objects.all().delete()
+            # Low scores, so that ties on points and cups are common.
+            self.play(
+                *(
+                    (team1, team2, rng.randint(0, 3), rng.randint(0, 3))
+                    for team1 in range(4)
+                    for team2 in range(team1 + 1, 4)
+                )
+            )
+            group = TournamentGroup.objects.prefetch_related("teams", "games").get()
+            teams = sorted(group.teams.all(), key=lambda team: team.name)
+            _, order = _simulate_group(
+                None, None, teams, group.games.all(), [], 1, get_tiebreakers()
+            )
+            self.assertEqual(
+                [teams[index] for index in order[0]],
+                [self.teams[index] for index in self.ranking()],
+            )
+
+    def test_simulated_head_to_head_decides_the_open_tie(self):
+        # Team 0 beat team 1, so whenever only those two end level on points
+        # team 0 must finish ahead, whatever the cup difference.
+        self.play(
+            (0, 1, 10, 9),
+            (0, 2, 0, 10),
+            (1, 2, 10, 0),
+            (1, 3, 10, 0),
+            (2, 3, None, None),
+            (0, 3, None, None),
+        )
+        group = TournamentGroup.objects.prefetch_related("teams", "games").get()
+        teams = sorted(group.teams.all(), key=lambda team: team.name)
+        values, order = _simulate_group(
+            np.random.default_rng(1),
+            None,
+            teams,
+            group.games.all(),
+            [],
+            1000,
+            get_tiebreakers(),
+        )
+        points = values["points"]
+        level = (points == points[:, [0]]).sum(axis=1) == 2
+        level &= points[:, 0] == points[:, 1]
+        self.assertTrue(level.any())
+        position = np.argsort(order, axis=1)
+        self.assertTrue((position[level, 0] < position[level, 1]).all())
+
+
+def perfect_pairing_exists(teams, opponents):
+    """Brute force: can `teams` be split into pairs without a rematch?"""
+    if not teams:
+        return True
+    first, rest = teams[0], teams[1:]
+    return any(
+        other not in opponents.get(first, ())
+        and perfect_pairing_exists(rest[:i] + rest[i + 1 :], opponents)
+        for i, other in enumerate(rest)
+    )
+
+
+class SwissPairingTests(SimpleTestCase):
+    def assertValidPairing(self, pairs, teams, opponents):
+        self.assertCountEqual([team for pair in pairs for team in pair], teams)
+        for team1, team2 in pairs:
+            self.assertNotIn(team2, opponents.get(team1, ()))
+
+    def test_pairs_neighbours_in_the_ranking(self):
+        self.assertEqual(_pair([1, 2, 3, 4], {}), [(1, 2), (3, 4)])
+
+    def test_reshuffles_when_the_bottom_is_stuck(self):
+        # Monrad pairs 1-2 and leaves 3 and 4, who have met already.
+        opponents = {3: {4}, 4: {3}}
+        pairs = _pair([1, 2, 3, 4], opponents)
+        self.assertValidPairing(pairs, [1, 2, 3, 4], opponents)
+
+    def test_reshuffles_pairs_higher_up(self):
+        # Monrad pairs 1-2 and 3-5 and strands 4 and 6. The only pairing
+        # without a rematch, 1-4, 2-3, 5-6, breaks up both of those pairs.
+        teams = [1, 2, 3, 4, 5, 6]
+        allowed = {(1, 2), (2, 3), (1, 3), (1, 4), (5, 6), (3, 5)}
+        opponents = {
+            team: {
+                other
+                for other in teams
+                if other != team
+                and (team, other) not in allowed
+                and (other, team) not in allowed
+            }
+            for team in teams
+        }
+        pairs = _pair(teams, opponents)
+        self.assertValidPairing(pairs, teams, opponents)
+        self.assertCountEqual(pairs, [(1, 4), (2, 3), (5, 6)])
+
+    def test_returns_none_without_a_rematch_free_pairing(self):
+        self.assertIsNone(_pair([1, 2, 3, 4], {1: {2, 3, 4}}))
+
+    def test_agrees_with_brute_force(self):
+        # Dense random histories, full of odd cycles of allowed pairs.
+        rng = random.Random(7)
+        for _ in range(300):
+            teams = list(range(rng.choice((4, 6, 8, 10))))
+            opponents = defaultdict(set)
+            for team1 in teams:
+                for team2 in teams[team1 + 1 :]:
+                    if rng.random() < 0.6:
+                        opponents[team1].add(team2)
+                        opponents[team2].add(team1)
+            pairs = _pair(teams, opponents)
+            if perfect_pairing_exists(teams, opponents):
+                self.assertValidPairing(pairs, teams, opponents)
+            else:
+                self.assertIsNone(pairs)
+
+    def test_lowest_ranked_team_without_a_bye_sits_out(self):
+        _, bye = pair_round([1, 2, 3, 4, 5], {})
+        self.assertEqual(bye, 5)
+        _, bye = pair_round([1, 2, 3, 4, 5], {}, had_bye={5, 4})
+        self.assertEqual(bye, 3)
+
+    def test_bye_moves_up_to_avoid_a_rematch(self):
+        pairs, bye = pair_round([1, 2, 3], {1: {2}, 2: {1}})
+        self.assertEqual((pairs, bye), ([(1, 3)], 2))
+
+    def test_rematch_only_rounds_are_rejected(self):
+        with self.assertRaises(ValueError):
+            pair_round([1, 2, 3, 4], {1: {2, 3, 4}})
+
+
+class SwissStandingsTests(TestCase):
+    def test_buchholz_ranks_teams_level_on_points(self):
+        teams = seed_teams(6)
+        group = TournamentGroup.objects.create(name="Swiss", swiss_rounds=2)
+        group.teams.set(teams)
+        Game.objects.bulk_create(
+            Game(
+                group=group,
+                team1=teams[team1],
+                team2=teams[team2],
+                score_team1=score1,
+                score_team2=score2,
+                played=True,
+                swiss_round=round_number,
+            )
+            for round_number, team1, team2, score1, score2 in (
+                (1, 0, 1, 10, 9),
+                (1, 2, 3, 10, 0),
+                (1, 4, 5, 10, 9),
+                (2, 0, 2, 10, 9),
+                (2, 1, 4, 10, 9),
+                (2, 5, 3, 10, 0),
+            )
+        )
+
+        [(_, standings)] = compute_group_tables()
+        # Teams 1, 2, 4 and 5 have three points each. Team 1 met the
+        # strongest opponents; teams 2 and 5 have the best cup difference.
+        self.assertEqual(
+            [(teams.index(stats["team"]), stats["buchholz"]) for stats in standings],
+            [(0, 6), (1, 9), (2, 6), (4, 6), (5, 3), (3, 6)],
+        )
+
+
+class RatingTests(TestCase):
+    def setUp(self):
+        self.teams = seed_teams(4)
+        self.group = TournamentGroup.objects.create(name="Group A")
+
+    def ratings(self, team):
+        return list(
+            PlayerStats.objects.filter(player__teams=team)
+            .order_by("player_id")
+            .values_list("rating", flat=True)
+        )
+
+    def play(self, team1, team2, score1, score2):
+        game = Game.objects.create(
+            group=self.group, team1=self.teams[team1], team2=self.teams[team2]
+        )
+        apply_rating_change(game, (0, 0, False), (score1, score2, True))
+
+    def test_expected_score(self):
+        self.assertEqual(expected_score(1500, 1500), 0.5)
+        self.assertAlmostEqual(expected_score(1900, 1500), 1 / 1.1)
+        self.assertAlmostEqual(
+            expected_score(1620, 1480) + expected_score(1480, 1620), 1
+        )
+
+    @override_settings(RATING_K=32)
+    def test_win_between_equal_teams_moves_half_of_k(self):
+        self.play(0, 1, 10, 5)
+        self.assertEqual(self.ratings(self.teams[0]), [INITIAL_RATING + 16] * 2)
+        self.assertEqual(self.ratings(self.teams[1]), [INITIAL_RATING - 16] * 2)
+
+    def test_recompute_matches_the_incremental_ratings(self):
+        for result in ((0, 1, 10, 5), (2, 3, 10, 10), (0, 2, 3, 10), (1, 3, 10, 9)):
+            self.play(*result)
+        incremental = [self.ratings(team) for team in self.teams]
+
+        PlayerStats.objects.update(rating=INITIAL_RATING)
+        recompute_ratings()
+        for team, ratings in zip(self.teams, incremental):
+            for rating, expected in zip(self.ratings(team), ratings):
+                self.assertAlmostEqual(rating, expected)
+
+
+class ScoreEventTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        seed_tournament(8, played=0)
+        self.games = list(Game.objects.order_by("id")[:4])
+        self.game = self.games[0]
+
+    def score(self, game, score1, score2):
+        serializer = GameSerializer(
+            Game.objects.get(pk=game.pk),
+            data={"score_team1": score1, "score_team2": score2, "played": True},
+            partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        return save_score(serializer)
+
+    def undo(self, event):
+        return self.client.post(f"/api/v1/score-events/{event.id}/undo/")
+
+    def stats(self):
+        return list(
+            PlayerStats.objects.order_by("player").values_list(
+                "games", "wins", "cups_scored", "cups_conceded"
+            )
+        )
+
+    def scores(self):
+        return list(
+            Game.objects.order_by("id").values_list(
+                "score_team1", "score_team2", "played"
+            )
+        )
+
+    def test_only_the_latest_event_can_be_undone(self):
+        first = self.score(self.game, 10, 5)
+        latest = self.score(self.game, 10, 7)
+        self.assertEqual(self.undo(first).status_code, 400)
+        self.assertEqual(self.undo(latest).status_code, 201)
+        self.game.refresh_from_db()
+        self.assertEqual((self.game.score_team1, self.game.score_team2), (10, 5))
+
+    def test_an_event_is_undone_once(self):
+        event = self.score(self.game, 10, 5)
+        self.assertEqual(self.undo(event).status_code, 201)
+        self.assertEqual(self.undo(event).status_code, 400)
+        with self.assertRaises(ValueError):
+            undo_score_event(event.id)
+
+    def test_undo_restores_the_score_and_the_stats(self):
+        scores, stats = self.scores(), self.stats()
+        event = self.score(self.game, 10, 5)
+        self.assertNotEqual(self.stats(), stats)
+
+        revert = undo_score_event(event.id)
+        self.assertEqual(revert.reverts, event)
+        self.assertEqual(self.scores(), scores)
+        self.assertEqual(self.stats(), stats)
+
+    @override_settings(SCORE_SNAPSHOT_INTERVAL=3)
+    def test_snapshots_are_taken_at_the_interval(self):
+        events = [
+            self.score(self.games[score % 4], 10, score).id for score in range(10)
+        ]
+        snapshots = list(
+            ScoreSnapshot.objects.order_by("last_event_id").values_list(
+                "last_event_id", flat=True
+            )
+        )
+        # The first snapshot depends on where the id sequence starts.
+        self.assertLessEqual(snapshots[0], events[2])
+        self.assertGreater(snapshots[-1], events[-4])
+        self.assertEqual(
+            {later - earlier for earlier, later in zip(snapshots, snapshots[1:])},
+            {3},
+        )
+
+    def test_replay_from_a_snapshot_matches_a_full_replay(self):
+        for score in range(6):
+            self.score(self.games[score % 4], 10, score)
+        take_score_snapshot()
+        for score in range(6, 9):
+            self.score(self.games[score % 4], score, 10)
+        undo_score_event(ScoreEvent.objects.latest("id").id)
+
+        from_snapshot = replay_score_events(batch_size=2)
+        ScoreSnapshot.objects.all().delete()
+        self.assertEqual(replay_score_events(batch_size=2), from_snapshot)
+        state, last_id = from_snapshot
+        self.assertEqual(last_id, ScoreEvent.objects.latest("id").id)
+        self.assertEqual(
+            state["games"],
+            {
+                str(game_id): list(scores)
+                for game_id, *scores in Game.objects.filter(
+                    id__in=[game.id for game in self.games]
+                ).values_list("id", "score_team1", "score_team2", "played")
+            },
+        )
+
+    def test_rebuild_restores_the_live_scores(self):
+        for score in range(6):
+            self.score(self.games[score % 4], 10, score)
+        scores = self.scores()
+        self.assertEqual(rebuild_score_projections(), 0)
+
+        Game.objects.filter(id__in=[self.games[0].id, self.games[2].id]).update(
+            score_team1=0, score_team2=0, played=False
+        )
+        self.assertEqual(rebuild_score_projections(batch_size=1), 2)
+        self.assertEqual(self.scores(), scores)
+
+
+class DeletionTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.play()
+        ChangeLogEntry.objects.all().delete()
+
+    def play(self):
+        knockout_stage(8, None)
+        knockout_game = KnockoutGame.objects.order_by("id").first()
+        self.team = knockout_game.team1
+        involved = Q(team1=self.team) | Q(team2=self.team)
+        self.group_game = Game.objects.filter(involved).first()
+        self.other_game = Game.objects.exclude(involved).first()
+        # Corrections go through the log, so every game has an event and a
+        # rated result.
+        for serializer_class, game in (
+            (GameSerializer, self.group_game),
+            (GameSerializer, self.other_game),
+            (KnockoutGameSerializer, knockout_game),
+        ):
+            serializer = serializer_class(
+                game,
+                data={"score_team1": 10, "score_team2": 9, "played": True},
+                partial=True,
+            )
+            serializer.is_valid(raise_exception=True)
+            save_score(serializer)
+        take_score_snapshot()
+
+    def test_reset_removes_the_tournament_and_keeps_the_players(self):
+        players = list(PlayerStats.objects.order_by("player").values_list())
+        rated = RatedResult.objects.count()
+        self.assertTrue(rated)
+        version = get_state_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reset_tournament()
+
+        for model in tournament_models():
+            self.assertFalse(model.objects.exists(), model.__name__)
+        self.assertEqual(
+            list(PlayerStats.objects.order_by("player").values_list()), players
+        )
+        self.assertEqual(
+            RatedResult.objects.filter(game=None, knockout_game=None).count(), rated
+        )
+        self.assertEqual(
+            list(ChangeLogEntry.objects.values_list("entity", flat=True)),
+            [ChangeLogEntry.RESET],
+        )
+        self.assertEqual(get_state_version(), version + 1)
+
+    def test_seeding_again_after_a_reset_reuses_the_players(self):
+        # The benchmark_reset command reseeds between resets.
+        players = dict(Player.objects.values_list("name", "id"))
+        games = dict(PlayerStats.objects.values_list("player", "games"))
+        reset_tournament()
+        teams, _ = seed_tournament(8, played=0)
+
+        self.assertEqual(dict(Player.objects.values_list("name", "id")), players)
+        self.assertEqual(
+            dict(PlayerStats.objects.values_list("player", "games")), games
+        )
+        for team in teams:
+            self.assertEqual(
+                {player.name for player in team.players.all()},
+                {team.member_one, team.member_two},
+            )
+
+    def test_delete_team_removes_everything_that_references_it(self):
+        involved = Q(team1=self.team) | Q(team2=self.team)
+        games = set(Game.objects.filter(involved).values_list("id", flat=True))
+        knockout_games = set(
+            KnockoutGame.objects.filter(involved).values_list("id", flat=True)
+        )
+        groups = set(self.team.tournamentgroup_set.values_list("id", flat=True))
+        kept_games = Game.objects.count() - len(games)
+        players = list(self.team.players.values_list("id", flat=True))
+        rated = RatedResult.objects.count()
+        version = get_state_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_team(self.team.id)
+
+        self.assertFalse(Team.objects.filter(id=self.team.id).exists())
+        self.assertFalse(Game.objects.filter(involved).exists())
+        self.assertEqual(Game.objects.count(), kept_games)
+        self.assertFalse(KnockoutGame.objects.filter(involved).exists())
+        self.assertFalse(
+            TournamentGroup.teams.through.objects.filter(team=self.team.id).exists()
+        )
+        self.assertEqual(
+            list(ScoreEvent.objects.values_list("game", flat=True)),
+            [self.other_game.id],
+        )
+        self.assertFalse(ScoreSnapshot.objects.exists())
+        self.assertEqual(Player.objects.filter(id__in=players).count(), 2)
+        self.assertEqual(RatedResult.objects.count(), rated)
+
+        entries = ChangeLogEntry.objects.values_list("entity", "entity_id", "deleted")
+        self.assertEqual(
+            {(entity, entity_id) for entity, entity_id, deleted in entries if deleted},
+            {(ChangeLogEntry.GAME, game_id) for game_id in games}
+            | {(ChangeLogEntry.KNOCKOUT_GAME, game_id) for game_id in knockout_games},
+        )
+        self.assertEqual(
+            {
+                entity_id
+                for entity, entity_id, deleted in entries
+                if entity == ChangeLogEntry.GROUP
+            },
+            groups,
+        )
+        self.assertEqual(get_state_version(), version + 1)
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.teams, self.groups = seed_tournament(8, played=0)
+        self.sequence = self.sync(0)["sequence"]
+        self.assertTrue(self.sequence)
+
+    def sync(self, since):
+        response = self.client.get(f"/api/v1/sync/?since={since}")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.sync(self.sequence), {"sequence": self.sequence})
+
+    def test_updated_game_and_its_group(self):
+        game = self.groups[0].games.first()
+        self.client.patch(
+            f"/api/v1/games/{game.id}/",
+            {"score_team1": 10, "score_team2": 4, "played": True},
+            format="json",
+        )
+        changes = self.sync(self.sequence)
+        self.assertGreater(changes["sequence"], self.sequence)
+        self.assertEqual([entry["id"] for entry in changes["games"]], [game.id])
+        self.assertEqual(
+            [entry["id"] for entry in changes["standings"]], [self.groups[0].id]
+        )
+        self.assertNotIn("deleted", changes)
+        self.assertEqual(
+            self.sync(changes["sequence"]), {"sequence": changes["sequence"]}
+        )
+
+    def test_deleted_team_and_groups(self):
+        team = self.teams[0]
+        games = sorted(
+            Game.objects.filter(Q(team1=team) | Q(team2=team)).values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual(
+            self.client.delete(f"/api/v1/teams/delete/{team.id}/").status_code, 200
+        )
+        changes = self.sync(self.sequence)
+        self.assertEqual(changes["deleted"]["games"], games)
+
+        self.assertEqual(self.client.delete("/api/v1/groups/delete/").status_code, 200)
+        changes = self.sync(changes["sequence"])
+        self.assertEqual(
+            changes["deleted"]["groups"], sorted(group.id for group in self.groups)
+        )
+        self.assertNotIn("standings", changes)
+
+    def test_reset_tells_clients_to_refetch(self):
+        reset_tournament()
+        changes = self.sync(self.sequence)
+        self.assertIs(changes["reset"], True)
+        self.assertEqual(
+            self.sync(changes["sequence"]), {"sequence": changes["sequence"]}
+        )
+
+    def test_cursor_older_than_the_log(self):
+        game = self.groups[0].games.first()
+        for score in (1, 2):
+            game.score_team1 = score
+            game.save()
+        ChangeLogEntry.objects.filter(
+            id__lte=ChangeLogEntry.objects.latest("id").id - 1
+        ).delete()
+        changes = self.sync(self.sequence)
+        self.assertIs(changes["reset"], True)
+        self.assertEqual(changes["sequence"], ChangeLogEntry.objects.latest("id").id)
+
+    def test_cursor_ahead_of_the_log(self):
+        changes = self.sync(self.sequence + 100)
+        self.assertEqual(changes, {"sequence": self.sequence, "reset": True})
+
+
+class TeamSearchTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="referee")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        seed_teams(45)
+        for name, member_one, member_two in (
+            ("Émile Team", "Zoë", "Otto"),
+            ("Les Amis", "Anna", "Björn"),
+            ("Mile High", "Kai", "Lena"),
+        ):
+            Team.objects.create(name=name, member_one=member_one, member_two=member_two)
+
+    def search(self, query, **params):
+        response = self.client.get("/api/v1/teams/search/", {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [team["name"] for team in response.data["results"]]
+
+    def test_contains_and_prefix_matching(self):
+        self.assertCountEqual(self.search("mile"), ["Émile Team", "Mile High"])
+        self.assertEqual(self.search("mile", match="prefix"), ["Mile High"])
+        # Member names are searched too.
+        self.assertEqual(self.search("kai", match="prefix"), ["Mile High"])
+        self.assertEqual(self.search("nna"), ["Les Amis"])
+        self.assertEqual(self.search("nna", match="prefix"), [])
+
+    def test_case_and_accents_are_ignored(self):
+        self.assertEqual(self.search("ÉMI", match="prefix"), ["Émile Team"])
+        self.assertEqual(self.search("bjorn"), ["Les Amis"])
+        self.assertEqual(self.search("ZOE"), ["Émile Team"])
+        self.assertEqual(self.search(" Björn "), ["Les Amis"])
+
+    def test_pages_follow_the_name_key(self):
+        names, url = [], "/api/v1/teams/search/?q=team&page_size=10"
+        while url:
+            response = self.client.get(url)
+            names.extend(team["name"] for team in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(len(names), 46)
+        self.assertEqual(names, sorted(names, key=search_key))
+
+    def test_invalid_queries(self):
+        for params in ({}, {"q": "  "}, {"q": "team", "match": "exact"}):
+            response = self.client.get("/api/v1/teams/search/", params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_migration_backfills_the_same_keys(self):
+        migration = importlib.import_module("api.migrations.0019_team_search_keys")
+        for value in ("Émile", "ÅSA-Lena ", "Zoë", "straße"):
+            self.assertEqual(migration.search_key(value), search_key(value))
+
+        expected = list(Team.objects.order_by("id").values_list(*migration.SEARCH_KEYS))
+        Team.objects.update(name_key="", member_one_key="", member_two_key="")
+        migration.backfill_search_keys(django_apps, None)
+        self.assertEqual(
+            list(Team.objects.order_by("id").values_list(*migration.SEARCH_KEYS)),
+            expected,
+        )
+
+
+class WireFormatTests(TestCase):
+    decoders = {
+        "application/msgpack": lambda content: msgpack.unpackb(content, raw=False),
+        "application/cbor": cbor2.loads,
+    }
+    encoders = {
+        "application/msgpack": msgpack.packb,
+        "application/cbor": cbor2.dumps,
+    }
+
+    def setUp(self):
+        user = User.objects.create_user(username="referee")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        seed_tournament(8, played=0.5)
+        self.game = Game.objects.filter(played=False).first()
+
+    def test_json_is_the_default(self):
+        for accept in (None, "*/*"):
+            headers = {"HTTP_ACCEPT": accept} if accept else {}
+            response = self.client.get("/api/v1/games/", **headers)
+            self.assertEqual(response["Content-Type"], "application/json")
+
+    def test_binary_responses_carry_the_json_data(self):
+        expected = self.client.get("/api/v1/games/").json()
+        for media_type, decode in self.decoders.items():
+            response = self.client.get("/api/v1/games/", HTTP_ACCEPT=media_type)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], media_type)
+            # Dates are sent as the same strings as in JSON.
+            self.assertEqual(decode(response.content), expected)
+
+    def test_binary_request_bodies(self):
+        for score, (media_type, encode) in enumerate(self.encoders.items()):
+            response = self.client.patch(
+                f"/api/v1/games/{self.game.id}/",
+                encode({"score_team1": 10, "score_team2": score, "played": True}),
+                content_type=media_type,
+            )
+            self.assertEqual(response.status_code, 200)
+            self.game.refresh_from_db()
+            self.assertEqual(
+                (self.game.score_team1, self.game.score_team2), (10, score)
+            )
+
+    def test_malformed_bodies_are_rejected(self):
+        for media_type in self.encoders:
+            response = self.client.patch(
+                f"/api/v1/games/{self.game.id}/",
+                b"\xc1\xff\x00",
+                content_type=media_type,
+            )
+            self.assertEqual(response.status_code, 400)
+
+
+class GraphicsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username="referee")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            knockout_stage(8, None)
+        self.team = KnockoutGame.objects.order_by("id").first().team1
+        self.team.name = "<Bad & 'Co'>"
+        self.team.save()
+
+    def texts(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/svg+xml; charset=utf-8")
+        root = ElementTree.fromstring(response.content)
+        return [
+            element.text for element in root.iter("{http://www.w3.org/2000/svg}text")
+        ]
+
+    def test_text_is_escaped(self):
+        self.assertIn(
+            ">&lt;Bad &amp; &#x27;Co&#x27;&gt;</text>", _text(0, 0, "<Bad & 'Co'>")
+        )
+
+    def test_standings_list_every_team(self):
+        texts = self.texts(self.client.get("/api/v1/graphics/standings/"))
+        self.assertIn("<Bad & 'Co'>", texts)
+        for team in Team.objects.all():
+            self.assertIn(team.name, texts)
+        for group in TournamentGroup.objects.all():
+            self.assertIn(group.name, texts)
+
+    def test_bracket_lists_the_knockout_teams(self):
+        texts = self.texts(self.client.get("/api/v1/graphics/bracket/"))
+        for game in KnockoutGame.objects.filter(team1__isnull=False):
+            self.assertIn(game.team1.name, texts)
+
+    def test_revalidation_until_the_next_score(self):
+        url = "/api/v1/graphics/standings/"
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        game = Game.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            game.score_team1 = 0
+            game.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_png_needs_cairosvg(self):
+        with mock.patch.dict(sys.modules, {"cairosvg": None}):
+            response = self.client.get(
+                "/api/v1/graphics/standings/", HTTP_ACCEPT="image/png"
+            )
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+        cairosvg = SimpleNamespace(svg2png=lambda bytestring: b"PNG" + bytestring)
+        with mock.patch.dict(sys.modules, {"cairosvg": cairosvg}):
+            response = self.client.get("/api/v1/graphics/standings/?format=png")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertTrue(response.content.startswith(b"PNG<svg"))
+
+
+# Pool processes read their settings from the environment, not from
+# override_settings.
+@mock.patch.dict(os.environ, {"PASSWORD_HASH_ITERATIONS": "1000"})
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class LoginTests(TestCase):
+    password = "check-in-2024"
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="referee", password=self.password)
+        self.addCleanup(shutdown_pool)
+
+    def login(self, username="referee", password=password):
+        return APIClient().post(
+            "/api/v1/token/",
+            {"username": username, "password": password},
+            format="json",
+        )
+
+    def test_login_with_and_without_the_pool(self):
+        for workers in (0, 2):
+            with self.settings(PASSWORD_HASH_WORKERS=workers):
+                response = self.login()
+                self.assertEqual(response.status_code, 200, workers)
+                self.assertIn("access", response.data)
+                self.assertEqual(self.login(password="wrong").status_code, 401)
+                self.assertEqual(self.login(username="nobody").status_code, 401)
+
+    def test_outdated_hashes_are_upgraded_on_login(self):
+        hasher = ConfigurablePBKDF2PasswordHasher()
+        for workers in (0, 2):
+            for outdated in (
+                hasher.encode(self.password, hasher.salt(), iterations=500),
+                hashers.make_password(self.password, hasher="pbkdf2_sha1"),
+            ):
+                self.user.password = outdated
+                self.user.save()
+                with self.settings(PASSWORD_HASH_WORKERS=workers):
+                    self.assertEqual(self.login().status_code, 200)
+                self.user.refresh_from_db()
+                self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+                self.assertTrue(self.user.check_password(self.password))
+
+
+@override_settings(PASSWORD_HASH_WORKERS=0, PASSWORD_HASH_ITERATIONS=1)
+class BulkUserTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="admin", is_staff=True)
+        )
+        User.objects.create_user(username="taken", password="secret")
+
+    def test_every_row_gets_a_result(self):
+        response = self.client.post(
+            "/api/v1/users/bulk/",
+            {
+                "users": [
+                    {"username": "ana", "password": "one"},
+                    {"username": "taken", "password": "two"},
+                    {"username": "ana", "password": "three"},
+                    {"username": "", "password": "four"},
+                    {"username": "bad name!", "password": "five"},
+                    {"username": "nopass"},
+                    "bob",
+                    None,
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        results = response.data["data"]
+        self.assertEqual(
+            [(row["username"], row["status"]) for row in results],
+            [
+                ("ana", "created"),
+                ("taken", "exists"),
+                ("ana", "invalid"),
+                ("", "invalid"),
+                ("bad name!", "invalid"),
+                ("nopass", "invalid"),
+                (None, "invalid"),
+                (None, "invalid"),
+            ],
+        )
+        self.assertEqual(results[2]["errors"], {"username": ["Listed more than once."]})
+        self.assertIn("username", results[3]["errors"])
+        self.assertIn("username", results[4]["errors"])
+        self.assertIn("password", results[5]["errors"])
+        self.assertEqual(set(results[6]["errors"]), {"username", "password"})
+
+        ana = User.objects.get(username="ana")
+        self.assertEqual(results[0]["id"], ana.id)
+        self.assertTrue(ana.check_password("one"))
+        self.assertTrue(User.objects.get(username="taken").check_password("secret"))
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(response.data["message"], "1 users created, 7 skipped.")
+
+    def test_nothing_to_create(self):
+        response = self.client.post(
+            "/api/v1/users/bulk/",
+            {"users": [{"username": "taken", "password": "again"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"][0]["status"], "exists")
+
+        for payload in ({}, {"users": []}, {"users": "ana"}):
+            response = self.client.post("/api/v1/users/bulk/", payload, format="json")
+            self.assertEqual(response.status_code, 400, payload)
+
+    def test_admins_only(self):
+        self.client.force_authenticate(User.objects.get(username="taken"))
+        response = self.client.post(
+            "/api/v1/users/bulk/",
+            {"users": [{"username": "ana", "password": "one"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(User.objects.filter(username="ana").exists())
+
+
+class StandingsTimelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            seed_tournament(8, played=0)
+        self.games = list(Game.objects.order_by("id")[:4])
+
+    def score(self, game, score1, score2):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/v1/games/{game.id}/",
+                {"score_team1": score1, "score_team2": score2, "played": True},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def timeline(self):
+        response = self.client.get("/api/v1/groups/standings/timeline/")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_games_in_completion_order(self):
+        first, second, third, fourth = self.games
+        self.score(third, 10, 2)
+        self.score(first, 3, 10)
+        self.score(second, 10, 9)
+        # A correction keeps the time the game was first completed.
+        self.score(third, 2, 10)
+        # Games completed before completed_at was recorded come first.
+        Game.objects.filter(pk=fourth.pk).update(
+            score_team1=10, score_team2=0, played=True
+        )
+
+        timeline = compute_standings_timeline()
+        self.assertEqual(
+            [entry["game"] for entry in timeline],
+            [fourth.id, third.id, first.id, second.id],
+        )
+        self.assertIsNone(timeline[0]["completed_at"])
+        times = [entry["completed_at"] for entry in timeline[1:]]
+        self.assertEqual(times, sorted(times))
+
+        # The corrected result is the one replayed: only team2 gains points.
+        third.refresh_from_db()
+        before = {}
+        if timeline[0]["group"] == timeline[1]["group"]:
+            before = {row["team"]: row["points"] for row in timeline[0]["standings"]}
+        after = {row["team"]: row["points"] for row in timeline[1]["standings"]}
+        self.assertEqual(timeline[1]["group"], third.group.name)
+        self.assertEqual(after[third.team1.name], before.get(third.team1.name, 0))
+        self.assertGreater(after[third.team2.name], before.get(third.team2.name, 0))
+
+    def test_cached_timeline_is_invalidated_by_the_next_write(self):
+        first, second = self.games[:2]
+        self.score(first, 10, 5)
+        with mock.patch(
+            "api.views.compute_standings_timeline",
+            wraps=compute_standings_timeline,
+        ) as compute:
+            self.assertEqual([entry["game"] for entry in self.timeline()], [first.id])
+            self.assertEqual([entry["game"] for entry in self.timeline()], [first.id])
+            self.assertEqual(compute.call_count, 1)
+
+            self.score(second, 10, 7)
+            self.assertEqual(
+                [entry["game"] for entry in self.timeline()], [first.id, second.id]
+            )
+            self.assertEqual(compute.call_count, 2)
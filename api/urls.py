@@ -7,6 +7,7 @@ router.register(r"games", views.GameViewSet, basename="games")
 
 urlpatterns = [
     path("teams/", views.TeamListCreate.as_view(), name="team-list"),
+    path("teams/search/", views.TeamSearchView.as_view(), name="team-search"),
     path("teams/delete/<int:pk>/", views.TeamDelete.as_view(), name="team-delete"),
     path("groups/", views.TournamentGroupList.as_view(), name="group-list"),
     path(
@@ -18,6 +19,26 @@ urlpatterns = [
     path(
         "groups/standings/", views.GroupStandingsView.as_view(), name="group-standings"
     ),
+    path(
+        "groups/standings/timeline/",
+        views.StandingsTimelineView.as_view(),
+        name="group-standings-timeline",
+    ),
+    path(
+        "groups/qualification/",
+        views.QualificationProbabilityView.as_view(),
+        name="group-qualification",
+    ),
+    path(
+        "graphics/standings/",
+        views.StandingsGraphicView.as_view(),
+        name="graphics-standings",
+    ),
+    path(
+        "graphics/bracket/",
+        views.BracketGraphicView.as_view(),
+        name="graphics-bracket",
+    ),
     path(
         "ko-stage/",
         views.KnockoutGameListView.as_view(),
@@ -39,11 +60,70 @@ urlpatterns = [
         views.GenerateNextKnockoutRoundView.as_view(),
         name="generate-next-ko-round",
     ),
+    path("swiss/", views.SwissStageView.as_view(), name="swiss-stage"),
+    path(
+        "swiss/generate/",
+        views.GenerateSwissStageView.as_view(),
+        name="generate-swiss-stage",
+    ),
+    path(
+        "swiss/next-round/",
+        views.NextSwissRoundView.as_view(),
+        name="generate-next-swiss-round",
+    ),
+    path("ratings/", views.RatingListView.as_view(), name="rating-list"),
+    path(
+        "ratings/recompute/",
+        views.RecomputeRatingsView.as_view(),
+        name="rating-recompute",
+    ),
+    path(
+        "players/leaderboard/",
+        views.PlayerLeaderboardView.as_view(),
+        name="player-leaderboard",
+    ),
+    path("score-events/", views.ScoreEventList.as_view(), name="score-event-list"),
+    path(
+        "score-events/<int:pk>/undo/",
+        views.UndoScoreEventView.as_view(),
+        name="score-event-undo",
+    ),
     path(
         "reset-tournament/",
         views.ResetTournamentView.as_view(),
         name="reset-tournament",
     ),
+    path(
+        "tournament/settings/",
+        views.TournamentSettingsView.as_view(),
+        name="tournament-settings",
+    ),
+    path(
+        "tournament/export/",
+        views.ExportTournamentView.as_view(),
+        name="tournament-export",
+    ),
+    path("jobs/<int:pk>/", views.JobDetailView.as_view(), name="job-detail"),
+    path("jobs/<int:pk>/result/", views.JobResultView.as_view(), name="job-result"),
+    path("sync/", views.SyncView.as_view(), name="sync"),
+    path(
+        "public/standings/",
+        views.PublicStandingsView.as_view(),
+        name="public-standings",
+    ),
+    path("public/games/", views.PublicGamesView.as_view(), name="public-games"),
+    path("public/bracket/", views.PublicBracketView.as_view(), name="public-bracket"),
+    path(
+        "webhooks/",
+        views.WebhookSubscriptionListCreate.as_view(),
+        name="webhook-list",
+    ),
+    path(
+        "webhooks/<int:pk>/",
+        views.WebhookSubscriptionDetail.as_view(),
+        name="webhook-detail",
+    ),
+    path("users/bulk/", views.BulkCreateUsersView.as_view(), name="user-bulk"),
     path("me/", views.MeView.as_view(), name="me"),
     path("", include(router.urls)),
 ]
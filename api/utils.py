@@ -1,116 +1,718 @@
-from .models import Game, KnockoutGame, TournamentGroup
+from collections import defaultdict
+from itertools import groupby
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max, Q
+from .caching import bump_state_version
+from .changes import batched_changes, record_changes, record_reset
+from .models import (
+    ChangeLogEntry,
+    Game,
+    KnockoutGame,
+    RatedResult,
+    ScoreEvent,
+    ScoreSnapshot,
+    SwissBye,
+    Team,
+    TournamentGroup,
+    TournamentSettings,
+)
+from .ratings import INITIAL_RATING, team_strengths
+from .webhooks import emit_event
+
+THIRD_PLACE_QUALIFIERS = {3: 2, 6: 4, 7: 2}
+KNOCKOUT_ROUNDS = {
+    2: "F",
+    4: "SF",
+    8: "QF",
+    16: "R16",
+    32: "R32",
+    64: "R64",
+    128: "R128",
+    256: "R256",
+}
+MAX_KNOCKOUT_TEAMS = max(KNOCKOUT_ROUNDS)
+# Rounds of the knockout stage in which teams of one group avoid each other.
+EARLY_ROUNDS = 2
+TIEBREAKERS = ("points", "head_to_head", "buchholz", "cup_difference", "cups_scored")
+# A Swiss bye counts as a won game without cups.
+BYE_POINTS = 3
 
 
 def all_group_games_played():
     return not Game.objects.filter(played=False).exists()
 
 
-def generate_games_for_group(group):
-    teams = list(group.teams.all().order_by("name"))
+def unpaired_swiss_rounds():
+    """Whether a Swiss stage still has rounds that were never paired."""
+    return (
+        TournamentGroup.objects.filter(swiss_rounds__isnull=False)
+        .annotate(paired=Max("games__swiss_round"))
+        .filter(Q(paired__isnull=True) | Q(paired__lt=F("swiss_rounds")))
+        .exists()
+    )
 
-    if len(teams) != 4:
-        raise ValueError("One group does not contain four teams.")
 
-    a, b, c, d = teams
+def round_robin_rounds(teams):
+    """
+    Build round-robin rounds with the circle method. Every team meets every
+    other team exactly once; odd-sized groups give one team a bye per round.
+    """
+    teams = list(teams)
+    if len(teams) % 2:
+        teams.append(None)
 
-    custom_order = [
-        (a, b),
-        (c, d),
-        (a, c),
-        (b, d),
-        (d, a),
-        (b, c),
-    ]
+    count = len(teams)
+    rounds = []
+    for round_index in range(count - 1):
+        pairs = []
+        for i in range(count // 2):
+            home, away = teams[i], teams[count - 1 - i]
+            if home is None or away is None:
+                continue
+            if round_index % 2:
+                home, away = away, home
+            pairs.append((home, away))
+        rounds.append(pairs)
+        teams.insert(1, teams.pop())
 
-    for pair in custom_order:
-        Game.objects.create(group=group, team1=pair[0], team2=pair[1])
+    return rounds
 
 
-def get_group_standings():
-    from collections import defaultdict
+def schedule_fixtures(fixtures, tables):
+    """
+    Assign (round, team1, team2, group) fixtures to tables and time slots.
+
+    Each slot takes up to `tables` games and never books a team twice.
+    Earlier rounds go first, then the games whose teams have waited
+    longest, which keeps idle time between games short.
+
+    A slot only looks at the earliest rounds that still have fixtures and
+    stops once its tables are full, so the cost stays close to linear in
+    the number of fixtures instead of re-sorting all of them every slot.
+    """
+    if tables < 1:
+        raise ValueError("At least one table is required.")
+
+    pending = defaultdict(list)
+    for fixture in fixtures:
+        pending[fixture[0]].append(fixture)
+    rounds = sorted(pending)
+    last_slot = {}
+    schedule = []
+    slot = 0
+
+    def waited(fixture):
+        return min(last_slot.get(fixture[1].id, 0), last_slot.get(fixture[2].id, 0))
+
+    while rounds:
+        slot += 1
+        busy = set()
+        table = 0
+
+        for round_index in rounds:
+            if table == tables:
+                break
+            remaining = []
+            for fixture in sorted(pending[round_index], key=waited):
+                _, team1, team2, _ = fixture
+                if table < tables and team1.id not in busy and team2.id not in busy:
+                    table += 1
+                    busy.update((team1.id, team2.id))
+                    last_slot[team1.id] = last_slot[team2.id] = slot
+                    schedule.append((fixture, table, slot))
+                else:
+                    remaining.append(fixture)
+            pending[round_index] = remaining
+
+        rounds = [round_index for round_index in rounds if pending[round_index]]
+
+    return schedule
+
+
+def generate_games_for_groups(groups, tables):
+    fixtures = []
+    for group in groups:
+        teams = sorted(group.teams.all(), key=lambda team: team.name)
+
+        if len(teams) < 2:
+            raise ValueError(f"{group.name} needs at least two teams.")
+
+        for round_index, pairs in enumerate(round_robin_rounds(teams)):
+            fixtures.extend(
+                (round_index, team1, team2, group) for team1, team2 in pairs
+            )
+
+    games = Game.objects.bulk_create(
+        Game(group=group, team1=team1, team2=team2, table=table, slot=slot)
+        for (_, team1, team2, group), table, slot in schedule_fixtures(fixtures, tables)
+    )
+    record_changes(ChangeLogEntry.GAME, [game.id for game in games])
+    record_changes(ChangeLogEntry.GROUP, [group.id for group in groups])
+    bump_state_version()
+
+
+def create_groups(groups_data, tables):
+    """
+    Replace all groups with one group per list of team ids in `groups_data`
+    and schedule their games on `tables` tables.
+    """
+    with batched_changes():
+        TournamentGroup.objects.all().delete()
+
+    groups = TournamentGroup.objects.bulk_create(
+        TournamentGroup(name=f"Group {index}")
+        for index in range(1, len(groups_data) + 1)
+    )
+    TournamentGroup.teams.through.objects.bulk_create(
+        TournamentGroup.teams.through(tournamentgroup=group, team_id=team_id)
+        for group, team_ids in zip(groups, groups_data)
+        for team_id in team_ids
+    )
+    groups = list(
+        TournamentGroup.objects.filter(id__in=[group.id for group in groups])
+        .order_by("id")
+        .prefetch_related("teams")
+    )
+
+    generate_games_for_groups(groups, tables)
+    return groups
+
+
+def get_tiebreakers(swiss=False):
+    """The configured ranking criteria, validated against TIEBREAKERS."""
+    tiebreakers = list(
+        settings.SWISS_TIEBREAKERS if swiss else settings.TOURNAMENT_TIEBREAKERS
+    )
+    unknown = set(tiebreakers) - set(TIEBREAKERS)
+    if unknown:
+        raise ValueError(f"Unknown tiebreakers: {', '.join(sorted(unknown))}")
+    return tiebreakers
+
+
+def _criterion_value(criterion, stats):
+    if criterion == "cup_difference":
+        return stats["cups_scored"] - stats["cups_conceded"]
+    return stats[criterion]
+
+
+def standings_sort_key(stats):
+    """
+    Sort key for teams from different groups, e.g. third-placed teams.
+    Head-to-head and Buchholz do not apply across groups and are skipped.
+    """
+    return tuple(
+        -_criterion_value(criterion, stats)
+        for criterion in get_tiebreakers()
+        if criterion not in ("head_to_head", "buchholz")
+    )
 
-    group_standings = {}
 
-    for group in TournamentGroup.objects.all():
-        standings = defaultdict(
-            lambda: {
-                "team": None,
+def rank_group(table, head_to_head, tiebreakers=None):
+    """
+    Order the team ids of one group by the tiebreak pipeline.
+
+    `table` maps team id to its stats and `head_to_head` maps
+    (team id, opponent id) to the points the team took in their games.
+    Each criterion only reorders teams still level on every earlier one;
+    head-to-head compares the points earned among exactly those teams, and
+    Buchholz the points of every opponent a team has played.
+    Remaining ties fall back to team name, then id.
+    """
+    if tiebreakers is None:
+        tiebreakers = get_tiebreakers()
+
+    blocks = [list(table)]
+    for criterion in tiebreakers:
+        next_blocks = []
+        for block in blocks:
+            if len(block) == 1:
+                next_blocks.append(block)
+                continue
+
+            if criterion == "head_to_head":
+                values = {
+                    team_id: sum(
+                        head_to_head.get((team_id, other), 0)
+                        for other in block
+                        if other != team_id
+                    )
+                    for team_id in block
+                }
+            elif criterion == "buchholz":
+                values = {team_id: buchholz(table, team_id) for team_id in block}
+            else:
+                values = {
+                    team_id: _criterion_value(criterion, table[team_id])
+                    for team_id in block
+                }
+
+            block.sort(key=lambda team_id: -values[team_id])
+            next_blocks.extend(
+                list(tied) for _, tied in groupby(block, key=values.__getitem__)
+            )
+        blocks = next_blocks
+
+    return [
+        team_id
+        for block in blocks
+        for team_id in sorted(block, key=lambda t: (table[t]["team"].name, t))
+    ]
+
+
+def buchholz(table, team_id):
+    return sum(table[opponent]["points"] for opponent in table[team_id]["opponents"])
+
+
+def _empty_tables(groups):
+    return {
+        group.id: {
+            team.id: {
+                "team": team,
                 "points": 0,
                 "cups_scored": 0,
                 "cups_conceded": 0,
+                "played": 0,
+                "opponents": [],
+                "byes": 0,
+            }
+            for team in group.teams.all()
+        }
+        for group in groups
+    }
+
+
+def _apply_result(table, head_to_head, team1_id, team2_id, score1, score2):
+    for team_id, opponent_id, scored, conceded in (
+        (team1_id, team2_id, score1, score2),
+        (team2_id, team1_id, score2, score1),
+    ):
+        stats = table[team_id]
+        stats["played"] += 1
+        stats["opponents"].append(opponent_id)
+        stats["cups_scored"] += scored
+        stats["cups_conceded"] += conceded
+        points = 3 if scored > conceded else 1 if scored == conceded else 0
+        stats["points"] += points
+        head_to_head[(team_id, opponent_id)] += points
+
+
+def compute_group_tables(group_ids=None):
+    """
+    Return [(group, standings)] with every group's teams ranked by the
+    tiebreak pipeline. Stats and head-to-head results for all groups are
+    collected in a single pass over the played games. Swiss stages add
+    their byes and rank by the Swiss tiebreakers.
+
+    Pass `group_ids` to compute only those groups.
+    """
+    groups = TournamentGroup.objects.order_by("id").prefetch_related("teams")
+    games = Game.objects.filter(played=True)
+    if group_ids is not None:
+        groups = groups.filter(id__in=group_ids)
+        games = games.filter(group_id__in=group_ids)
+    groups = list(groups)
+    tables = _empty_tables(groups)
+    head_to_head = {group.id: defaultdict(int) for group in groups}
+
+    games = games.values_list(
+        "group_id", "team1_id", "team2_id", "score_team1", "score_team2"
+    )
+    for group_id, *result in games:
+        _apply_result(tables[group_id], head_to_head[group_id], *result)
+
+    swiss = [group.id for group in groups if group.swiss_rounds is not None]
+    if swiss:
+        byes = SwissBye.objects.filter(group_id__in=swiss)
+        for group_id, team_id in byes.values_list("group_id", "team_id"):
+            stats = tables[group_id][team_id]
+            stats["points"] += BYE_POINTS
+            stats["byes"] += 1
+        for group_id in swiss:
+            table = tables[group_id]
+            for team_id, stats in table.items():
+                stats["buchholz"] = buchholz(table, team_id)
+
+    tiebreakers = get_tiebreakers()
+    swiss_tiebreakers = get_tiebreakers(swiss=True)
+    return [
+        (
+            group,
+            [
+                tables[group.id][team_id]
+                for team_id in rank_group(
+                    tables[group.id],
+                    head_to_head[group.id],
+                    swiss_tiebreakers if group.id in swiss else tiebreakers,
+                )
+            ],
+        )
+        for group in groups
+    ]
+
+
+def compute_standings_timeline():
+    """
+    Rank and points of every team in a group after each played game of that
+    group, in the order the games were completed.
+
+    The games are streamed once in completion order while the group tables
+    are updated in place, so only the four or so teams of the game's group
+    are re-ranked per result instead of replaying all games each time.
+    Swiss byes are not games and do not count here.
+    """
+    groups = {
+        group.id: group
+        for group in TournamentGroup.objects.order_by("id").prefetch_related("teams")
+    }
+    tables = _empty_tables(groups.values())
+    head_to_head = {group_id: defaultdict(int) for group_id in groups}
+    tiebreakers = get_tiebreakers()
+    swiss_tiebreakers = get_tiebreakers(swiss=True)
+
+    games = (
+        Game.objects.filter(played=True)
+        .order_by(F("completed_at").asc(nulls_first=True), "id")
+        .values_list(
+            "id",
+            "completed_at",
+            "group_id",
+            "team1_id",
+            "team2_id",
+            "score_team1",
+            "score_team2",
+        )
+    )
+    timeline = []
+    for game_id, completed_at, group_id, *result in games.iterator():
+        table = tables[group_id]
+        _apply_result(table, head_to_head[group_id], *result)
+        ranking = rank_group(
+            table,
+            head_to_head[group_id],
+            swiss_tiebreakers if groups[group_id].swiss_rounds else tiebreakers,
+        )
+        timeline.append(
+            {
+                "game": game_id,
+                "completed_at": completed_at,
+                "group": groups[group_id].name,
+                "standings": [
+                    {
+                        "rank": rank,
+                        "team": table[team_id]["team"].name,
+                        "points": table[team_id]["points"],
+                    }
+                    for rank, team_id in enumerate(ranking, start=1)
+                ],
             }
         )
+    return timeline
+
+
+def get_group_standings():
+    return {group.id: standings for group, standings in compute_group_tables()}
+
+
+def knockout_spots(group_count, group_size, knockout_rounds=None):
+    """
+    Return (places, extra): the top `places` teams of every group qualify,
+    plus the `extra` best teams finishing in the next place.
+
+    Without a configured number of knockout rounds the top two qualify and
+    the best thirds fill the bracket for three, six or seven groups.
+    """
+    if knockout_rounds is None or group_count == 0:
+        return 2, THIRD_PLACE_QUALIFIERS.get(group_count, 0)
+
+    needed = 2**knockout_rounds
+    places = min(needed // group_count, group_size)
+    extra = needed - places * group_count if places < group_size else 0
+    return places, extra
+
+
+def get_knockout_qualifiers(group_standings, places=2, extra=None, strength=None):
+    """
+    Return the qualified (team, group_id) pairs in seed order: all group
+    winners, then all runners-up and so on, then the best `extra` teams of
+    the next place, each tier ranked by its group record.
+
+    With `strength` (team id to rating), the qualifying tiers are ranked by
+    rating instead. Who qualifies as a best third is still decided by the
+    group record.
+    """
+    if extra is None:
+        extra = THIRD_PLACE_QUALIFIERS.get(len(group_standings), 0)
+
+    tiers = [[] for _ in range(places + 1)]
+    for group_id, standings in group_standings.items():
+        for place, stats in enumerate(standings[: places + 1]):
+            tiers[place].append((stats, group_id))
+
+    for tier in tiers:
+        tier.sort(key=lambda entry: standings_sort_key(entry[0]))
+    tiers = tiers[:places] + [tiers[places][:extra]]
+
+    if strength is not None:
+        for tier in tiers:
+            tier.sort(
+                key=lambda entry: -strength.get(entry[0]["team"].id, INITIAL_RATING)
+            )
+
+    qualified = [entry for tier in tiers for entry in tier]
+    return [(stats["team"], group_id) for stats, group_id in qualified]
+
+
+def bracket_seed_order(size):
+    """Seed numbers in bracket order, e.g. [1, 8, 4, 5, 2, 7, 3, 6] for 8."""
+    order = [1]
+    while len(order) < size:
+        total = 2 * len(order) + 1
+        order = [seed for top in order for seed in (top, total - top)]
+    return order
+
+
+def build_bracket(seeds):
+    """
+    Place seeded (team, group_id) entries into a single-elimination bracket.
+
+    The bracket is padded to the next power of two; the top seeds receive
+    the byes. Top seeds keep their place in the bracket. Each of them, best
+    first, then gets the lower seed closest to its seeded opponent that
+    comes from a group not yet drawn into the part of the bracket it meets
+    within the first EARLY_ROUNDS rounds. Where no such lower seed is left,
+    a first-round clash is still avoided if possible, and clashes left at
+    the end are traded away with other pairs.
+    """
+    size = 1
+    while size < len(seeds):
+        size *= 2
+
+    order = bracket_seed_order(size)
+    pairs = [[seeds[order[i] - 1], None] for i in range(0, size, 2)]
+    # The lower seeds still to place, by seed number, and the seed each pair
+    # would meet in a plain seeded draw.
+    lower = {
+        order[i + 1]: seeds[order[i + 1] - 1]
+        for i in range(0, size, 2)
+        if order[i + 1] <= len(seeds)
+    }
+    opponents = [order[i + 1] for i in range(0, size, 2)]
+    blocks = [2**i for i in range(EARLY_ROUNDS) if 2**i <= len(pairs)]
+
+    def meets_own_group(index, entry, block):
+        start = index - index % block
+        return any(
+            other is not None and other[1] == entry[1]
+            for pair in pairs[start : start + block]
+            for other in pair
+        )
 
-        for game in group.games.filter(played=True):
-            t1, t2 = game.team1, game.team2
-            s1, s2 = game.score_team1, game.score_team2
-
-            for team, scored, conceded in [(t1, s1, s2), (t2, s2, s1)]:
-                stats = standings[team.id]
-                stats["team"] = team
-                stats["cups_scored"] += scored
-                stats["cups_conceded"] += conceded
-                if scored > conceded:
-                    stats["points"] += 3
-                elif scored == conceded:
-                    stats["points"] += 1
-
-        sorted_teams = sorted(
-            standings.values(),
-            key=lambda x: (
-                -x["points"],
-                -(x["cups_scored"] - x["cups_conceded"]),
-                -x["cups_scored"],
+    for index in sorted(range(len(pairs)), key=lambda index: order[2 * index]):
+        ideal = opponents[index]
+        if ideal > len(seeds):
+            # A bye.
+            continue
+        candidates = sorted(lower, key=lambda seed: (abs(seed - ideal), seed))
+        chosen = next(
+            (
+                seed
+                for block in reversed(blocks)
+                for seed in candidates
+                if not meets_own_group(index, lower[seed], block)
             ),
+            candidates[0],
         )
-        group_standings[group.id] = sorted_teams
+        pairs[index][1] = lower.pop(chosen)
+
+    def clashes(index):
+        # Same-group meetings around pair `index`, first round first.
+        counts = []
+        for block in blocks:
+            start = index - index % block
+            groups = [
+                entry[1]
+                for pair in pairs[start : start + block]
+                for entry in pair
+                if entry is not None
+            ]
+            counts.append(len(groups) - len(set(groups)))
+        return counts
+
+    def trade(index):
+        for other in sorted(range(len(pairs)), key=lambda other: abs(other - index)):
+            if other == index or pairs[other][1] is None:
+                continue
+            before = [a + b for a, b in zip(clashes(index), clashes(other))]
+            pairs[index][1], pairs[other][1] = pairs[other][1], pairs[index][1]
+            if [a + b for a, b in zip(clashes(index), clashes(other))] < before:
+                return True
+            pairs[index][1], pairs[other][1] = pairs[other][1], pairs[index][1]
+        return False
+
+    # The last pairs to draw can be left with clashing seeds only. Trade
+    # those with the nearest pair for which fewer clashes remain, until no
+    # trade helps.
+    for _ in range(len(pairs)):
+        traded = False
+        for index, pair in enumerate(pairs):
+            if pair[1] is not None and any(clashes(index)):
+                traded = trade(index) or traded
+        if not traded:
+            break
 
-    return group_standings
+    return [(pair[0][0], pair[1][0] if pair[1] is not None else None) for pair in pairs]
 
 
-def generate_knockout_stage():
+def generate_knockout_stage(seeding="standings"):
+    """
+    Draw the knockout bracket from the group standings. With
+    seeding="rating" the qualifiers of each place are seeded by their
+    players' ratings instead of their group record.
+    """
+    if seeding not in ("standings", "rating"):
+        raise ValueError("Seeding must be 'standings' or 'rating'.")
     if not all_group_games_played():
         raise Exception("Not all group games have been played.")
+    if unpaired_swiss_rounds():
+        raise Exception("Not all Swiss rounds have been played.")
 
-    KnockoutGame.objects.all().delete()
+    with batched_changes():
+        KnockoutGame.objects.all().delete()
 
+    tournament = TournamentSettings.load()
     group_standings = get_group_standings()
-    group_count = len(group_standings)
-    teams_for_ko = []
-
-    for standings in group_standings.values():
-        teams_for_ko.extend([standings[0]["team"], standings[1]["team"]])
-
-    if group_count in [3, 6, 7]:
-        third_place_teams = [s[2] for s in group_standings.values()]
-        third_place_teams_sorted = sorted(
-            third_place_teams,
-            key=lambda x: (
-                -x["points"],
-                -(x["cups_scored"] - x["cups_conceded"]),
-                -x["cups_scored"],
-            ),
-        )
-        needed = {3: 2, 6: 4, 7: 2}[group_count]
-        teams_for_ko.extend(t["team"] for t in third_place_teams_sorted[:needed])
-
-    ko_team_count = len(teams_for_ko)
-    if ko_team_count not in [4, 8, 16]:
+    # A Swiss stage is one group of every team, larger than group_size.
+    group_size = max(map(len, group_standings.values()), default=tournament.group_size)
+    places, extra = knockout_spots(
+        len(group_standings), group_size, tournament.knockout_rounds
+    )
+    strength = team_strengths() if seeding == "rating" else None
+    seeds = get_knockout_qualifiers(group_standings, places, extra, strength)
+    ko_team_count = len(seeds)
+    if not 2 <= ko_team_count <= MAX_KNOCKOUT_TEAMS:
         raise Exception(f"Invalid Knockout Stage team count: {ko_team_count}")
 
-    round_code = {4: "SF", 8: "QF", 16: "R16"}[ko_team_count]
-
-    matchups = []
-    sorted_teams = teams_for_ko
-    for i in range(ko_team_count // 2):
-        team1 = sorted_teams[i]
-        team2 = sorted_teams[-(i + 1)]
-        matchups.append((team1, team2))
+    bracket = build_bracket(seeds)
+    round_code = KNOCKOUT_ROUNDS[len(bracket) * 2]
 
-    for team1, team2 in matchups:
-        KnockoutGame.objects.create(
+    knockout_games = KnockoutGame.objects.bulk_create(
+        KnockoutGame(
             team1=team1,
             team2=team2,
-            played=False,
+            played=team2 is None,
             round=round_code,
+            position=position,
+        )
+        for position, (team1, team2) in enumerate(bracket)
+    )
+    record_changes(ChangeLogEntry.KNOCKOUT_GAME, [game.id for game in knockout_games])
+    emit_event(
+        "knockout_stage.generated", lambda: knockout_round_payload(knockout_games)
+    )
+    bump_state_version()
+
+
+def knockout_round_payload(knockout_games):
+    return {
+        "round": knockout_games[0].round if knockout_games else None,
+        "games": [
+            {
+                "id": game.id,
+                "position": game.position,
+                "team1": game.team1.name,
+                "team2": game.team2.name if game.team2 is not None else None,
+            }
+            for game in knockout_games
+        ],
+    }
+
+
+def tournament_models():
+    """Tournament tables in an order that deletes children before parents."""
+    return [
+        ScoreSnapshot,
+        ScoreEvent,
+        KnockoutGame,
+        Game,
+        SwissBye,
+        TournamentGroup.teams.through,
+        TournamentGroup,
+        Team.players.through,
+        Team,
+    ]
+
+
+def reset_tournament():
+    """
+    Delete every team, group, game and score event in one transaction.
+    Players and their career stats are kept.
+
+    Rows are never loaded into Python: PostgreSQL truncates all tables in
+    one statement, other databases run one DELETE per table.
+    """
+    tables = [
+        connection.ops.quote_name(model._meta.db_table) for model in tournament_models()
+    ]
+
+    with transaction.atomic():
+        # Rated results outlive the games they came from.
+        RatedResult.objects.filter(
+            Q(game__isnull=False) | Q(knockout_game__isnull=False)
+        ).update(game=None, knockout_game=None)
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"TRUNCATE {', '.join(tables)}")
+            else:
+                for table in tables:
+                    cursor.execute(f"DELETE FROM {table}")
+        record_reset()
+
+    bump_state_version()
+
+
+def delete_team(team_id):
+    """Delete a team and everything that references it with set-based deletes."""
+    games = Game.objects.filter(Q(team1_id=team_id) | Q(team2_id=team_id))
+    knockout_games = KnockoutGame.objects.filter(
+        Q(team1_id=team_id) | Q(team2_id=team_id)
+    )
+    events = ScoreEvent.objects.filter(
+        Q(game__in=games) | Q(knockout_game__in=knockout_games)
+    )
+
+    with transaction.atomic():
+        # The change log needs the ids before the rows are gone.
+        deleted_games = list(games.values_list("id", "group_id"))
+        record_changes(
+            ChangeLogEntry.GAME, [game_id for game_id, _ in deleted_games], deleted=True
         )
+        record_changes(
+            ChangeLogEntry.KNOCKOUT_GAME,
+            knockout_games.values_list("id", flat=True),
+            deleted=True,
+        )
+        record_changes(
+            ChangeLogEntry.GROUP, {group_id for _, group_id in deleted_games}
+        )
+
+        RatedResult.objects.filter(game__in=games).update(game=None)
+        RatedResult.objects.filter(knockout_game__in=knockout_games).update(
+            knockout_game=None
+        )
+
+        # _raw_delete() issues a single DELETE ... WHERE without running the
+        # deletion collector, which would fetch every related row first.
+        for queryset in (
+            ScoreSnapshot.objects.filter(last_event__in=events),
+            events,
+            knockout_games,
+            games,
+            SwissBye.objects.filter(team_id=team_id),
+            TournamentGroup.teams.through.objects.filter(team_id=team_id),
+            Team.players.through.objects.filter(team_id=team_id),
+            Team.objects.filter(id=team_id),
+        ):
+            queryset._raw_delete(queryset.db)
+
+    bump_state_version()
@@ -1,23 +1,92 @@
-from collections import defaultdict
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Case, When, IntegerField
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Case, When, IntegerField, Max, Q
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from rest_framework import generics, mixins, permissions, status, viewsets
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotAcceptable, ValidationError
 from rest_framework.generics import ListAPIView
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
-from .models import Game, KnockoutGame, Team, TournamentGroup
+from .models import (
+    ChangeLogEntry,
+    Game,
+    Job,
+    KnockoutGame,
+    PlayerStats,
+    ScoreEvent,
+    Team,
+    TournamentGroup,
+    TournamentSettings,
+    WebhookSubscription,
+    search_key,
+)
 from .serializers import (
+    AccountSerializer,
     GameSerializer,
+    JobSerializer,
     KnockoutGameSerializer,
+    PlayerStatsSerializer,
+    ScoreEventSerializer,
     TeamSerializer,
     TournamentGroupSerializer,
+    TournamentSettingsSerializer,
     UserSerializer,
+    WebhookSubscriptionSerializer,
 )
+from .caching import bump_state_version, cached_for_state, get_state_version
+from .changes import batched_changes, changes_since, record_changes
+from .formats import CBORRenderer, MessagePackRenderer, PNGRenderer, SVGRenderer
+from .graphics import render_bracket_svg, render_standings_svg, svg_to_png
+from .hashing import make_passwords
+from .idempotency import idempotent
+from .jobs import enqueue, export_tournament
+from .pagination import KeysetPagination
 from .permissions import IsAdminUser
-from .utils import generate_games_for_group, generate_knockout_stage
+from .ratings import INITIAL_RATING, draw_groups_by_rating, recompute_ratings
+from .score_events import save_score, undo_score_event
+from .swiss import (
+    create_swiss_stage,
+    default_rounds,
+    max_rounds,
+    pair_next_round,
+    swiss_group,
+)
+from .utils import (
+    compute_group_tables,
+    compute_standings_timeline,
+    create_groups,
+    delete_team,
+    generate_knockout_stage,
+    knockout_round_payload,
+    reset_tournament,
+)
+from .webhooks import emit_event
+from .writes import serialized_write
+
+
+def wants_async(request):
+    return request.query_params.get("async") in ("1", "true")
+
+
+def requested_tables(request):
+    tables = request.data.get("tables", settings.TOURNAMENT_TABLES)
+    if not isinstance(tables, int) or tables < 1:
+        raise ValidationError({"error": "Number of tables must be at least 1."})
+    return tables
+
+
+def accepted(job):
+    """202 response for a job queued in place of running the request inline."""
+    return Response(
+        {"success": True, "job": job.id, "status": job.status},
+        status=status.HTTP_202_ACCEPTED,
+        headers={"Location": reverse("job-detail", args=[job.id])},
+    )
 
 
 class GameViewSet(
@@ -26,17 +95,45 @@ class GameViewSet(
     mixins.UpdateModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = Game.objects.all().order_by("id")
     serializer_class = GameSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        queryset = (
+            Game.objects.all().select_related("group", "team1", "team2").order_by("id")
+        )
+
+        for field in ("table", "slot"):
+            value = self.request.query_params.get(field)
+            if value is not None:
+                if not value.isdigit():
+                    raise ValidationError({"error": f"'{field}' must be a number."})
+                queryset = queryset.filter(**{field: int(value)})
+
+        return queryset
+
+    def perform_update(self, serializer):
+        save_score(serializer, self.request.user)
+
 
 class GenerateKnockoutStageView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
+    @idempotent
     def post(self, request):
+        seeding = request.data.get("seeding", "standings")
+        if seeding not in ("standings", "rating"):
+            raise ValidationError(
+                {"error": "'seeding' must be 'standings' or 'rating'."}
+            )
+
+        if wants_async(request):
+            return accepted(
+                enqueue("generate_knockout_stage", {"seeding": seeding}, request.user)
+            )
+
         try:
-            generate_knockout_stage()
+            generate_knockout_stage(seeding)
             return Response(
                 {"success": True, "message": "Knockout stage generated successfully."},
                 status=status.HTTP_201_CREATED,
@@ -48,102 +145,309 @@ class GenerateKnockoutStageView(APIView):
             )
 
 
-class KnockoutGameListView(ListAPIView):
-    queryset = (
+def ordered_knockout_games():
+    return (
         KnockoutGame.objects.all()
         .annotate(
             round_order=Case(
-                When(round="R16", then=1),
-                When(round="QF", then=2),
-                When(round="SF", then=3),
-                When(round="F", then=4),
+                *(
+                    When(round=code, then=index)
+                    for index, (code, _) in enumerate(KnockoutGame.ROUND_CHOICES)
+                ),
                 default=99,
                 output_field=IntegerField(),
             )
         )
-        .order_by("round_order", "id")
+        .select_related("team1", "team2")
+        .order_by("round_order", "position", "id")
     )
+
+
+class KnockoutGameListView(ListAPIView):
+    queryset = ordered_knockout_games()
     serializer_class = KnockoutGameSerializer
     permission_classes = [IsAuthenticated]
 
 
+def format_standings(standings):
+    formatted_standings = []
+
+    for s in standings:
+        cup_diff = s["cups_scored"] - s["cups_conceded"]
+
+        if cup_diff > 0:
+            cup_diff_formatted = f"+{cup_diff}"
+        else:
+            cup_diff_formatted = str(cup_diff)
+
+        formatted_standings.append(
+            {
+                "team": s["team"].name,
+                "points": s["points"],
+                "cups_scored": s["cups_scored"],
+                "cups_conceded": s["cups_conceded"],
+                "cup_difference": cup_diff_formatted,
+                "played": s["played"],
+            }
+        )
+        if "buchholz" in s:
+            formatted_standings[-1]["buchholz"] = s["buchholz"]
+
+    return formatted_standings
+
+
 class GroupStandingsView(APIView):
     def get(self, request):
-        groups = TournamentGroup.objects.all()
-        result = []
-
-        for group in groups:
-            standings = defaultdict(
-                lambda: {
-                    "team": "",
-                    "points": 0,
-                    "cups_scored": 0,
-                    "cups_conceded": 0,
-                    "cup_difference": "0",
-                    "played": 0,
-                }
-            )
+        result = [
+            {"group": group.name, "standings": format_standings(standings)}
+            for group, standings in compute_group_tables()
+        ]
+        return Response(result, status=status.HTTP_200_OK)
 
-            teams_in_group = group.teams.all()
-            for team in teams_in_group:
-                standings[team.id]["team"] = team.name
 
-            games = Game.objects.filter(group=group, played=True)
+class StandingsTimelineView(APIView):
+    """
+    The group table after every result, oldest first, for live commentary
+    and charts. Computed in one pass and cached until the next score write.
+    """
 
-            for game in games:
-                t1 = game.team1
-                t2 = game.team2
+    permission_classes = [IsAuthenticated]
 
-                standings[t1.id]["cups_scored"] += game.score_team1
-                standings[t1.id]["cups_conceded"] += game.score_team2
-                standings[t1.id]["played"] += 1
+    def get(self, request):
+        timeline = cached_for_state("standings-timeline", compute_standings_timeline)
+        return Response(timeline, status=status.HTTP_200_OK)
 
-                standings[t2.id]["cups_scored"] += game.score_team2
-                standings[t2.id]["cups_conceded"] += game.score_team1
-                standings[t2.id]["played"] += 1
 
-                if game.score_team1 > game.score_team2:
-                    standings[t1.id]["points"] += 3
-                elif game.score_team1 < game.score_team2:
-                    standings[t2.id]["points"] += 3
-                else:
-                    standings[t1.id]["points"] += 1
-                    standings[t2.id]["points"] += 1
+class SyncView(APIView):
+    """
+    Everything that changed since the sequence number a client last saw.
 
-            formatted_standings = []
+    Unchanged entities are left out entirely, so a poll with nothing new
+    returns only the current sequence. With `"reset": true` the client must
+    drop its local copy and refetch the full lists.
+    """
 
-            for s in standings.values():
-                cup_diff = s["cups_scored"] - s["cups_conceded"]
+    permission_classes = [IsAuthenticated]
 
-                if cup_diff > 0:
-                    cup_diff_formatted = f"+{cup_diff}"
-                else:
-                    cup_diff_formatted = str(cup_diff)
+    def get(self, request):
+        since = request.query_params.get("since", "0")
+        if not since.isdigit():
+            raise ValidationError({"error": "'since' must be a number."})
+
+        sequence, reset, changed, deleted = changes_since(int(since))
+        result = {"sequence": sequence}
+        if reset:
+            result["reset"] = True
+            return Response(result, status=status.HTTP_200_OK)
+
+        game_ids = changed.get(ChangeLogEntry.GAME, set())
+        games = list(
+            Game.objects.filter(id__in=game_ids).select_related(
+                "group", "team1", "team2"
+            )
+        )
+        knockout_game_ids = changed.get(ChangeLogEntry.KNOCKOUT_GAME, set())
+        knockout_games = list(
+            KnockoutGame.objects.filter(id__in=knockout_game_ids).select_related(
+                "team1", "team2"
+            )
+        )
 
-                formatted_standings.append(
-                    {
-                        "team": s["team"],
-                        "points": s["points"],
-                        "cups_scored": s["cups_scored"],
-                        "cups_conceded": s["cups_conceded"],
-                        "cup_difference": cup_diff_formatted,
-                        "played": s["played"],
-                    }
+        group_ids = changed.get(ChangeLogEntry.GROUP, set()) | {
+            game.group_id for game in games
+        }
+        standings = []
+        if group_ids:
+            standings = [
+                {
+                    "id": group.id,
+                    "group": group.name,
+                    "standings": format_standings(table),
+                }
+                for group, table in compute_group_tables(group_ids)
+            ]
+
+        # Rows that were changed and then deleted count as deleted.
+        removed = {
+            "games": deleted.get(ChangeLogEntry.GAME, set())
+            | (game_ids - {game.id for game in games}),
+            "knockout_games": deleted.get(ChangeLogEntry.KNOCKOUT_GAME, set())
+            | (knockout_game_ids - {game.id for game in knockout_games}),
+            "groups": deleted.get(ChangeLogEntry.GROUP, set())
+            | (group_ids - {group["id"] for group in standings}),
+        }
+
+        if games:
+            result["games"] = GameSerializer(games, many=True).data
+        if knockout_games:
+            result["knockout_games"] = KnockoutGameSerializer(
+                knockout_games, many=True
+            ).data
+        if standings:
+            result["standings"] = standings
+        removed = {key: sorted(ids) for key, ids in removed.items() if ids}
+        if removed:
+            result["deleted"] = removed
+
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class GraphicView(APIView):
+    """
+    Base for server-rendered images. The output is cached per tournament
+    state version, and the ETag carries that version, which every worker
+    reads from the database, so a display that already has the current
+    image gets a 304 from any worker without anything being rendered.
+    """
+
+    renderer_classes = [SVGRenderer, PNGRenderer]
+    graphic = None
+
+    def render_svg(self):
+        raise NotImplementedError
+
+    def get(self, request):
+        image_format = request.accepted_renderer.format
+        version = get_state_version()
+        etag = f'"{self.graphic}-{image_format}-v{version}"'
+
+        if etag in [
+            tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")
+        ]:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+
+            def render():
+                svg = self.render_svg()
+                return svg if image_format == "svg" else svg_to_png(svg)
+
+            try:
+                image = cached_for_state(
+                    f"graphics:{self.graphic}:{image_format}", render, version
                 )
+            except (ImportError, OSError):
+                # cairosvg is missing, or the cairo library it loads is.
+                raise NotAcceptable("PNG output needs the cairosvg package.")
+            response = Response(image, status=status.HTTP_200_OK)
 
-            group_data = {
-                "group": group.name,
-                "standings": sorted(
-                    formatted_standings,
-                    key=lambda x: (
-                        -x["points"],
-                        -int(x["cup_difference"].replace("+", "")),
-                    ),
-                ),
-            }
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Errors are reported as JSON, not pushed through an image renderer.
+        if getattr(response, "exception", False):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class BracketGraphicView(GraphicView):
+    graphic = "bracket"
+
+    def render_svg(self):
+        return render_bracket_svg(KnockoutGame.objects.select_related("team1", "team2"))
+
+
+class StandingsGraphicView(GraphicView):
+    graphic = "standings"
+
+    def render_svg(self):
+        return render_standings_svg(compute_group_tables())
+
+
+class PublicView(APIView):
+    """
+    Read-only data for spectators, served without authentication so that a
+    reverse proxy or CDN can cache it. The body is computed once per
+    tournament state version and the ETag carries that version. The version
+    is shared by every worker through the database, so all of them hand out
+    the same ETag, and a revalidation is answered with a 304 after reading
+    just that one row.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    renderer_classes = [JSONRenderer, MessagePackRenderer, CBORRenderer]
+    resource = None
+
+    def compute(self):
+        raise NotImplementedError
+
+    def get(self, request):
+        version = get_state_version()
+        wire_format = request.accepted_renderer.format
+        etag = f'"public-{self.resource}-{wire_format}-v{version}"'
+
+        if etag in [
+            tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")
+        ]:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cached_for_state(f"public:{self.resource}", self.compute, version)
+            response = Response(data, status=status.HTTP_200_OK)
+
+        response["ETag"] = etag
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.PUBLIC_CACHE_MAX_AGE,
+            s_maxage=settings.PUBLIC_CACHE_S_MAXAGE,
+        )
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+
+class PublicStandingsView(PublicView):
+    resource = "standings"
 
-            result.append(group_data)
+    def compute(self):
+        return [
+            {"group": group.name, "standings": format_standings(standings)}
+            for group, standings in compute_group_tables()
+        ]
 
+
+class PublicGamesView(PublicView):
+    resource = "games"
+
+    def compute(self):
+        games = Game.objects.select_related("group", "team1", "team2").order_by("id")
+        return GameSerializer(games, many=True).data
+
+
+class PublicBracketView(PublicView):
+    resource = "bracket"
+
+    def compute(self):
+        return KnockoutGameSerializer(ordered_knockout_games(), many=True).data
+
+
+class QualificationProbabilityView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # Imported here so that NumPy is only loaded once odds are requested,
+        # not on every worker start.
+        from .simulation import (
+            DEFAULT_SIMULATION_RUNS,
+            MAX_SIMULATION_RUNS,
+            simulate_qualification,
+        )
+
+        try:
+            runs = int(request.query_params.get("runs", DEFAULT_SIMULATION_RUNS))
+        except ValueError:
+            return Response(
+                {"success": False, "error": "'runs' must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        runs = max(1, min(runs, MAX_SIMULATION_RUNS))
+        result = cached_for_state(
+            f"qualification-probabilities:{runs}",
+            lambda: simulate_qualification(runs),
+        )
         return Response(result, status=status.HTTP_200_OK)
 
 
@@ -180,6 +484,54 @@ class TeamListCreate(generics.ListCreateAPIView):
         )
 
 
+class TeamSearchPagination(CursorPagination):
+    ordering = ("name_key", "id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class TeamSearchView(ListAPIView):
+    """
+    Teams whose name or member names start with or contain `q`, ignoring
+    case and accents. With `match=prefix` only prefixes are matched, which
+    is served from the key indexes on every database.
+    """
+
+    serializer_class = TeamSerializer
+    pagination_class = TeamSearchPagination
+    permission_classes = [IsAuthenticated]
+
+    search_fields = ("name_key", "member_one_key", "member_two_key")
+
+    def get_queryset(self):
+        query = search_key(self.request.query_params.get("q", ""))
+        if not query:
+            raise ValidationError({"error": "'q' is required."})
+
+        match = self.request.query_params.get("match", "contains")
+        if match not in ("prefix", "contains"):
+            raise ValidationError({"error": "'match' must be 'prefix' or 'contains'."})
+
+        queryset = Team.objects.all()
+        condition = Q()
+        for field in self.search_fields:
+            if match == "contains":
+                # Served by the trigram indexes on PostgreSQL.
+                condition |= Q(**{f"{field}__contains": query})
+            elif connections[queryset.db].vendor == "postgresql":
+                # LIKE 'q%' is served by the varchar_pattern_ops index.
+                condition |= Q(**{f"{field}__startswith": query})
+            else:
+                # A range on the lowercase key uses the plain B-tree index,
+                # which SQLite's case-insensitive LIKE would not.
+                condition |= Q(
+                    **{f"{field}__gte": query, f"{field}__lt": query + "\uffff"}
+                )
+
+        return queryset.filter(condition)
+
+
 class TeamDelete(generics.DestroyAPIView):
     serializer_class = TeamSerializer
     permission_classes = [IsAdminUser, IsAuthenticated]
@@ -188,19 +540,170 @@ class TeamDelete(generics.DestroyAPIView):
         return Team.objects.all()
 
     def delete(self, request, *args, **kwargs):
-        self.destroy(request, *args, **kwargs)
+        delete_team(self.get_object().id)
         return Response(
             {"success": True, "message": "Team deleted successfully."},
             status=status.HTTP_200_OK,
         )
 
 
+class RatingListView(APIView):
+    """Teams ranked by strength, the mean Elo rating of their players."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        def compute():
+            teams = Team.objects.prefetch_related("players__stats")
+            result = []
+            for team in teams:
+                players = team.players.all()
+                ratings = [player.stats.rating for player in players]
+                strength = sum(ratings) / len(ratings) if ratings else INITIAL_RATING
+                result.append(
+                    {
+                        "id": team.id,
+                        "team": team.name,
+                        "rating": round(strength, 1),
+                        "players": [
+                            {"name": player.name, "rating": round(rating, 1)}
+                            for player, rating in zip(players, ratings)
+                        ],
+                    }
+                )
+            result.sort(key=lambda entry: (-entry["rating"], entry["team"]))
+            return result
+
+        return Response(cached_for_state("ratings", compute), status=status.HTTP_200_OK)
+
+
+class RecomputeRatingsView(APIView):
+    """Rebuild every rating from the full result history, e.g. after fixes."""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @idempotent
+    def post(self, request):
+        if wants_async(request):
+            return accepted(enqueue("recompute_ratings", user=request.user))
+
+        counts = recompute_ratings()
+        return Response(
+            {
+                "success": True,
+                "message": f"Ratings recomputed, {counts['updated']} players changed.",
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class PlayerLeaderboardPagination(KeysetPagination):
+    # Matches player_leaderboard_idx, so every page is one index range scan.
+    ordering = ("-wins", "-cups_scored", "player_id")
+
+
+class PlayerLeaderboardView(ListAPIView):
+    queryset = PlayerStats.objects.select_related("player")
+    serializer_class = PlayerStatsSerializer
+    pagination_class = PlayerLeaderboardPagination
+    permission_classes = [IsAuthenticated]
+
+
 class CreateUserView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
 
+class BulkCreateUsersView(APIView):
+    """
+    Create many player accounts in one request. Passwords are hashed in
+    parallel in the password process pool and the users are inserted with
+    one bulk_create. Every row gets a result: created, exists or invalid.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @idempotent
+    def post(self, request):
+        accounts = request.data.get("users")
+        if not isinstance(accounts, list) or not accounts:
+            raise ValidationError({"error": "No users provided."})
+        if len(accounts) > settings.USER_BULK_MAX:
+            raise ValidationError(
+                {"error": f"At most {settings.USER_BULK_MAX} users per request."}
+            )
+
+        results = []
+        valid = {}
+        for row in accounts:
+            serializer = AccountSerializer(data=row if isinstance(row, dict) else {})
+            if not serializer.is_valid():
+                username = row.get("username") if isinstance(row, dict) else None
+                results.append(
+                    {
+                        "username": username,
+                        "status": "invalid",
+                        "errors": serializer.errors,
+                    }
+                )
+                continue
+
+            username = serializer.validated_data["username"]
+            if username in valid:
+                results.append(
+                    {
+                        "username": username,
+                        "status": "invalid",
+                        "errors": {"username": ["Listed more than once."]},
+                    }
+                )
+            else:
+                results.append({"username": username, "status": "created"})
+                valid[username] = serializer.validated_data["password"]
+
+        existing = set(
+            User.objects.filter(username__in=list(valid)).values_list(
+                "username", flat=True
+            )
+        )
+        for result in results:
+            if result["status"] == "created" and result["username"] in existing:
+                result["status"] = "exists"
+                del valid[result["username"]]
+
+        # Hash outside the transaction; it is by far the slowest step.
+        usernames = list(valid)
+        hashes = make_passwords([valid[username] for username in usernames])
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    User(username=username, password=encoded)
+                    for username, encoded in zip(usernames, hashes)
+                )
+        except IntegrityError:
+            raise ValidationError(
+                {"error": "Some users were created meanwhile. Please retry."}
+            )
+
+        ids = dict(
+            User.objects.filter(username__in=usernames).values_list("username", "id")
+        )
+        for result in results:
+            if result["status"] == "created":
+                result["id"] = ids[result["username"]]
+
+        return Response(
+            {
+                "success": True,
+                "message": f"{len(usernames)} users created, "
+                f"{len(results) - len(usernames)} skipped.",
+                "data": results,
+            },
+            status=status.HTTP_201_CREATED if usernames else status.HTTP_200_OK,
+        )
+
+
 class MeView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -235,8 +738,16 @@ class TournamentGroupCreate(generics.CreateAPIView):
 class TournamentGroupBulkCreate(APIView):
     permission_classes = [IsAdminUser, IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         groups_data = request.data.get("groups", [])
+        tournament = TournamentSettings.load()
+
+        if not groups_data and request.data.get("seeding") == "rating":
+            try:
+                groups_data = draw_groups_by_rating(tournament.group_size)
+            except ValueError as e:
+                raise ValidationError({"error": str(e)})
 
         if not groups_data:
             raise ValidationError({"error": "No groups provided."})
@@ -245,33 +756,35 @@ class TournamentGroupBulkCreate(APIView):
         if len(all_team_ids) != len(set(all_team_ids)):
             raise ValidationError({"error": "A team cannot be in multiple groups."})
 
-        if len(all_team_ids) % 4 != 0:
-            raise ValidationError({"error": "Teams must be grouped in multiples of 4."})
+        if any(len(group) != tournament.group_size for group in groups_data):
+            raise ValidationError(
+                {"error": f"Every group must contain {tournament.group_size} teams."}
+            )
 
-        if (
-            not 8 <= len(all_team_ids) <= 32
-            or len(all_team_ids) == 20
-            or len(all_team_ids) % 4 != 0
-        ):
+        if len(groups_data) < 2 or len(all_team_ids) > tournament.max_teams:
             raise ValidationError(
-                {"error": "Total number of teams must be between 8 and 32, but not 20."}
+                {
+                    "error": "At least two groups and at most "
+                    f"{tournament.max_teams} teams are required."
+                }
             )
 
+        tables = requested_tables(request)
+
         existing_teams = Team.objects.filter(id__in=all_team_ids)
         if existing_teams.count() != len(all_team_ids):
             raise ValidationError({"error": "One or more teams do not exist."})
 
-        TournamentGroup.objects.all().delete()
+        if wants_async(request):
+            job = enqueue(
+                "create_groups",
+                {"groups": groups_data, "tables": tables},
+                request.user,
+            )
+            return accepted(job)
 
-        created_groups = []
-        for index, team_ids in enumerate(groups_data, start=1):
-            group = TournamentGroup.objects.create()
-            teams = Team.objects.filter(id__in=team_ids)
-            group.teams.set(teams)
-            group.name = f"Group {index}"
-            group.save()
-            generate_games_for_group(group)
-            created_groups.append(TournamentGroupSerializer(group).data)
+        groups = create_groups(groups_data, tables)
+        created_groups = TournamentGroupSerializer(groups, many=True).data
 
         return Response(created_groups, status=status.HTTP_201_CREATED)
 
@@ -280,7 +793,8 @@ class TournamentGroupDelete(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request):
-        TournamentGroup.objects.all().delete()
+        with batched_changes():
+            TournamentGroup.objects.all().delete()
         return Response(
             {"success": True, "message": "All tournament groups deleted."},
             status=status.HTTP_200_OK,
@@ -292,7 +806,7 @@ class TournamentGroupList(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return TournamentGroup.objects.all()
+        return TournamentGroup.objects.all().prefetch_related("teams")
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -307,10 +821,41 @@ class TournamentGroupList(generics.ListAPIView):
         )
 
 
+class TournamentSettingsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_permissions(self):
+        if self.request.method == "PATCH":
+            return [IsAuthenticated(), IsAdminUser()]
+        return super().get_permissions()
+
+    def get(self, request):
+        serializer = TournamentSettingsSerializer(TournamentSettings.load())
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def patch(self, request):
+        serializer = TournamentSettingsSerializer(
+            TournamentSettings.load(), data=request.data, partial=True
+        )
+        if serializer.is_valid():
+            serializer.save()
+            return Response(
+                {
+                    "success": True,
+                    "message": "Tournament settings updated successfully.",
+                    "data": serializer.data,
+                }
+            )
+        return Response(
+            {"success": False, "error": serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+
 class UpdateKnockoutGameScoreView(APIView):
     def patch(self, request, pk):
         try:
-            game = KnockoutGame.objects.get(pk=pk)
+            game = KnockoutGame.objects.select_related("team1", "team2").get(pk=pk)
         except KnockoutGame.DoesNotExist:
             return Response(
                 {"success": False, "error": "Game not found"},
@@ -319,7 +864,7 @@ class UpdateKnockoutGameScoreView(APIView):
 
         serializer = KnockoutGameSerializer(game, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            save_score(serializer, request.user)
             return Response(
                 {
                     "success": True,
@@ -333,11 +878,56 @@ class UpdateKnockoutGameScoreView(APIView):
         )
 
 
+class ScoreEventList(generics.ListAPIView):
+    serializer_class = ScoreEventSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get_queryset(self):
+        queryset = ScoreEvent.objects.select_related("user", "reverted_by")
+
+        for field in ("game", "knockout_game"):
+            value = self.request.query_params.get(field)
+            if value is not None:
+                if not value.isdigit():
+                    raise ValidationError({"error": f"'{field}' must be a number."})
+                queryset = queryset.filter(**{f"{field}_id": int(value)})
+
+        return queryset.order_by("-id")
+
+
+class UndoScoreEventView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request, pk):
+        try:
+            event = serialized_write(undo_score_event, pk, request.user)
+        except ScoreEvent.DoesNotExist:
+            return Response(
+                {"success": False, "error": "Score event not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except ValueError as e:
+            return Response(
+                {"success": False, "error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            {
+                "success": True,
+                "message": "Score change undone.",
+                "data": ScoreEventSerializer(event).data,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
 class DeleteKnockoutStageView(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request):
-        deleted_count, _ = KnockoutGame.objects.all().delete()
+        with batched_changes():
+            deleted_count, _ = KnockoutGame.objects.all().delete()
         return Response(
             {"success": True, "message": f"{deleted_count} knockout games deleted."},
             status=status.HTTP_200_OK,
@@ -347,6 +937,7 @@ class DeleteKnockoutStageView(APIView):
 class GenerateNextKnockoutRoundView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
+    @idempotent
     def post(self, request):
         current = request.data.get("current_round")
         next_r = request.data.get("next_round")
@@ -358,28 +949,48 @@ class GenerateNextKnockoutRoundView(APIView):
             )
 
         try:
-            current_games = KnockoutGame.objects.filter(round=current, played=True)
+            current_games = list(
+                KnockoutGame.objects.filter(round=current)
+                .select_related("team1", "team2")
+                .order_by("position", "id")
+            )
 
-            if current_games.count() % 2 != 0:
+            if not current_games:
+                raise Exception(f"There are no games in round {current}.")
+            if len(current_games) % 2 != 0:
                 raise Exception("Uneven number of games.")
 
+            # Winners meet in bracket order: the winners of positions 2k and
+            # 2k + 1 play at position k of the next round. Rounds from before
+            # positions were stored all have position 0 and keep id order.
             winners = []
             for game in current_games:
-                if game.score_team1 > game.score_team2:
-                    winners.append(game.team1)
-                elif game.score_team2 > game.score_team1:
-                    winners.append(game.team2)
-                else:
+                if not game.played:
+                    raise Exception(f"Game {game.id} has not been played yet.")
+                if game.winner is None:
                     raise Exception(f"Tied game in knockout stage: {game.id}")
-
-            KnockoutGame.objects.filter(round=next_r).delete()
-
-            for i in range(0, len(winners), 2):
-                KnockoutGame.objects.create(
-                    team1=winners[i],
-                    team2=winners[i + 1],
-                    round=next_r,
+                winners.append(game.winner)
+
+            with batched_changes():
+                KnockoutGame.objects.filter(round=next_r).delete()
+
+                created = KnockoutGame.objects.bulk_create(
+                    KnockoutGame(
+                        team1=winners[i],
+                        team2=winners[i + 1],
+                        round=next_r,
+                        position=i // 2,
+                    )
+                    for i in range(0, len(winners), 2)
+                )
+                record_changes(
+                    ChangeLogEntry.KNOCKOUT_GAME, [game.id for game in created]
                 )
+                emit_event(
+                    "knockout_round.generated",
+                    lambda: knockout_round_payload(created),
+                )
+            bump_state_version()
 
             return Response(
                 {
@@ -395,15 +1006,97 @@ class GenerateNextKnockoutRoundView(APIView):
             )
 
 
+class SwissStageView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        group = swiss_group()
+        if group is None:
+            return Response(
+                {"success": False, "error": "There is no Swiss stage."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        [(_, standings)] = compute_group_tables([group.id])
+        current = group.games.aggregate(round=Max("swiss_round"))["round"]
+        byes = group.byes.select_related("team").order_by("round")
+        return Response(
+            {
+                "rounds": group.swiss_rounds,
+                "current_round": current or 0,
+                "standings": format_standings(standings),
+                "byes": [{"round": bye.round, "team": bye.team.name} for bye in byes],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class GenerateSwissStageView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @idempotent
+    def post(self, request):
+        team_count = Team.objects.count()
+        if team_count < 2:
+            raise ValidationError({"error": "At least two teams are required."})
+
+        rounds = request.data.get("rounds", default_rounds(team_count))
+        if not isinstance(rounds, int) or not 1 <= rounds <= max_rounds(team_count):
+            raise ValidationError(
+                {
+                    "error": "Number of rounds must be between 1 and "
+                    f"{max_rounds(team_count)} for {team_count} teams."
+                }
+            )
+        tables = requested_tables(request)
+
+        if wants_async(request):
+            job = enqueue(
+                "create_swiss_stage",
+                {"rounds": rounds, "tables": tables},
+                request.user,
+            )
+            return accepted(job)
+
+        create_swiss_stage(rounds, tables)
+        return Response(
+            {"success": True, "message": f"Swiss stage of {rounds} rounds created."},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class NextSwissRoundView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @idempotent
+    def post(self, request):
+        try:
+            round_number, games, bye = pair_next_round(requested_tables(request))
+        except ValueError as e:
+            return Response(
+                {"success": False, "error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        message = f"{len(games)} games created for round {round_number}."
+        if bye is not None:
+            message += f" {bye.name} has a bye."
+        return Response(
+            {"success": True, "message": message},
+            status=status.HTTP_201_CREATED,
+        )
+
+
 class ResetTournamentView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
+    @idempotent
     def post(self, request):
+        if wants_async(request):
+            return accepted(enqueue("reset_tournament", user=request.user))
+
         try:
-            KnockoutGame.objects.all().delete()
-            Game.objects.all().delete()
-            TournamentGroup.objects.all().delete()
-            Team.objects.all().delete()
+            reset_tournament()
 
             return Response(
                 {"success": True, "message": "Tournament reset successful."},
@@ -416,6 +1109,68 @@ class ResetTournamentView(APIView):
             )
 
 
+class ExportTournamentView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(export_tournament(), status=status.HTTP_200_OK)
+
+    @idempotent
+    def post(self, request):
+        return accepted(enqueue("export_tournament", user=request.user))
+
+
+class JobDetailView(generics.RetrieveAPIView):
+    queryset = Job.objects.select_related("user")
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+class JobResultView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, pk):
+        job = Job.objects.filter(pk=pk).first()
+        if job is None:
+            return Response(
+                {"success": False, "error": "Job not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        if job.status == Job.SUCCEEDED:
+            return Response(job.result, status=status.HTTP_200_OK)
+        if job.status == Job.FAILED:
+            return Response(
+                {"success": False, "error": job.error},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            {"success": True, "job": job.id, "status": job.status},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class WebhookSubscriptionListCreate(generics.ListCreateAPIView):
+    queryset = WebhookSubscription.objects.order_by("id")
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subscription = serializer.save()
+        return Response(
+            {**serializer.data, "secret": subscription.secret},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class WebhookSubscriptionDetail(generics.RetrieveUpdateDestroyAPIView):
+    queryset = WebhookSubscription.objects.all()
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
 class DeleteCypressTestUserView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -0,0 +1,196 @@
+import hashlib
+import hmac
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import WebhookDelivery, WebhookSubscription
+
+WEBHOOK_EVENTS = (
+    "game.updated",
+    "knockout_game.updated",
+    "knockout_stage.generated",
+    "knockout_round.generated",
+    "swiss_round.generated",
+)
+
+
+def emit_event(event, payload):
+    """
+    Queue `event` for every interested subscription once the current
+    transaction commits, so rolled-back writes are never announced.
+
+    `payload` may be a callable; it is only evaluated when someone is
+    subscribed. Nothing is sent from here: the dispatcher delivers.
+    """
+    transaction.on_commit(lambda: _queue_deliveries(event, payload))
+
+
+def _queue_deliveries(event, payload):
+    subscriptions = [
+        subscription
+        for subscription in WebhookSubscription.objects.filter(active=True)
+        if subscription.wants(event)
+    ]
+    if not subscriptions:
+        return
+
+    if callable(payload):
+        payload = payload()
+    now = timezone.now()
+    WebhookDelivery.objects.bulk_create(
+        WebhookDelivery(
+            subscription=subscription,
+            event=event,
+            payload=payload,
+            next_attempt_at=now,
+        )
+        for subscription in subscriptions
+    )
+
+
+def sign(secret, timestamp, body):
+    message = f"{timestamp}.".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def claim_batches(limit=1000, busy=(), subscriptions=None):
+    """
+    Lease up to WEBHOOK_BATCH_SIZE due deliveries per subscription and
+    return [(subscription, deliveries)], for at most `subscriptions`
+    subscriptions and none of the `busy` ones. The lease token makes
+    concurrent dispatchers skip each other's rows; it expires after the
+    timeout so a crashed dispatcher's batch is retried.
+    """
+    now = timezone.now()
+    due = (
+        WebhookDelivery.objects.filter(
+            status=WebhookDelivery.PENDING,
+            next_attempt_at__lte=now,
+            subscription__active=True,
+        )
+        .exclude(subscription_id__in=busy)
+        .values_list("id", "subscription_id")[:limit]
+    )
+
+    per_subscription = {}
+    for delivery_id, subscription_id in due:
+        if (
+            subscription_id not in per_subscription
+            and len(per_subscription) == subscriptions
+        ):
+            continue
+        ids = per_subscription.setdefault(subscription_id, [])
+        if len(ids) < settings.WEBHOOK_BATCH_SIZE:
+            ids.append(delivery_id)
+    if not per_subscription:
+        return []
+
+    lease = uuid.uuid4()
+    WebhookDelivery.objects.filter(
+        id__in=[i for ids in per_subscription.values() for i in ids],
+        status=WebhookDelivery.PENDING,
+        next_attempt_at__lte=now,
+    ).update(
+        lease=lease,
+        next_attempt_at=now + timedelta(seconds=settings.WEBHOOK_TIMEOUT * 2 + 30),
+    )
+
+    batches = {}
+    for delivery in WebhookDelivery.objects.filter(lease=lease).select_related(
+        "subscription"
+    ):
+        batches.setdefault(delivery.subscription, []).append(delivery)
+    return list(batches.items())
+
+
+def send_batch(subscription, deliveries):
+    """
+    POST one signed batch. Runs on a dispatcher thread and never touches the
+    database. Returns None on success, otherwise the error message.
+    """
+    body = json.dumps(
+        {
+            "deliveries": [
+                {
+                    "id": delivery.id,
+                    "event": delivery.event,
+                    "created_at": delivery.created_at,
+                    "data": delivery.payload,
+                }
+                for delivery in deliveries
+            ]
+        },
+        cls=DjangoJSONEncoder,
+    ).encode()
+    timestamp = str(int(time.time()))
+    request = urllib.request.Request(
+        subscription.url,
+        data=body,
+        method="POST",
+        headers={
+            "Content-Type": "application/json",
+            "User-Agent": "beer-pong-tournament-webhooks",
+            "X-Webhook-Timestamp": timestamp,
+            "X-Webhook-Signature": "sha256="
+            + sign(subscription.secret, timestamp, body),
+        },
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=settings.WEBHOOK_TIMEOUT):
+            return None
+    except urllib.error.HTTPError as e:
+        return f"HTTP {e.code}"
+    except (urllib.error.URLError, OSError) as e:
+        return str(getattr(e, "reason", e))
+
+
+def retry_delay(attempts):
+    """Exponential backoff, randomized so that retries do not arrive in step."""
+    ceiling = settings.WEBHOOK_RETRY_BASE * 2 ** (attempts - 1)
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def record_result(deliveries, error):
+    now = timezone.now()
+    ids = [delivery.id for delivery in deliveries]
+
+    if error is None:
+        WebhookDelivery.objects.filter(id__in=ids).update(
+            status=WebhookDelivery.DELIVERED,
+            delivered_at=now,
+            attempts=F("attempts") + 1,
+            lease=None,
+            last_error="",
+        )
+        return
+
+    for delivery in deliveries:
+        delivery.attempts += 1
+        delivery.last_error = error
+        delivery.lease = None
+        if delivery.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            delivery.status = WebhookDelivery.FAILED
+        else:
+            delivery.next_attempt_at = now + timedelta(
+                seconds=retry_delay(delivery.attempts)
+            )
+    WebhookDelivery.objects.bulk_update(
+        deliveries, ["attempts", "last_error", "lease", "status", "next_attempt_at"]
+    )
+
+
+def prune_deliveries():
+    cutoff = timezone.now() - timedelta(days=settings.WEBHOOK_RETENTION_DAYS)
+    return WebhookDelivery.objects.filter(
+        status__in=[WebhookDelivery.DELIVERED, WebhookDelivery.FAILED],
+        created_at__lt=cutoff,
+    ).delete()[0]
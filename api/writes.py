@@ -0,0 +1,35 @@
+import random
+import threading
+import time
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+# Threads of one worker take turns writing instead of all waiting on
+# SQLite's file lock at once.
+_write_lock = threading.Lock()
+
+
+def serialized_write(func, *args, **kwargs):
+    """
+    Run `func` in a transaction. On SQLite, writers in this process take
+    turns, and a transaction that still finds the database locked, by a
+    writer in another process that outlasted the busy timeout, is retried
+    with backoff up to SQLITE_WRITE_RETRIES times.
+
+    Inside an outer transaction the call just joins it: a retry would have
+    to restart the outer transaction as well.
+    """
+    if connection.in_atomic_block:
+        return func(*args, **kwargs)
+    if connection.vendor != "sqlite":
+        with transaction.atomic():
+            return func(*args, **kwargs)
+
+    for attempt in range(settings.SQLITE_WRITE_RETRIES + 1):
+        try:
+            with _write_lock, transaction.atomic():
+                return func(*args, **kwargs)
+        except OperationalError as error:
+            if "locked" not in str(error) or attempt == settings.SQLITE_WRITE_RETRIES:
+                raise
+        time.sleep(random.uniform(0, 0.05 * 2**attempt))
@@ -0,0 +1,94 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.signing import BadSignature, TimestampSigner
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Carries the read-your-writes pin. Browsers send the cookie back; other
+# clients can echo the header.
+PIN_COOKIE = "replica_pin"
+PIN_HEADER = "Replica-Pin"
+
+_replica = ContextVar("replica", default=None)
+
+
+def _pin_signer():
+    return TimestampSigner(salt="backend.replicas.pin")
+
+
+def _is_pinned(request):
+    """Whether the client wrote within the last REPLICA_PIN_SECONDS."""
+    for pin in (request.COOKIES.get(PIN_COOKIE), request.headers.get(PIN_HEADER)):
+        if not pin:
+            continue
+        try:
+            _pin_signer().unsign(pin, max_age=settings.REPLICA_PIN_SECONDS)
+        except BadSignature:
+            continue
+        return True
+    return False
+
+
+class ReplicaRouter:
+    """
+    Send reads to the replica chosen for the current request, if any;
+    everything else, including all writes, goes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica.get() or "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Read from one random replica for safe requests to REPLICA_READ_PATHS,
+    so that a request never mixes replicas with different lag. A client
+    that has just written gets a signed pin, as a cookie and a header, and
+    reads from the primary for REPLICA_PIN_SECONDS so it always sees its
+    own updates. The pin carries its own timestamp, so every worker honours
+    it without shared state.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replica = (
+            bool(settings.DATABASE_REPLICAS)
+            and request.method in SAFE_METHODS
+            and request.path.startswith(tuple(settings.REPLICA_READ_PATHS))
+            and not _is_pinned(request)
+        )
+
+        token = _replica.set(
+            random.choice(settings.DATABASE_REPLICAS) if use_replica else None
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(token)
+
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            pin = _pin_signer().sign("primary")
+            response.set_cookie(
+                PIN_COOKIE,
+                pin,
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=request.is_secure(),
+                httponly=True,
+                # The frontend may live on another origin.
+                samesite="None" if request.is_secure() else "Lax",
+            )
+            response[PIN_HEADER] = pin
+
+        return response
@@ -1,13 +1,14 @@
 from pathlib import Path
 from datetime import timedelta
 import dj_database_url
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 import os
 
-load_dotenv()
-
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+load_dotenv(BASE_DIR / ".env")
+
 SECRET_KEY = os.getenv("SECRET_KEY")
 DEBUG = os.getenv("DEBUG", "False") == "True"
 
@@ -25,6 +26,21 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # JSON stays first so that it is used when the client does not ask for
+    # anything else.
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "api.formats.MessagePackRenderer",
+        "api.formats.CBORRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+        "api.formats.MessagePackParser",
+        "api.formats.CBORParser",
+    ],
 }
 
 SIMPLE_JWT = {
@@ -46,6 +62,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "backend.replicas.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -86,6 +103,59 @@ else:
         }
     }
 
+# Offline events run on the local SQLite file. WAL lets readers carry on
+# while a referee writes, and IMMEDIATE transactions take the write lock up
+# front, so concurrent writers wait up to SQLITE_BUSY_TIMEOUT seconds for
+# their turn instead of failing with "database is locked".
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "20"))
+SQLITE_WRITE_RETRIES = int(os.getenv("SQLITE_WRITE_RETRIES", "5"))
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"]["OPTIONS"] = {
+        "timeout": SQLITE_BUSY_TIMEOUT,
+        "transaction_mode": "IMMEDIATE",
+        "init_command": ";".join(
+            [
+                "PRAGMA journal_mode=WAL",
+                "PRAGMA synchronous=NORMAL",
+                "PRAGMA temp_store=MEMORY",
+                # 16 MB page cache and up to 128 MB of the file memory-mapped.
+                "PRAGMA cache_size=-16000",
+                "PRAGMA mmap_size=134217728",
+            ]
+        ),
+        **DATABASES["default"].get("OPTIONS", {}),
+    }
+
+DATABASE_REPLICAS = []
+for index, url in enumerate(
+    filter(None, os.getenv("DATABASE_REPLICA_URLS", "").split(","))
+):
+    alias = f"replica{index + 1}"
+    DATABASES[alias] = {**dj_database_url.parse(url), "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["backend.replicas.ReplicaRouter"]
+REPLICA_READ_PATHS = ["/api/v1/"]
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "10"))
+
+AUTHENTICATION_BACKENDS = ["api.backends.PooledPasswordBackend"]
+
+PASSWORD_HASHERS = [
+    "api.hashing.ConfigurablePBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "1000000"))
+# Processes per web worker that verify passwords; 0 hashes on the request
+# thread. Only worth it with threaded workers (gunicorn --threads): a sync
+# worker waits for the pool anyway.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+PASSWORD_HASH_WAIT = float(os.getenv("PASSWORD_HASH_WAIT", "5"))
+USER_BULK_MAX = int(os.getenv("USER_BULK_MAX", "1000"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -114,5 +184,34 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+TOURNAMENT_TABLES = int(os.getenv("TOURNAMENT_TABLES", "4"))
+TOURNAMENT_TIEBREAKERS = os.getenv(
+    "TOURNAMENT_TIEBREAKERS", "points,head_to_head,cup_difference,cups_scored"
+).split(",")
+SWISS_TIEBREAKERS = os.getenv(
+    "SWISS_TIEBREAKERS", "points,buchholz,cup_difference,cups_scored"
+).split(",")
+SCORE_SNAPSHOT_INTERVAL = int(os.getenv("SCORE_SNAPSHOT_INTERVAL", "500"))
+# Elo K-factor: the most rating points a single result can move.
+RATING_K = float(os.getenv("RATING_K", "32"))
+# Seconds browsers and shared caches may serve public spectator data unchecked.
+PUBLIC_CACHE_MAX_AGE = int(os.getenv("PUBLIC_CACHE_MAX_AGE", "5"))
+PUBLIC_CACHE_S_MAXAGE = int(os.getenv("PUBLIC_CACHE_S_MAXAGE", "10"))
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", str(24 * 60 * 60)))
+IDEMPOTENCY_WAIT_SECONDS = int(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "300"))
+JOB_WORKER_THREADS = int(os.getenv("JOB_WORKER_THREADS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "3600"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "50"))
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "4"))
+WEBHOOK_TIMEOUT = int(os.getenv("WEBHOOK_TIMEOUT", "5"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+WEBHOOK_RETRY_BASE = int(os.getenv("WEBHOOK_RETRY_BASE", "10"))
+WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "1"))
+WEBHOOK_RETENTION_DAYS = int(os.getenv("WEBHOOK_RETENTION_DAYS", "7"))
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key", "replica-pin")
+CORS_EXPOSE_HEADERS = ["Replica-Pin"]
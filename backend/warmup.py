@@ -0,0 +1,75 @@
+import time
+from django.db import connections
+
+
+def warm_up(connect=True):
+    """
+    Do the work a cold worker would otherwise do on its first request:
+    import the URLconf and every view it references, load the DRF and
+    simplejwt settings, open database connections and prime the caches.
+
+    Pass connect=False in a process that forks afterwards (gunicorn's
+    preload_app), since connections and the password hashing processes
+    must not be shared between workers.
+
+    Returns the time spent per step in milliseconds.
+    """
+    timings = {}
+
+    def step(label, func):
+        start = time.perf_counter()
+        func()
+        timings[label] = (time.perf_counter() - start) * 1000
+
+    step("urlconf", _import_urlconf)
+    step("rest_framework", _load_rest_framework)
+
+    if connect:
+        step("database", _connect_databases)
+        step("caches", _prime_caches)
+        step("password pool", _start_password_pool)
+
+    return timings
+
+
+def _import_urlconf():
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    # Accessing reverse_dict imports every view module and builds the
+    # lookup tables that the first resolve() would otherwise build.
+    resolver.reverse_dict
+
+
+def _load_rest_framework():
+    from rest_framework.settings import api_settings
+    from rest_framework_simplejwt.state import token_backend  # noqa: F401
+
+    # DRF imports these classes lazily on first access.
+    for setting in (
+        "DEFAULT_AUTHENTICATION_CLASSES",
+        "DEFAULT_PERMISSION_CLASSES",
+        "DEFAULT_RENDERER_CLASSES",
+        "DEFAULT_PARSER_CLASSES",
+        "DEFAULT_CONTENT_NEGOTIATION_CLASS",
+    ):
+        getattr(api_settings, setting)
+
+
+def _connect_databases():
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def _prime_caches():
+    from api.caching import get_state_version
+    from api.models import TournamentSettings
+
+    get_state_version()
+    TournamentSettings.load()
+
+
+def _start_password_pool():
+    from api.hashing import warm_pool
+
+    warm_pool()
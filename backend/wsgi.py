@@ -5,3 +5,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+if os.getenv("WARM_UP", "False") == "True":
+    from backend.warmup import warm_up
+
+    # Imports only: this may run in gunicorn's master before it forks, and
+    # database connections must not be shared between workers.
+    warm_up(connect=False)
@@ -0,0 +1,17 @@
+import os
+
+# With WARM_UP=True the application is imported once in the master and
+# every worker opens its connections and primes its caches before it
+# accepts traffic.
+preload_app = os.getenv("WARM_UP", "False") == "True"
+
+
+def post_worker_init(worker):
+    if preload_app:
+        from backend.warmup import warm_up
+
+        timings = warm_up()
+        worker.log.info(
+            "Warm-up finished: %s",
+            ", ".join(f"{step} {ms:.1f} ms" for step, ms in timings.items()),
+        )